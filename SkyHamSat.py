@@ -26,10 +26,9 @@
 
 # standard imports:
 
-import json
 import math
 import sys
-import urllib.request
+import time
 from datetime import timedelta
 from decimal import Decimal, localcontext, ROUND_DOWN
 from pprint import pprint
@@ -42,22 +41,40 @@ from PyQt5.QtWidgets import *
 
 # Third party modules:
 import qtawesome as qta
-import numpy as np
-from skyfield.api import Topos, load, Angle
 
 # Project modules:
 
 # Graph
-from graphqt5 import Graph, Polar, reCreateGraph
+from graphqt5 import BackgroundRenderer, FrameScheduler, Graph, Line, MarkerAnimation, Polar, PolarScene
 
+# Pass prediction
+import satengine
+from satengine import JULIAN_SEC, ts
+from satengine.rotator import RotatorLimits
+from satengine.tracking import Rig, Rotator, Tracker
 
-JULIAN_SEC = 1 / 86400
+LOCALTIME = False
 
-home = Topos('51.38833333333 N', '0.75416666666 W', elevation_m=100)
+# Pass tracks are drawn to within this many degrees of the satellite path
+TRACK_ERROR = 0.25
 
-LOCALTIME = False
+# Frame rate of the satellite markers on the current pass graph, 0 to move them only at each update
+ANIMATION_FPS = 30
+# The markers are animated along tracks of this many seconds, with a point every MARKER_TRACK_STEP seconds
+MARKER_TRACK_SECONDS = 20
+MARKER_TRACK_STEP = 2
+
+# Seconds between the live updates of the current pass graph and Doppler shift, by what is up, see live_interval
+PASS_UPDATE = 1  # the selected satellite is up
+UP_UPDATE = 5  # other satellites are up
+SOON_UPDATE = 10  # nothing is up, a pass starts within the hour
+IDLE_UPDATE = 60  # nothing is up for an hour
+# Seconds between the updates of the upcoming passes graph
+UPCOMING_UPDATE = 30
 
-ts = load.timescale()
+# The passes are stored in this file and predicted PASS_DAYS ahead in the background
+PASS_DATABASE = 'passes.sqlite'
+PASS_DAYS = 14
 
 
 class MainApp(QMainWindow):
@@ -71,6 +88,15 @@ class MainApp(QMainWindow):
     satellite_data = None  # Dictionary of satellite data dictionaries
     satellites = None
 
+    engine = None  # satengine.PassEngine
+    marker_animation = None  # MarkerAnimation of the current pass graph, None if ANIMATION_FPS is 0
+    observer = None  # satengine.Observer
+
+    # Tracking output through hamlib rotctld/rigctld
+    rotator = None
+    rig = None
+    tracker = None
+
     # Graph scales
     hours_to_show = 3
 
@@ -78,15 +104,25 @@ class MainApp(QMainWindow):
     next_passes_graph = None
     current_pass_graph = None
 
+    frames = None  # FrameScheduler, draws the graphs
+    renderer = None  # BackgroundRenderer, draws the upcoming and next passes graphs off the GUI thread
+
     showDebug = True  # set to False to disable debug displays
 
-    toggle = 0
+    live_transits = []  # the transit list of the last draw_upcoming_passes
+    timeline = None  # satengine.PassTimeline of the upcoming passes graph
+    pass_database = None  # satengine.PassDatabase of the predicted passes
+    pass_predictor = None  # satengine.PassPredictor, fills the pass_database
 
-    def __init__(self):
+    def __init__(self, service_url=None, rotctld=None, rigctld=None):
 
-        global myLocation
+        """MainApp Constructor.
 
-        """MainApp Constructor."""
+            service_url -> url of a satengine.service to use for
+                predictions instead of computing them locally.
+            rotctld, rigctld -> 'host:port' of hamlib daemons to send
+                the selected satellite's position and Doppler corrected
+                frequency to."""
 
         # TODO add favourites
         # FIXME fix multiple entries in satslist.csv for same satellite_name
@@ -97,6 +133,48 @@ class MainApp(QMainWindow):
         # call inherited init
         super().__init__()
 
+        self.service_url = service_url
+
+        # redraws of the graphs are coalesced into frames of at most 30 per second
+        self.frames = FrameScheduler(30, self)
+        self.renderer = BackgroundRenderer(self)
+
+        # while resizing the graphs are stretched, they are re-drawn
+        # at the new size when there has been no resize for a while
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(150)
+        self.resize_timer.timeout.connect(self.update_graph_sizes)
+
+        # settings changed while resizing and moving are written together
+        self.pending_settings = {}
+
+        # live updates are run at deadlines chosen by what is up, and at the next AOS or LOS
+        self.live_deadlines = {'upcoming': 0.0, 'current': 0.0}  # time.monotonic()
+        self.live_update_timer = QTimer(self)
+        self.live_update_timer.setSingleShot(True)
+        self.live_update_timer.setTimerType(Qt.PreciseTimer)
+        self.live_update_timer.timeout.connect(self.on_live_update)
+        self.settings_timer = QTimer(self)
+        self.settings_timer.setSingleShot(True)
+        self.settings_timer.setInterval(1000)
+        self.settings_timer.timeout.connect(self.write_settings)
+
+        # a daemon that cannot be reached is reported in the text pane and the app runs without it
+        connection_errors = []
+        if rotctld:
+            host, port = rotctld.rsplit(':', 1)
+            try:
+                self.rotator = Rotator(host, int(port))
+            except OSError as e:
+                connection_errors.append(f'Rotator not tracked, cannot connect to rotctld at {rotctld}: {e}')
+        if rigctld:
+            host, port = rigctld.rsplit(':', 1)
+            try:
+                self.rig = Rig(host, int(port))
+            except OSError as e:
+                connection_errors.append(f'Radio not tracked, cannot connect to rigctld at {rigctld}: {e}')
+
         # Load the GUI definition file
         # use 2nd parameter self so that events can be overridden
         self.ui = uic.loadUi('SkyHamSat.ui', self)
@@ -116,16 +194,18 @@ class MainApp(QMainWindow):
         self.checkBoxDownlink.stateChanged.connect(self.on_checkboxes_changed)
         self.checkBoxUplink.stateChanged.connect(self.on_checkboxes_changed)
         self.comboBoxMode.editTextChanged.connect(self.on_checkboxes_changed)
+        self.selected_frequencies.currentIndexChanged.connect(self.on_selected_frequency_changed)
 
-        # Create labels to contain the graphs
+        # Create labels to contain the graphs,
+        # the current pass is a view of a scene so that the markers can be moved in place
         self.labelGraph = QLabel()
         self.labelPolarShowPasses = QLabel()
-        self.labelPolarCurrentPass = QLabel()
+        self.viewPolarCurrentPass = QGraphicsView()
 
         # Add the labels containing the graph to the scroll areas in the ui file
         self.scrollArea.setWidget(self.labelGraph)
         self.scrollAreaShowPasses.setWidget(self.labelPolarShowPasses)
-        self.scrollAreaCurrentPass.setWidget(self.labelPolarCurrentPass)
+        self.scrollAreaCurrentPass.setWidget(self.viewPolarCurrentPass)
 
         # Create an object to save and restore settings
         self.settings = QSettings('G4AUC', 'SkyHamSat')
@@ -154,13 +234,16 @@ class MainApp(QMainWindow):
         self.my_longitude.setText(long)
         elevation = self.settings.value('myelevation', 100.0, type=float)
         self.my_elevation.setText(f'{elevation:0.1f}')
-        home = Topos(lat, long, elevation_m=elevation)
+        self.observer = satengine.Observer(lat, long, elevation, self.horizon_mask())
 
         # Create graphs with texts shown but no lines yet
         self.draw_graphs()
 
         self.set_up_satellite_data()
 
+        for message in connection_errors:
+            self.display_on_upcoming_passes(message, colour='red')
+
     @pyqtSlot(int)
     @pyqtSlot(str)
     def on_checkboxes_changed(self, *args):
@@ -221,15 +304,23 @@ class MainApp(QMainWindow):
     def on_pushButtonSetLocation_clicked(self):
         """Slot triggered when the button is clicked.
             """
-        global home
 
         self.settings.setValue('mylatitude', self.my_latitude.text())
         self.settings.setValue('mylongitude', self.my_longitude.text())
         self.settings.setValue('myelevation', float(self.my_elevation.text()))
 
-        home = Topos(self.my_latitude.text(),
-                     self.my_longitude.text(),
-                     elevation_m=float(self.my_elevation.text()))
+        self.observer = satengine.Observer(self.my_latitude.text(),
+                                           self.my_longitude.text(),
+                                           float(self.my_elevation.text()),
+                                           self.horizon_mask())
+        if isinstance(self.engine, satengine.PassEngine):
+            self.engine.observer = self.observer  # a ServiceClient predicts for the service's observer
+        if self.timeline:
+            self.timeline.clear()
+        if self.pass_predictor:
+            self.pass_predictor.wake()
+        # the tracker's rotator plan is for the old location
+        self.update_tracker()
 
         self.on_checkboxes_changed(0)
 
@@ -259,72 +350,127 @@ class MainApp(QMainWindow):
         # Download satellite info and save as statslist.csv
         self.get_satellite_info()
 
-        default = {'Satellite': '', 'Number': '', 'Transponder Uplink': [], 'Transponder Downlink': [], 'Uplinks': [],
-                   'Downlinks': [], 'Beacons': [], 'Modes': [], 'Callsign': '', 'Status': ''}
-        csv_field_names = ['Satellite', 'Number', 'Uplink', 'Downlink', 'Beacon', 'Mode', 'Callsign', 'Status']
+        satengine.satslist_csv_to_json('satslist.csv', 'satslist.json')
 
-        lines = file_lines('satslist.csv')
+        self.set_up_satellite_data()
 
-        # Generate the active satellites from the file
-        filter_active = (csv for csv in lines if csv.split(';')[7] == 'active' or 'operational')
+        QMessageBox.information(self, "Satellite Information",
+                                'Satellite information downloaded from JE9PEL,\nrestart application to take effect.',
+                                QMessageBox.Ok)
 
-        # create a list of dicts using a comprehension by zipping the key names
-        # with the csv items
-        active_sats_list = [dict(zip(csv_field_names, (s.strip() for s in sat.strip().split(';'))))
-                            for sat in filter_active]
+    @pyqtSlot(int)
+    @pyqtSlot()
+    def on_comboBoxSelectSatelllite_currentIndexChanged(self, *args):
+        """Re-draw graphs on change of current index."""
 
-        # remove duplicates by using satellite_name numbers
-        sat_number_list = []
-        for sat in active_sats_list[:]:
-            if sat['Number'] in sat_number_list:
-                active_sats_list.remove(sat)
-            else:
-                sat_number_list.append(sat['Number'])
+        self.draw_next_passes_for_selected_satellite()
+        self.selected_satellite_info()
+        self.doppler.setText('')
+        self.update_tracker()
+        if self.engine:
+            self.update_live_now()
 
-        sats_dict = {}
-        for s in active_sats_list:
+    @pyqtSlot(int)
+    def on_selected_frequency_changed(self, index):
+        """Track the newly selected frequency."""
 
-            sat_dict = default.copy()
-            for k in ['Satellite', 'Number', 'Callsign', 'Status']:
-                sat_dict[k] = s[k]
+        if self.tracker:
+            self.tracker.downlink = self.selected_frequency()
+            self.tracker.uplink = self.selected_uplink()
 
-            if s['Uplink']:
-                if '-' in s['Uplink']:
-                    sat_dict['Transponder Uplink'] = s['Uplink'].split('-')
-                else:
-                    sat_dict['Uplinks'] = s['Uplink'].split('/')
+    def selected_frequency(self):
+        """The frequency selected in the selected_frequencies combo box in Hz, or None."""
 
-            if s['Downlink']:
-                if '-' in s['Uplink']:
-                    sat_dict['Transponder Downlink'] = s['Downlink'].split('-')
-                else:
-                    sat_dict['Downlinks'] = s['Downlink'].split('/')
+        try:
+            return float(self.selected_frequencies.currentText()) * 1e6
+        except ValueError:
+            return None
 
-            if s['Beacon']:
-                sat_dict['Beacons'] = s['Beacon'].split('/')
+    def selected_uplink(self):
+        """The uplink frequency in Hz paired with the selected frequency, or None.
 
-            if s['Mode']:
-                sat_dict['Modes'] = s['Mode'].replace('bps ', 'bps:').split(' ')
+            A transponder downlink is paired with the transponder uplink at the
+            same place in the satellite's list, or its last, and any other
+            downlink with the satellite's first uplink.
+            """
 
-            sats_dict[s['Satellite']] = sat_dict
+        satellite_name = self.comboBoxSelectSatelllite.itemData(self.comboBoxSelectSatelllite.currentIndex())
+        s = self.satellites.get(satellite_name) if self.satellites else None
+        downlink = self.selected_frequencies.currentText()
+        if not s or not downlink:
+            return None
+
+        if downlink in s['Transponder Downlink'] and s['Transponder Uplink']:
+            uplinks = s['Transponder Uplink']
+            uplink = uplinks[min(s['Transponder Downlink'].index(downlink), len(uplinks) - 1)]
+        elif downlink in s['Downlinks'] and s['Uplinks']:
+            uplink = s['Uplinks'][0]
+        else:
+            return None
 
-        with open('satslist.json', 'w') as f:
-            json.dump(sats_dict, f)
+        try:
+            return float(uplink) * 1e6
+        except ValueError:
+            return None
 
-        self.set_up_satellite_data()
+    def update_tracker(self):
+        """(Re)start the Tracker for the selected satellite if
+            a rotator or rig is connected.
 
-        QMessageBox.information(self, "Satellite Information",
-                                'Satellite information downloaded from JE9PEL,\nrestart application to take effect.',
-                                QMessageBox.Ok)
+            Tracking needs the TLEs so is not available as a service client."""
 
-    @pyqtSlot(int)
-    @pyqtSlot()
-    def on_comboBoxSelectSatelllite_currentIndexChanged(self, *args):
-        """Re-draw graphs on change of current index."""
+        if self.tracker:
+            self.tracker.stop()
+            self.tracker = None
 
-        self.draw_next_passes_for_selected_satellite()
-        self.selected_satellite_info()
-        self.doppler.setText('')
+        if not (self.rotator or self.rig) or not isinstance(self.engine, satengine.PassEngine):
+            return
+
+        satellite_name = self.comboBoxSelectSatelllite.itemData(self.comboBoxSelectSatelllite.currentIndex())
+        if satellite_name is None:
+            return  # Will be None if combo box is cleared
+
+        try:
+            satellite = self.engine.catalog.satellite(satellite_name)
+        except ValueError:
+            return
+
+        self.tracker = Tracker(satellite, self.observer, self.rotator, self.rig,
+                               downlink=self.selected_frequency(), uplink=self.selected_uplink(),
+                               limits=self.rotator_limits())
+        self.tracker.start()
+
+    def rotator_limits(self):
+        """The RotatorLimits from the settings."""
+
+        # az_min, az_max, el_min, el_max, az_rate, el_rate
+        limits = [float(v) for v in self.settings.value('rotatorLimits', '0,450,0,90,6,6', type=str).split(',')]
+
+        return RotatorLimits(*limits)
+
+    def horizon_mask(self):
+        """The HorizonMask of the file of the 'horizonFile' setting, None for a flat horizon."""
+
+        path = self.settings.value('horizonFile', '', type=str)
+        if not path:
+            return None
+
+        try:
+            return satengine.HorizonMask.load(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, 'Horizon mask', f'Not loaded, using a flat horizon:\n{e}', QMessageBox.Ok)
+            return None
+
+    def weights_setting(self, key):
+        """A dict of name: weight from the setting `key`, e.g. 'AO-91:2,SO-50:0.5'."""
+
+        weights = {}
+        for item in self.settings.value(key, '', type=str).split(','):
+            name, separator, weight = item.rpartition(':')
+            if separator:
+                weights[name.strip()] = float(weight)
+
+        return weights
 
     def get_satellite_tles(self):
         """Get all the amateur satellite TLEs from celestrak.
@@ -332,13 +478,7 @@ class MainApp(QMainWindow):
             save the TLEs in text file satellites.tle.
             """
 
-        req = urllib.request.Request("http://celestrak.com/NORAD/elements/amateur.txt")
-        response = urllib.request.urlopen(req)
-        data = response.read().decode().splitlines()
-
-        with open('satellites.tle', 'w') as f:
-            for line in data:
-                f.write(line + '\n')
+        satengine.download(satengine.TLE_URL, 'satellites.tle')
 
     def get_satellite_info(self):
         """Get all the amateur satellite information from JE9PEL.
@@ -348,13 +488,7 @@ class MainApp(QMainWindow):
             save the info in csv file satslist.csv.
             """
 
-        req = urllib.request.Request("http://www.ne.jp/asahi/hamradio/je9pel/satslist.csv")
-        response = urllib.request.urlopen(req)
-        data = response.read().decode().splitlines()
-
-        with open('satslist.csv', 'w', encoding='utf-8') as f:
-            for line in data:
-                f.write(line + '\n')
+        satengine.download(satengine.SATSLIST_URL, 'satslist.csv', encoding='utf-8')
 
     def selected_satellite_info(self):
         """Display the info for the selected satellite in
@@ -403,24 +537,7 @@ class MainApp(QMainWindow):
             from the filtered satellites.
             """
 
-        mode_list = []
-
-        for s in self.satellites.values():
-            hasTransponder = self.checkBoxTransponder.isChecked() and s['Transponder Uplink']
-            hasUplink = self.checkBoxUplink.isChecked() and s['Uplinks']
-            hasDownlink = self.checkBoxDownlink.isChecked() and s['Downlinks']
-            hasBeacon = self.checkBoxBeacon.isChecked() and s['Beacons']
-
-            if any([hasTransponder, hasUplink, hasDownlink, hasBeacon]):
-
-                if s['Modes']:
-                    for m in s['Modes']:
-                        mode_list.append(m)
-
-        # Remove duplicates
-        mode_list = list(set(mode_list))
-
-        mode_list.sort()
+        mode_list = self.engine.catalog.modes(self.satellite_filter())
 
         # Fill mode combo box
         self.comboBoxMode.clear()
@@ -429,51 +546,24 @@ class MainApp(QMainWindow):
             self.comboBoxMode.addItem(mode)
         self.comboBoxMode.setCurrentIndex(0)
 
+    def satellite_filter(self):
+        """Returns a satengine.SatelliteFilter with the state of
+            the check boxes and mode combo box."""
+
+        return satengine.SatelliteFilter(transponder=self.checkBoxTransponder.isChecked(),
+                                         uplink=self.checkBoxUplink.isChecked(),
+                                         downlink=self.checkBoxDownlink.isChecked(),
+                                         beacon=self.checkBoxBeacon.isChecked(),
+                                         mode=self.comboBoxMode.currentText())
+
     def satellites_filtered_by_check_boxes(self, dont_filter=False):
         """Generator to provide self.satellites filtered by state of
             the check boxes.
 
             yields -> a satellite dict
             """
-        mode = self.comboBoxMode.currentText()
-        for s in self.satellites.values():
-            hasTransponder = self.checkBoxTransponder.isChecked() and s['Transponder Uplink']
-            hasUplink = self.checkBoxUplink.isChecked() and s['Uplinks']
-            hasDownlink = self.checkBoxDownlink.isChecked() and s['Downlinks']
-            hasBeacon = self.checkBoxBeacon.isChecked() and s['Beacons']
-            hasMode = (mode == 'Any') or (mode in s['Modes'])
-
-            if any([hasTransponder, hasUplink, hasDownlink, hasBeacon, dont_filter]) and hasMode:
-                yield s
-
-    def transit_list_sorted_by_time(self, sort=True):
-        """:returns: [rise time: Julian, transit time: Julian, set time: Julian,
-                        satellite name: string]
-            """
-        transit_list = []
-
-        for v in self.satellites_filtered_by_check_boxes():
-            sat = v['Satellite']
-            pass_list = self.get_next_passes(sat, self.spinBoxNextPasses.value())
-
-            pass_info = [0, 0, 0, sat]
-            for pass_event in pass_list:
-                if pass_event[1] == 'rise':
-                    pass_info[0] = pass_event[0].tt
-                elif pass_event[1] == 'transit':
-                    pass_info[1] = pass_event[0].tt
-                elif pass_event[1] == 'set':
-                    pass_info[2] = pass_event[0].tt
-                    transit_list.append(pass_info)
-                    pass_info = [0, 0, 0, sat]
 
-            if not pass_list:
-                transit_list.append([0, 0, 0, sat])
-
-        if sort:
-            transit_list.sort()
-
-        return transit_list
+        yield from self.engine.catalog.filtered(self.satellite_filter(), dont_filter)
 
     def fill_select_satellite_combo(self, dontFilter=False):
         """Fills the Select Satellite combo box with the satellites in the TLE."""
@@ -498,35 +588,31 @@ class MainApp(QMainWindow):
     def set_up_satellite_data(self):
         """Set up the satellite data."""
 
-        # Get the satelliteBodyObjects from the TLEs file
-        stations_url = 'http://celestrak.com/NORAD/elements/amateur.txt'
-        self.satellite_body_objects = load.tle_file(stations_url)
-
-        self.by_number = {sat.model.satnum : sat for sat in self.satellite_body_objects}
-
-        # Get the satellite data from the json file
-        with open('satslist.json', 'r') as f:
-            self.satellite_data = json.load(f)
+        # Get the satellites where we have both TLEs and satellite_name info
+        if self.service_url:
+            self.engine = satengine.ServiceClient(self.service_url)
+            catalog = self.engine.catalog
+        else:
+            catalog = satengine.Catalog.load(satengine.TLE_URL, 'satslist.json')
+            self.engine = satengine.PassEngine(catalog, self.observer)
 
-        # Merge the two
+        self.satellites = catalog.satellites
+        self.by_number = catalog.by_number
+        self.satellite_body_objects = list(self.by_number.values())
 
-        # list of NORAD numbers in self.satelliteBodyObjects
-        numbers = {sat.model.satnum: sat for sat in self.satellite_body_objects}
+        self.pass_database = satengine.PassDatabase(PASS_DATABASE)
+        self.pass_predictor = satengine.PassPredictor(self.pass_database, self.engine, list(self.satellites),
+                                                      PASS_DAYS)
+        self.pass_predictor.start()
 
-        # Create a dict of satellite_data dicts where the NORAD numbers are also
-        # in satellite_body_objects, i.e. where we have both TLEs and satellite_name info
-        self.satellites = {s: self.satellite_data[s] for s in self.satellite_data
-                           if (self.satellite_data[s]['Number'] in str(numbers.keys())
-                               and self.satellite_data[s]['Status'] in ['active', 'operational'])}
+        self.timeline = satengine.PassTimeline(self.engine, database=self.pass_database)
 
         # Fill the modes and Select Satellite combo boxes
         self.fill_combo_box_with_list_of_modes()
         self.fill_select_satellite_combo()
 
-        # Start the Auto-updater
-        self.auto_update_timer = QTimer()
-        self.auto_update_timer.timeout.connect(self.on_auto_update_timer)
-        self.auto_update_timer.start(1 * 1000)
+        # Start the live updates
+        self.update_live_now()
 
         # Start the clock-updater
         self.clock_update_timer = QTimer()
@@ -534,36 +620,96 @@ class MainApp(QMainWindow):
         self.clock_update_timer.start(1000)
 
     @pyqtSlot()
-    def on_auto_update_timer(self):
-        """Method called by the auto_update_timer.
+    def on_live_update(self):
+        """Method called by the live_update_timer.
 
-            Updates the coming_passes graph, current_pass graph and Doppler shifts at regular intervals.
-            `draw_upcoming_passes` and `draw_current_pass_and_doppler` methods are not called
-            on the same update to improve program responsiveness.
+            Updates the upcoming passes graph, the current pass graph and
+            Doppler shifts whose deadlines have passed, then sets their next
+            deadlines from what is up, see live_interval, and sleeps until
+            the first deadline or the next AOS or LOS, whichever is sooner.
             """
 
-        if (self.toggle % 10) == 0:  # Every 10 timer calls
+        now = time.monotonic()
+
+        if now >= self.live_deadlines['upcoming']:
             self.draw_upcoming_passes()
+            self.live_deadlines['upcoming'] = now + UPCOMING_UPDATE
 
-        elif not (self.toggle % 2 == 0):  # Every odd timer call
+        if now >= self.live_deadlines['current']:
             self.draw_current_pass_and_doppler()
+            self.live_deadlines['current'] = now + self.live_interval()
+
+        wake = min(self.live_deadlines.values())
+
+        next_event = self.seconds_to_next_event()
+        if next_event is not None and now + next_event < wake:
+            # wake just after the AOS or LOS and update everything
+            wake = now + next_event + 0.01
+            for task in self.live_deadlines:
+                self.live_deadlines[task] = wake
+
+        self.live_update_timer.start(max(0, math.ceil((wake - time.monotonic()) * 1000)))
+
+    def update_live_now(self):
+        """Run the live updates now, e.g. when the selected satellite has changed."""
 
-        self.toggle += 1
+        for task in self.live_deadlines:
+            self.live_deadlines[task] = 0.0
+        self.live_update_timer.start(0)
+
+    def live_interval(self):
+        """Seconds until the next update of the current pass graph and Doppler shift,
+            from the passes in progress in the transit list of the last upcoming passes update."""
+
+        now = ts.now().tt
+        selected_satellite = self.comboBoxSelectSatelllite.itemData(self.comboBoxSelectSatelllite.currentIndex())
+
+        up = {name for rise, transit, setting, name, max_altitude in self.live_transits if rise <= now < setting}
+        if selected_satellite in up:
+            return PASS_UPDATE
+        if up:
+            return UP_UPDATE
+        if any(now < transit_info[0] < now + 1 / 24 for transit_info in self.live_transits):
+            return SOON_UPDATE
+
+        return IDLE_UPDATE
+
+    def seconds_to_next_event(self):
+        """Seconds to the next AOS or LOS in the transit list of the last upcoming passes update, or None."""
+
+        now = ts.now().tt
+        events = [t for transit_info in self.live_transits for t in (transit_info[0], transit_info[2]) if t > now]
+        if not events:
+            return None
+
+        return (min(events) - now) / JULIAN_SEC
 
     def draw_current_pass_and_doppler(self):
-        """Updates the current_pass graph and Doppler shifts."""
+        """Updates the current_pass graph and Doppler shifts.
+
+            The pass track is unchanged, so only the satellite markers
+            are moved on the current pass scene, in one repaint.
+
+            With the marker animation, the tracks of the satellites that
+            are up over the next MARKER_TRACK_SECONDS are computed and the
+            markers are moved along them at the frame rate of the animation."""
 
         up_positions = []
+        up_tracks = []  # (alts, azs) of each of the up_positions, for the marker animation
         dynamic_lines = []
+        end_of_pass = False
         selected_satellite = self.comboBoxSelectSatelllite.itemData(
             self.comboBoxSelectSatelllite.currentIndex())
 
         if selected_satellite is None:
             return  # Will be None if combo box is cleared
 
+        calc_time = ts.now().tt
+        now = time.monotonic()
+        track_times = None
+
         for v in self.satellites_filtered_by_check_boxes():
             satellite_name = v['Satellite']
-            calc_time = ts.now().tt
             alt, az, slant_velocity = self.get_alt_azimuth(calc_time, satellite_name)
 
             if satellite_name == selected_satellite:
@@ -576,7 +722,10 @@ class MainApp(QMainWindow):
 
                 if len(pass_list) == 3:
                     time_from_now = (pass_list[0][0].tt - calc_time) * 24 * 60
-                    time_from_now_str = str(timedelta(minutes=time_from_now))[:-7]
+                    if time_from_now > 60:  # updated every minute or so, see live_interval
+                        time_from_now_str = str(timedelta(minutes=round(time_from_now)))[:-3]
+                    else:
+                        time_from_now_str = str(timedelta(minutes=time_from_now))[:-7]
                     self.current_pass_graph.add_text_by_proportion(
                         f' {satellite_name} rises in {time_from_now_str} from now', 0, 0.02, 'blue')
                     end_of_pass = False
@@ -590,29 +739,47 @@ class MainApp(QMainWindow):
 
             if alt.degrees >= 0:
 
+                if self.marker_animation:
+                    track_times, alts, azs, velocities = self.engine.pass_track(
+                        satellite_name, calc_time, calc_time + MARKER_TRACK_SECONDS * JULIAN_SEC, MARKER_TRACK_STEP)
+                    track = (alts.clip(0, None), azs)  # not below the horizon before the next update
+                else:
+                    track = None
+
                 up_positions.append((alt.degrees, az.radians, 'grey', 8, f' {satellite_name}'))  # append tuple
+                up_tracks.append(track)
                 if satellite_name == selected_satellite:
 
-                    doppler_shift_2m = -slant_velocity / 300000 * 145.9e6
-                    # doppler_shift_100 = -slant_velocity / 300000 * 100e6  # 145.9e6
+                    doppler_shift_2m = satengine.doppler_shift(slant_velocity, 145.9e6)
+                    # doppler_shift_100 = satengine.doppler_shift(slant_velocity, 100e6)
 
-                    doppler_shift_70cm = -slant_velocity / 300000 * 436.5e6
+                    doppler_shift_70cm = satengine.doppler_shift(slant_velocity, 436.5e6)
 
-                    selected_doppler_shift = -slant_velocity / 300e3 * float(
-                        self.selected_frequencies.currentText()) * 1e6
+                    selected_doppler_shift = satengine.doppler_shift(
+                        slant_velocity, float(self.selected_frequencies.currentText()) * 1e6)
 
                     up_positions.append((alt.degrees, az.radians, 'black', 8,
                                          f' {satellite_name}'))
+                    up_tracks.append(track)
                                          # f' {satellite_name}: 2: {doppler_shift_2m:+0.0f}, 70: {doppler_shift_70cm:+0.0f} Hz '))
 
                     self.doppler.setText(f'{selected_doppler_shift:+0.0f}')
         if self.lines:
             dynamic_lines.append(self.lines[0])
-        for up in up_positions:
-            dynamic_lines.append([up])
 
-            self.current_pass_graph.draw(*dynamic_lines)
-        self.update()
+        if self.marker_animation and up_positions:
+            self.marker_animation.set_tracks(now + (track_times - calc_time) / JULIAN_SEC,
+                                             [alts for alts, azs in up_tracks],
+                                             [azs for alts, azs in up_tracks],
+                                             [up[2:] for up in up_positions], dynamic_lines)
+        else:
+            if self.marker_animation:
+                self.marker_animation.stop()
+
+            for up in up_positions:
+                dynamic_lines.append([up])
+
+            self.frames.schedule(self.current_pass_graph, *dynamic_lines)
 
         if end_of_pass:
             self.redraw_timer = QTimer()
@@ -627,7 +794,20 @@ class MainApp(QMainWindow):
 
         now = QDateTime.currentDateTime().toString()
         now_utc = QDateTime.currentDateTimeUtc().toString()
-        self.statusBar().showMessage(f'{now} Local, {now_utc}')
+        message = f'{now} Local, {now_utc}'
+
+        if self.tracker:
+            stats = self.tracker.statistics()
+            message += (f'   Tracking az: {self.tracker.state.get("az", 0):5.1f}° '
+                        f'el: {self.tracker.state.get("el", 0):4.1f}° '
+                        f'jitter p95: {stats["jitter"]["p95"]:0.1f} ms '
+                        f'latency p95: {max(stats["rotator_latency"]["p95"], stats["rig_latency"]["p95"]):0.1f} ms')
+            if self.tracker.plan:
+                message += f' {self.tracker.plan.mode} max error: {self.tracker.plan.max_error:0.1f}°'
+            if stats['errors']:
+                message += f' errors: {stats["errors"]}'
+
+        self.statusBar().showMessage(message)
 
     def create_pass_line(self, sat, rise_time, setting_time, interval, colour, text_every_point=10):
         """Create an orbit transit line of a satellite pass
@@ -636,91 +816,43 @@ class MainApp(QMainWindow):
             satellite -> an  artificial satellite name : string
             rise_time -> a ts, the time of rise of satellite above the horizon.
             setting_time -> a ts, the time of setting of satellite below the horizon.
-            interval -> Time interval between points, in seconds.
+            interval -> Time interval between label steps, in seconds.
             colour -> colour of the line and texts.
-            text_every_point -> number of points between texts being added to the points.
+            text_every_point -> number of intervals between texts being added to the points.
                 The last point also has a text.
                 If zero, no texts are added.
 
-            """
-
-        pass_line = []
+            The points of the track are placed where it bends, to within
+            TRACK_ERROR degrees, with a point at each text time.
 
-        point_number = 0
-
-        calc_time = rise_time.tt
-
-        while True:
-            text_field = ''
-
-            alt, az, velocity = self.get_alt_azimuth(calc_time, sat)
-
-            # See if point should have a text field
-            iso = ts.tt_jd(calc_time).utc_iso()[11:-1]
-            if text_every_point and (point_number % text_every_point == 0):
-                text_field = f' {iso}'
-
-            pass_line.append([alt.degrees, az.radians, colour, 4, text_field])
-
-            calc_time += JULIAN_SEC * interval
+            Returns: Line of altitude, azimuth (radians)
+            """
 
-            if calc_time > setting_time.tt:
-                break
+        label_interval = interval * text_every_point if text_every_point else None
+        times, alts, azs, velocities = self.engine.adaptive_pass_track(sat, rise_time.tt, setting_time.tt,
+                                                                       TRACK_ERROR, label_interval)
 
-            point_number += 1
+        labels = {}
+        if label_interval and len(times):  # the track must not be empty
+            label_times = set(satengine.pass_times(rise_time.tt, setting_time.tt, label_interval).tolist())
+            for point_number, point_time in enumerate(times.tolist()):
+                if point_time in label_times:
+                    labels[point_number] = f' {satengine.utc_iso(point_time)[11:-1]}'
 
-        if text_every_point and pass_line:  # pass_line must not be empty
-            pass_line[-1][4] = f' {setting_time.utc_iso()[11:-1]}'  # Last point has text field
+            labels[len(times) - 1] = f' {setting_time.utc_iso()[11:-1]}'  # Last point has text field
 
-        return pass_line
+        return Line(alts, azs, colour, 4, labels)
 
     def get_alt_azimuth(self, calc_time, satellite_name):
+        """Returns: alt: Angle, az: Angle, slant velocity: km/sec"""
 
-
-        try:
-            satellite_number = self.satellites[satellite_name]['Number']
-            satellite = self.by_number[int(satellite_number)]
-        except ValueError:
-            return Angle(degrees=0), Angle(degrees=0), 0
-
-        difference = satellite - home
-        topocentric = difference.at(ts.tt_jd(calc_time))
-        pos = topocentric.position.km
-        alt, az, distance = topocentric.altaz()
-        velocity = topocentric.velocity.km_per_s
-
-        d = np.dot(velocity, pos) / np.linalg.norm(pos)  # slant velocity km/sec
-
-        return alt, az, d
+        return self.engine.alt_azimuth(satellite_name, calc_time)
 
     def get_next_passes(self, satellite_name, number_of_passes):
 
         """Returns: event_list: list"""
 
-        event_list = []
-
-        now_ts = ts.now()
-        try:
-            satellite_number = self.satellites[satellite_name]['Number']
-            satellite = self.by_number[int(satellite_number)]
-
-            end_ts = ts.tt_jd(now_ts.tt + 1)
-
-            event_times_ts, events = satellite.find_events(home, now_ts, end_ts, altitude_degrees=0.0)
-
-            passes = 0
-
-            for ti, event in zip(event_times_ts, events):
-                if passes >= number_of_passes:
-                    break
-                event_name = ('rise', 'transit', 'set')[event]
-                event_list.append((ti, event_name))
-                if event_name == 'set':
-                    passes += 1
-        except ValueError:
-            event_list = []
-
-        return event_list
+        return self.engine.next_passes(satellite_name, number_of_passes)
 
     def draw_next_passes_for_selected_satellite(self):
         """Draws the next passes for the selected satellite on the polar graphs."""
@@ -754,50 +886,45 @@ class MainApp(QMainWindow):
 
                 if p == 0:
                     self.lines.append(self.create_pass_line(
-                        satellite_name, rise_ts, set_ts, 30, plot_colours[0], 4)[:])
+                        satellite_name, rise_ts, set_ts, 30, plot_colours[0], 4))
 
                 self.next_pass_polar_lines.append(
                     self.create_pass_line(
-                        satellite_name, rise_ts, set_ts, 30, plot_colours[p % len(plot_colours)], 4)[:])
+                        satellite_name, rise_ts, set_ts, 30, plot_colours[p % len(plot_colours)], 4))
                 p += 1
 
-        self.current_pass_graph.draw(*self.lines)
-
-        self.next_passes_graph.draw(*self.next_pass_polar_lines)
-
-        self.update()
+        self.frames.schedule(self.current_pass_graph, *self.lines)
+        self.frames.schedule(self.next_passes_graph, *self.next_pass_polar_lines)
 
     def draw_upcoming_passes(self):
         """Draws the next pass for the selected satellites
-            on the upcoming passes graph."""
+            on the upcoming passes graph.
 
-        transit_list = self.transit_list_sorted_by_time(sort=False)
+            The passes are kept by the timeline, which only takes the
+            passes that come within hours_to_show from the pass database,
+            so a redraw between passes only moves the bars along to now."""
 
-        self.next_pass_lines = []
-
-        for transit in transit_list:
-            now = ts.now().tt  # Julian
-            if  not transit[0]:
-                transit[0] = now
+        now = ts.now().tt  # Julian
+        satellite_names = [v['Satellite'] for v in self.satellites_filtered_by_check_boxes()]
+        self.timeline.update(satellite_names, now, self.hours_to_show / 24)
+        transit_list = self.timeline.transit_list()
 
-            if transit[1]:
-                alt, az, velocity = self.get_alt_azimuth(transit[1], transit[3])
-            else:
-                alt, az, velocity = self.get_alt_azimuth(now, transit[3])
+        self.next_pass_lines = []
 
-            rise_delta = transit[0] - now
-            set_delta = transit[2] - now
+        for rise, transit, setting, satellite_name, max_altitude in transit_list:
+            rise_delta = max(rise, now) - now  # a pass in progress starts now
+            set_delta = setting - now
 
             if (set_delta* 24) < self.hours_to_show:
-                self.next_pass_lines.append([(rise_delta * 24., alt.degrees, 'purple', 6),  # Start point
-                                     (set_delta * 24., alt.degrees, 'purple', 6, ' ' + transit[3])]
-                                    )
+                self.next_pass_lines.append(Line((rise_delta * 24., set_delta * 24.),  # Start, end points
+                                                 (max_altitude, max_altitude),
+                                                 'purple', 6, {1: ' ' + satellite_name}))
 
-        # Tell the MainApp to plot the lines on the graphs
-        # A list of line lists of point tuples
-        self.upcoming_passes_graph.draw(*self.next_pass_lines)
+        self.live_transits = transit_list
 
-        self.update()
+        # Tell the MainApp to plot the lines on the graphs
+        # A list of Lines
+        self.frames.schedule(self.upcoming_passes_graph, *self.next_pass_lines)
 
 
     def display_next_passes_for_selected_satellite(self):
@@ -813,46 +940,65 @@ class MainApp(QMainWindow):
         self.display_on_selected_satellite_passes(f'Next passes for satellite: {satellite_name}', colour='purple')
         self.display_on_selected_satellite_passes()
 
-        transit_list = []
+        frequency = self.selected_frequency()
+        frequencies = (frequency,) if frequency else satengine.REFERENCE_FREQUENCIES
 
-        pass_list = self.get_next_passes(satellite_name, 10)
+        now = ts.now().tt
+        pass_details = self.engine.next_pass_details(satellite_name, 10, now)
 
-        pass_info = [0, 0, 0, satellite_name]
-        for pass_event in pass_list:
-            if pass_event[1] == 'rise':
-                pass_info[0] = pass_event[0].tt
-            elif pass_event[1] == 'transit':
-                pass_info[1] = pass_event[0].tt
-            elif pass_event[1] == 'set':
-                pass_info[2] = pass_event[0].tt
-                transit_list.append(pass_info)
-                pass_info = [0, 0, 0, satellite_name]
+        for details, light in zip(pass_details, self.pass_lights(pass_details, now)):
+            for line in self.pass_report(details, frequencies, light):
+                self.display_on_selected_satellite_passes(line, colour='darkgreen')
 
-        transit_list.sort()
+            self.display_on_selected_satellite_passes()
 
-        for transit in transit_list:
-            if transit[0]:
-                rise_time = ts.tt_jd(transit[0]).utc_iso(' ')
-                alt, az, velocity = self.get_alt_azimuth(transit[0], transit[3])
+        self.scroll_selected_satellite_passes_display(0)
 
-                self.display_on_selected_satellite_passes(f'Rise    : {rise_time} az: {az.degrees:5.1f}°', colour='darkgreen')
 
-            if transit[1]:
-                transit_time = ts.tt_jd(transit[1]).utc_iso(' ')
-                alt, az, velocity = self.get_alt_azimuth(transit[1], transit[3])
+    def pass_lights(self, pass_details, now):
+        """The PassIllumination of each of `pass_details`, computed for each satellite in one call."""
 
-                self.display_on_selected_satellite_passes(f'Transit : {transit_time} az: {az.degrees:5.1f}° alt: {alt.degrees:4.1f}°', colour='darkgreen')
+        by_satellite = {}
+        for details in pass_details:
+            by_satellite.setdefault(details.satellite, []).append(details.record)
 
-            if transit[2]:
-                set_time = ts.tt_jd(transit[2]).utc_iso(' ')
-                alt, az, velocity = self.get_alt_azimuth(transit[2], transit[3])
+        lights = {}
+        for satellite_name, passes in by_satellite.items():
+            for light in self.engine.pass_illumination(satellite_name, passes, now):
+                lights[satellite_name, light.rise, light.setting] = light
 
-                self.display_on_selected_satellite_passes(f'Set     : {set_time} az: {az.degrees:5.1f}°', colour='darkgreen')
+        return [lights.get((details.satellite, details.rise, details.setting)) for details in pass_details]
 
-            self.display_on_selected_satellite_passes()
+    def pass_report(self, details, frequencies, light=None):
+        """The lines of text describing a pass, from its PassDetails,
+            with the Doppler shift and its rate for each of `frequencies` (Hz)
+            and, with its PassIllumination `light`, when it is sunlit and can be seen."""
 
-        self.scroll_selected_satellite_passes_display(0)
+        lines = []
+        if details.rise:
+            rise_time = ts.tt_jd(details.rise).utc_iso(' ')
+            lines.append(f'Rise    : {rise_time} az: {details.aos_az:5.1f}°')
+        if details.transit:
+            transit_time = ts.tt_jd(details.transit).utc_iso(' ')
+            lines.append(f'Transit : {transit_time} az: {details.transit_az:5.1f}° alt: {details.max_altitude:4.1f}°')
+        set_time = ts.tt_jd(details.setting).utc_iso(' ')
+        lines.append(f'Set     : {set_time} az: {details.los_az:5.1f}°')
 
+        duration = f'{details.duration / 60:0.1f} min, ' if details.rise else ''
+        lines.append(f'{duration}range: {details.min_range:0.0f} km')
+        for frequency in frequencies:
+            lines.append(f'{frequency / 1e6:0.3f} MHz Doppler: ±{details.doppler(frequency):0.0f} Hz, '
+                         f'±{details.doppler_rate(frequency):0.1f} Hz/s')
+
+        if light is not None:
+            sunlit = f'Sunlit: {light.sunlit_fraction:0.0%}'
+            if light.visible:
+                first, last = light.visible[0][0], light.visible[-1][1]
+                sunlit += (f', visible {ts.tt_jd(first).utc_strftime("%H:%M:%S")}'
+                           f' - {ts.tt_jd(last).utc_strftime("%H:%M:%S")}')
+            lines.append(sunlit)
+
+        return lines
 
     def load_tles(self):
         """Get all the amateur satellite TLEs from celestrak and
@@ -860,8 +1006,17 @@ class MainApp(QMainWindow):
             """
 
         # Get the satelliteBodyObjects from the TLEs file
-        stations_url = 'http://celestrak.com/NORAD/elements/amateur.txt'
-        self.satellite_body_objects = load.tle_file(stations_url)
+        if self.service_url:
+            catalog = self.engine.load_catalog()  # the service loads its own TLEs
+        else:
+            catalog = satengine.Catalog.load(satengine.TLE_URL, 'satslist.json')
+            self.engine.catalog = catalog
+        self.timeline.clear()
+        self.pass_predictor.set_satellites(list(catalog.satellites))
+
+        self.satellites = catalog.satellites
+        self.by_number = catalog.by_number
+        self.satellite_body_objects = list(self.by_number.values())
 
         QMessageBox.information(self, "Ephemera",
                                 'TLEs Downloaded!',
@@ -872,30 +1027,50 @@ class MainApp(QMainWindow):
             using `self.display_on_upcoming_passes()`.
             """
 
-        transit_list = self.transit_list_sorted_by_time()
-
-        for transit in transit_list:
-            if transit[0] or transit[1] or transit[2]:
-                self.display_on_upcoming_passes()
-                self.display_on_upcoming_passes(f'Pass for satellite: {transit[3]}', colour='purple')
+        now = ts.now().tt
+        satellite_names = [v['Satellite'] for v in self.satellites_filtered_by_check_boxes()]
+        pass_details = self.pass_database.pass_details(self.engine, satellite_names, now,
+                                                       number_of_passes=self.spinBoxNextPasses.value())
 
-            if transit[0]:
-                rise_time = ts.tt_jd(transit[0]).utc_iso(' ')
-                alt, az, velocity = self.get_alt_azimuth(transit[0], transit[3])
-                self.display_on_upcoming_passes(f'Rise    : {rise_time} az: {az.degrees:5.1f}°', colour='darkgreen')
+        for details, light in zip(pass_details, self.pass_lights(pass_details, now)):
+            self.display_on_upcoming_passes()
+            self.display_on_upcoming_passes(f'Pass for satellite: {details.satellite}', colour='purple')
 
-            if transit[1]:
-                transit_time = ts.tt_jd(transit[1]).utc_iso(' ')
-                alt, az, velocity = self.get_alt_azimuth(transit[1], transit[3])
-                self.display_on_upcoming_passes(f'Transit : {transit_time} az: {az.degrees:5.1f}° alt: {alt.degrees:4.1f}°', colour='darkgreen')
+            for line in self.pass_report(details, satengine.REFERENCE_FREQUENCIES, light):
+                self.display_on_upcoming_passes(line, colour='darkgreen')
 
-            if transit[2]:
-                set_time = ts.tt_jd(transit[2]).utc_iso(' ')
-                alt, az, velocity = self.get_alt_azimuth(transit[2], transit[3])
-                self.display_on_upcoming_passes(f'Set     : {set_time} az: {az.degrees:5.1f}°', colour='darkgreen')
+        self.display_schedule()
 
         self.scroll_upcoming_passes_display(0)
 
+    def display_schedule(self):
+        """Displays the passes of the selected satellites over the next day
+            that one antenna can work, chosen by satengine.plan_schedule.
+
+            The passes are weighted by their length and maximum altitude
+            and by the 'satellitePriorities' and 'modeWeights' settings,
+            e.g. 'AO-91:2' and 'FM:2,CW:0.5'.
+            """
+
+        now = ts.now().tt
+        satellites = list(self.satellites_filtered_by_check_boxes())
+        pass_details = self.pass_database.pass_details(self.engine, [s['Satellite'] for s in satellites], now)
+        transit_list = [details.record for details in pass_details]
+
+        priorities = satengine.satellite_priorities(satellites, self.weights_setting('satellitePriorities'),
+                                                    self.weights_setting('modeWeights'))
+        chosen = satengine.plan_schedule(transit_list, self.rotator_limits(), priorities, now,
+                                         [details.aos_az for details in pass_details])
+
+        self.display_on_upcoming_passes()
+        self.display_on_upcoming_passes(f'Schedule for one antenna: {len(chosen)} of {len(transit_list)} passes',
+                                        colour='purple')
+        for rise, transit, setting, satellite_name, max_altitude in chosen:
+            rise_time = ts.tt_jd(max(rise, now)).utc_strftime('%Y-%m-%d %H:%M')
+            set_time = ts.tt_jd(setting).utc_strftime('%H:%M')
+            self.display_on_upcoming_passes(f'{rise_time} - {set_time} {satellite_name} alt: {max_altitude:4.1f}°',
+                                            colour='darkgreen')
+
     def closeEvent(self, event):
         """Extends inherited QMainWindow closeEvent.
 
@@ -905,51 +1080,82 @@ class MainApp(QMainWindow):
             Accepts the event which closes the application.
             """
 
+        self.write_settings()
         self.settings.setValue("geometry", self.saveGeometry())
+
+        if self.tracker:
+            self.tracker.stop()
+        if self.pass_predictor:
+            self.pass_predictor.stop()
+            self.pass_database.close()
+        self.renderer.stop()
+
         event.accept()
         super().closeEvent(event)
 
     def resizeEvent(self, event):
         """Extends inherited QMainWindow resize event.
 
-            re-draws the graph to fill the new scroller size."""
+            stretches the graphs to fill the new scroller sizes,
+            they are re-drawn when the resizing stops."""
 
-        self.settings.setValue("geometry", self.saveGeometry())
+        self.save_setting('geometry')
 
-        self.update_graph_sizes()
+        self.stretch_graphs()
 
         super().resizeEvent(event)
 
     def moveEvent(self, event):
         """Extends inherited QMainWindow move event."""
 
-        self.settings.setValue("geometry", self.saveGeometry())
+        self.save_setting('geometry')
 
         super().moveEvent(event)
 
-    def update_graph_sizes(self):
-        """Re-draw the graphs at the new sizes."""
+    def save_setting(self, key, value=None):
+        """Save setting `key` with the next batch of settings.
+
+            The geometry is read when the settings are written."""
+
+        self.pending_settings[key] = value
+        self.settings_timer.start()
 
-        if self.upcoming_passes_graph:
-            # find the size that the graph will be re-drawn
-            x_size = self.scrollArea.width() - 4
-            y_size = self.scrollArea.height() - 4
+    def write_settings(self):
+        """Write the pending settings."""
 
-            self.upcoming_passes_graph = reCreateGraph(self.upcoming_passes_graph, x_size, y_size)
+        for key, value in self.pending_settings.items():
+            if key == 'geometry':
+                value = self.saveGeometry()
+            self.settings.setValue(key, value)
 
-        if self.next_passes_graph:
-            # find the size that the graph will be re-drawn
-            x_size = self.scrollAreaShowPasses.width() - 4
-            y_size = self.scrollAreaShowPasses.height() - 4
+        self.pending_settings = {}
 
-            self.next_passes_graph = reCreateGraph(self.next_passes_graph, x_size, y_size)
+    def graph_sizes(self):
+        """Generator of (graph, x size, y size) of the graphs to fill their scroll areas."""
 
-        if self.current_pass_graph:
-            # find the size that the graph will be re-drawn
-            x_size = self.scrollAreaCurrentPass.width() - 4
-            y_size = self.scrollAreaCurrentPass.height() - 4
+        for graph, scroll_area in ((self.upcoming_passes_graph, self.scrollArea),
+                                   (self.next_passes_graph, self.scrollAreaShowPasses),
+                                   (self.current_pass_graph, self.scrollAreaCurrentPass)):
+            if graph:
+                yield graph, scroll_area.width() - 4, scroll_area.height() - 4
 
-            self.current_pass_graph = reCreateGraph(self.current_pass_graph, x_size, y_size)
+    def stretch_graphs(self):
+        """Stretch the last drawn graphs to the new sizes while resizing,
+            and re-draw them when the resizing stops."""
+
+        for graph, x_size, y_size in self.graph_sizes():
+            graph.stretch(x_size, y_size)
+
+        self.resize_timer.start()  # restarted by each resize
+
+    def update_graph_sizes(self):
+        """Re-draw the graphs at the new sizes."""
+
+        for graph, x_size, y_size in self.graph_sizes():
+            if (x_size, y_size) != (graph.image_size_x, graph.image_size_y):
+                graph.resize(x_size, y_size)
+
+            self.frames.redraw(graph)
 
     def draw_graphs(self):
         """Draw the graphs on the MainApp ScrollAreas
@@ -970,6 +1176,8 @@ class MainApp(QMainWindow):
                                                text_pixel_size=22,
                                                background=QColor(240, 250, 255))
 
+            self.upcoming_passes_graph.renderer = self.renderer
+            self.upcoming_passes_graph.level_of_detail = True
             self.upcoming_passes_graph.set_grid_label_format('{:0.1f}', '{:0.0f}°')
 
             self.upcoming_passes_graph.add_text('          Upcoming Satellites', 0, 95, 'purple', True)
@@ -991,6 +1199,8 @@ class MainApp(QMainWindow):
                                            text_pixel_size=20,
                                            background=QColor('mintcream'))
 
+            self.next_passes_graph.renderer = self.renderer
+            self.next_passes_graph.level_of_detail = True
             self.next_passes_graph.set_grid_label_format('{:0.0f}°', '{:0.0f}°')
 
             self.next_passes_graph.add_polar_text('Azimuth', 0, math.radians(45), 'red', True)
@@ -1007,11 +1217,14 @@ class MainApp(QMainWindow):
 
         if not self.current_pass_graph:
             # create the graph
-            self.current_pass_graph = Polar(self.labelPolarCurrentPass,
-                                            size_x=xSize, size_y=ySize,
-                                            text_pixel_size=20,
-                                            background=QColor('#FFFEFE'))
-
+            self.current_pass_graph = PolarScene(self.viewPolarCurrentPass,
+                                                 size_x=xSize, size_y=ySize,
+                                                 text_pixel_size=20,
+                                                 background=QColor('#FFFEFE'))
+
+            self.current_pass_graph.level_of_detail = True
+            if ANIMATION_FPS:
+                self.marker_animation = MarkerAnimation(self.current_pass_graph, ANIMATION_FPS, parent=self)
             self.current_pass_graph.set_grid_label_format('{:0.0f}°', '{:0.0f}°')
 
             self.current_pass_graph.add_polar_text('Azimuth', 0, math.radians(45), 'red', True)
@@ -1025,25 +1238,25 @@ class MainApp(QMainWindow):
     def on_splitterV_splitterMoved(self, pos, index):
         """Slot triggered when the splitter is moved.
 
-            re-draws the graph to fill the new scroller size,
+            stretches the graphs to fill the new scroller sizes,
             saves the new position."""
 
         self.splitter_v_position = pos
 
-        self.update_graph_sizes()
+        self.stretch_graphs()
 
-        self.settings.setValue('splitterVposn', self.splitter_v_position)
+        self.save_setting('splitterVposn', self.splitter_v_position)
 
     @pyqtSlot(int, int)
     def on_splitterH_splitterMoved(self, pos, index):
         """Slot triggered when the splitter is moved.
 
-            re-draws the graph to fill the new scroller size,
+            stretches the graphs to fill the new scroller sizes,
             saves the new positions."""
 
-        self.update_graph_sizes()
+        self.stretch_graphs()
 
-        self.settings.setValue(f'splitterHposn{index}', pos)
+        self.save_setting(f'splitterHposn{index}', pos)
 
     # --- Text Edit display_on_upcoming_passes methods, not normally modified:
 
@@ -1188,5 +1401,15 @@ def append_text_to_text_edit(tEdit, txt, colour='black'):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    mainWindow = MainApp()
+
+    # Optional:
+    #   --service http://host:port to be a client of a satengine.service
+    #   --rotctld host:port and --rigctld host:port to track the selected satellite
+    arguments = app.arguments()
+    options = {}
+    for option in ('--service', '--rotctld', '--rigctld'):
+        if option in arguments[:-1]:
+            options[option] = arguments[arguments.index(option) + 1]
+
+    mainWindow = MainApp(options.get('--service'), options.get('--rotctld'), options.get('--rigctld'))
     sys.exit(app.exec_())
@@ -22,11 +22,18 @@
 
 from __future__ import division
 
+import collections
+import copy
 import math
+import threading
+import time
+
+import numpy as np
 
 # PyQt interface imports
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
+from PyQt5.QtWidgets import *
 
 
 class NotAGraphError(ValueError):
@@ -34,6 +41,33 @@ class NotAGraphError(ValueError):
     pass
 
 
+class Line(object):
+    """A line, or set of points, held as columns of values.
+
+        Can be passed to the draw method of any of the graphs in place of
+        a list of point tuples, and is drawn without a Python object for
+        each point.
+
+        x, y -> arrays, or sequences, of the values in graph coordinates,
+            r and theta (radians) for the Polar graphs.
+        colour -> the colour of the whole line, its points and its texts.
+        point_size -> the size of the rectangle drawn at each point,
+            None for no rectangles (the scatter graphs then use 2).
+        labels -> dict of {point index: text} for the points with a text.
+        """
+
+    def __init__(self, x, y, colour='black', point_size=None, labels=None):
+
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.colour = colour
+        self.point_size = point_size
+        self.labels = labels or {}
+
+    def __len__(self):
+        return len(self.x)
+
+
 class Graph(object):
     """A graph object for use with Python Qt based programs.
 
@@ -54,6 +88,8 @@ class Graph(object):
         See the draw method below.
         """
 
+    _stretch_aspect = Qt.IgnoreAspectRatio  # of the image shown by stretch
+
     def __init__(self, graph_label,
                  xmin=0, xmax=1000,
                  ymin=0, ymax=1000,
@@ -66,7 +102,8 @@ class Graph(object):
         """ Initialises the Graph object.
 
             graph_label is the label control on to which the Graph is
-            rendered as a QPixmap.
+            rendered as a QPixmap, or None to draw the Graph offscreen,
+            to be saved with save_image or save_svg.
 
             xmax and ymax are the maximum values in the x and y directions.
             xmin and ymin are the minimum values in the x and y directions.
@@ -102,6 +139,18 @@ class Graph(object):
 
         self.graph_image = None
 
+        # The grids, grid labels and fixed texts are drawn on a static
+        # layer, which is only re-drawn when its key changes.
+        # {image class: (key, layer)}, shared with the snapshots of the graph.
+        self._static_layers = {}
+
+        # A BackgroundRenderer to draw on another thread, or None.
+        self.renderer = None
+
+        # Draw through a LevelOfDetail: simplified tracks, binned markers
+        # and labels that would collide left out, for dense graphs.
+        self.level_of_detail = False
+
         # avoid division by zero errors:
 
         if xmax - xmin == 0:
@@ -162,24 +211,125 @@ class Graph(object):
 
         return yyt
 
-    def _grid_and_texts(self):
+    def _painter(self, image):
 
-        """Draws the grids, grid labels and any texts on
-            pixmap: self.graph_image.
+        """Returns a QPainter begun on `image` with the font pixel size set.
 
-            Private method called by the (sub-classed) draw methods.
-            Do not call this method directly."""
+            The caller must call the end method of the painter."""
 
         # draw on a pixmap using a painter
         painter = QPainter()
-        painter.begin(self.graph_image)
+        painter.begin(image)
 
         # set the font pixel size
         new_font = QFont(painter.font())  # get a copy of the old font
         new_font.setPixelSize(self.pixel_size)
         painter.setFont(new_font)  # update the font
 
-        # get the metrics of the new font
+        return painter
+
+    def _static_key(self):
+
+        """Everything that is drawn on the static layer, the layer is
+            re-drawn when this changes: on a resize, a change of the grid
+            label format or a change of the fixed texts."""
+
+        return (self.image_size_x, self.image_size_y, self.pixel_size, QColor(self.background).rgba(),
+                self.xmin, self.xmax, self.ymin, self.ymax, self.xgrids, self.ygrids,
+                self.show_labels_x, self.show_labels_y, self.xformat, self.yformat,
+                tuple(t for t in self.texts if t[4]), tuple(t for t in self.polarTexts if t[4]))
+
+    def _new_image(self, image_class):
+
+        """Returns a new QPixmap or QImage of the graph size filled with the background."""
+
+        if image_class is QImage:
+            image = QImage(self.image_size_x, self.image_size_y, QImage.Format_ARGB32_Premultiplied)
+        else:
+            image = image_class(self.image_size_x, self.image_size_y)
+        image.fill(QColor(self.background))
+
+        return image
+
+    def _static_image(self, image_class=QPixmap):
+
+        """Returns the static layer: the background, grids, grid labels
+            and fixed texts as a QPixmap or QImage, drawing it only if it
+            has changed."""
+
+        key = self._static_key()
+        layer_key, layer = self._static_layers.get(image_class, (None, None))
+
+        if layer is None or key != layer_key:
+            layer = self._new_image(image_class)
+
+            painter = self._painter(layer)
+            self._grid_and_texts(painter, fixed_only=True)
+            painter.end()
+
+            self._static_layers[image_class] = (key, layer)
+
+        return layer
+
+    def _render(self, lines, image_class=QPixmap):
+
+        """Returns a new QPixmap or QImage of the graph with `lines`.
+
+            With a QImage this may be called on any thread."""
+
+        # start from a copy of the static layer: the grids and fixed texts
+        image = image_class(self._static_image(image_class))
+
+        painter = self._painter(image)
+
+        self._texts(painter, False)  # the texts that are not fixed
+
+        # draw the lines (if any):
+        self._draw_lines(painter, lines, self._level_of_detail())
+
+        painter.end()
+
+        return image
+
+    def _level_of_detail(self):
+
+        """A new LevelOfDetail for a frame if the `level_of_detail` attribute is set, else None."""
+
+        if self.level_of_detail:
+            return LevelOfDetail(self.image_size_x, self.image_size_y)
+
+        return None
+
+    def _snapshot(self):
+
+        """A copy of the graph, with its own lists of texts, that can be
+            rendered on another thread while this graph is changed."""
+
+        snapshot = copy.copy(self)
+        snapshot.texts = self.texts[:]
+        snapshot.polarTexts = self.polarTexts[:]
+        snapshot.renderer = None
+
+        return snapshot
+
+    def _texts(self, painter, fixed=None):
+
+        """Draws the texts with `fixed` set as given, or all of the texts if None."""
+
+        for t in self.texts:
+            if fixed is None or bool(t[4]) == fixed:
+                painter.setPen(QColor(t[3]))
+                draw_text(painter, self.tx(t[1]), self.ty(t[2]), t[0])
+
+    def _grid_and_texts(self, painter, fixed_only=False):
+
+        """Draws the grids, grid labels and the texts using `painter`,
+            only the fixed texts if `fixed_only`.
+
+            Private method called when the static layer is drawn.
+            Do not call this method directly."""
+
+        # get the metrics of the font
         metrics = painter.fontMetrics()
 
         # draw grids at intervals
@@ -197,11 +347,11 @@ class Graph(object):
                 if (xi != 0):  # or (self.xmin == self.ymin):
                     painter.setPen(Qt.blue)
 
-                    painter.drawText(xg + 2, self.image_size_y - 4,
-                                     self.xformat.format(
-                                         float(self.xmin) + float(self.xmax - self.xmin)
-                                         / float(self.xgrids) * xi)
-                                     )
+                    draw_text(painter, xg + 2, self.image_size_y - 4,
+                                       self.xformat.format(
+                                           float(self.xmin) + float(self.xmax - self.xmin)
+                                           / float(self.xgrids) * xi)
+                                       )
 
         # first x axis label:
 
@@ -213,9 +363,9 @@ class Graph(object):
         if self.show_labels_x:
             # draw at pixel width (+ a bit) back from the right of the image
             # and pixel height (+ a bit) up from the bottom
-            painter.drawText(4,
-                             self.image_size_y - 4 - hy,
-                             self.xformat.format(float(self.xmin)))
+            draw_text(painter, 4,
+                               self.image_size_y - 4 - hy,
+                               self.xformat.format(float(self.xmin)))
 
         # final x axis label:
 
@@ -227,9 +377,9 @@ class Graph(object):
         if self.show_labels_x:
             # draw at pixel width (+ a bit) back from the right of the image
             # and pixel height (+ a bit) up from the bottom
-            painter.drawText(self.image_size_x - wx - 4,
-                             self.image_size_y - 4 - hy,
-                             self.xformat.format(float(self.xmax)))
+            draw_text(painter, self.image_size_x - wx - 4,
+                               self.image_size_y - 4 - hy,
+                               self.xformat.format(float(self.xmax)))
 
         # y grids
         for yi in range(self.ygrids):
@@ -244,9 +394,9 @@ class Graph(object):
                 # draw y axis labels other than first/final labels
                 if yi != 0:
                     painter.setPen(Qt.red)
-                    painter.drawText(4, yg - 2, self.yformat.format(self.ymax -
-                                                                    ((float(self.ymax - self.ymin) /
-                                                                      float(self.ygrids) * yi))))
+                    draw_text(painter, 4, yg - 2, self.yformat.format(self.ymax -
+                                                                      ((float(self.ymax - self.ymin) /
+                                                                        float(self.ygrids) * yi))))
 
         # first y axis label:
 
@@ -256,7 +406,7 @@ class Graph(object):
 
         if self.show_labels_y:
             # draw at pixel height from the top of the image
-            painter.drawText(4, self.image_size_y - 4, self.yformat.format(float(self.ymin)))
+            draw_text(painter, 4, self.image_size_y - 4, self.yformat.format(float(self.ymin)))
 
         # final y axis label:
 
@@ -266,7 +416,7 @@ class Graph(object):
 
         if self.show_labels_y:
             # draw at pixel height from the top of the image
-            painter.drawText(4, hy - 2, self.yformat.format(float(self.ymax)))
+            draw_text(painter, 4, hy - 2, self.yformat.format(float(self.ymax)))
 
         # draw borders with a Rect
         painter.setPen(Qt.blue)
@@ -274,13 +424,7 @@ class Graph(object):
                          self.image_size_y - 1)
 
         # draw texts(if any)
-        for t in self.texts:
-            painter.setPen(QColor(t[3]))
-            painter.drawText(self.tx(t[1]), self.ty(t[2]), t[0])
-
-        painter.end()
-
-        # self.update()
+        self._texts(painter, True if fixed_only else None)
 
     def draw(self, *args):
 
@@ -306,31 +450,38 @@ class Graph(object):
             lines are removed and the new line argument(s) are drawn along
             with any text.
 
+            A Line, holding the points as arrays, may be given in place of
+            any list of points.
+
+            If attribute `renderer` is set to a BackgroundRenderer the graph
+            is drawn on its thread and shown when it is ready. The lines
+            must then not be changed after the call.
+
             Attribute `lines` contains the list of the lines passed as arguments.
             """
 
         # Save the arguments
         self.lines = args[:]
 
-        # create the image as a pixmap
-        self.graph_image = QPixmap(self.image_size_x, self.image_size_y)
-        self.graph_image.fill(self.background)
+        if self.renderer:
+            self.renderer.submit(self, self.lines)
+            return
 
-        self._grid_and_texts()  # draw the grids and texts
+        self.graph_image = self._render(args)
+        if self.graph_label is not None:  # None when drawn offscreen, e.g. to save
+            self.graph_label.setPixmap(self.graph_image)
 
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
-
-        # set the font pixel size
-        new_font = QFont(painter.font())  # get a copy of the old font
-        new_font.setPixelSize(self.pixel_size)
-        painter.setFont(new_font)  # update the font
+    def _draw_lines(self, painter, lines, lod=None):
 
-        # draw the lines (if any):
+        """Draws the `lines` using `painter`, see the draw method,
+            through LevelOfDetail `lod` if given."""
 
         # draw as individual lines so each can be a different colour
-        for line in args:
+        for line in lines:
+
+            if isinstance(line, Line):
+                _draw_columns(painter, line, self.tx(line.x), self.ty(line.y), lod=lod)
+                continue
 
             for i, point in enumerate(line):
 
@@ -355,7 +506,7 @@ class Graph(object):
                             point_size, point_size)
 
                     if len(point) >= 5:  # if point has a text field
-                        painter.drawText(self.tx(point[0]), self.ty(point[1]), point[4])
+                        draw_text(painter, self.tx(point[0]), self.ty(point[1]), point[4])
 
                 else:
                     # subsequent points
@@ -368,7 +519,7 @@ class Graph(object):
                             point_size, point_size)
 
                     if len(point) >= 5:  # if point has a text field
-                        painter.drawText(self.tx(point[0]), self.ty(point[1]), point[4])
+                        draw_text(painter, self.tx(point[0]), self.ty(point[1]), point[4])
 
                     # draw the line
                     line_to = QPoint(self.tx(point[0]), self.ty(point[1]))
@@ -378,9 +529,6 @@ class Graph(object):
                     last_point = QPoint(self.tx(point[0]),
                                         self.ty(point[1]))
 
-        painter.end()
-        self.graph_label.setPixmap(self.graph_image)
-
     def add_text(self, text, x, y, colour='black', fixed=False):
 
         """`text` is added to the graph at x, y (in graph coordinates)
@@ -495,6 +643,31 @@ class Graph(object):
             return saved
         return None
 
+    def save_svg(self, filename, title='SkyHamSat'):
+
+        """Saves the graph, with the lines of the last call to draw,
+            as an SVG drawing in file: filename.
+
+            The grids, texts and lines are drawn as vectors.
+            Requires the PyQt5 QtSvg module.
+
+            Returns True if it was saved."""
+
+        from PyQt5.QtSvg import QSvgGenerator
+
+        generator = QSvgGenerator()
+        generator.setFileName(filename)
+        generator.setSize(QSize(self.image_size_x, self.image_size_y))
+        generator.setViewBox(QRect(0, 0, self.image_size_x, self.image_size_y))
+        generator.setTitle(title)
+
+        painter = self._painter(generator)
+        painter.fillRect(0, 0, self.image_size_x, self.image_size_y, QColor(self.background))
+        self._grid_and_texts(painter)
+        self._draw_lines(painter, self.lines, self._level_of_detail())
+
+        return painter.end()
+
     def set_grid_label_format(self, x='{}', y='{}'):
 
         """Set the format of the numbers labelling the X and Y grid axies.
@@ -513,6 +686,29 @@ class Graph(object):
         self.xformat = x
         self.yformat = y
 
+    def resize(self, size_x, size_y, text_pixel_size=None):
+
+        """Change the pixel size of the graph, and the text pixel size if given,
+            in place.
+
+            The graph is displayed at the new size after the next call
+            to the draw method."""
+
+        self.image_size_x = size_x
+        self.image_size_y = size_y
+
+        if text_pixel_size is not None:
+            self.pixel_size = text_pixel_size
+
+    def stretch(self, size_x, size_y):
+
+        """Show the last drawn image scaled to `size_x`, `size_y` without
+            re-drawing it, a quick preview while the graph is being resized."""
+
+        if self.graph_image:
+            self.graph_label.setPixmap(self.graph_image.scaled(size_x, size_y, self._stretch_aspect,
+                                                               Qt.FastTransformation))
+
 
 class Scatter(Graph):
     """A scatter graph object for use with Python Qt based programs.
@@ -555,31 +751,28 @@ class Scatter(Graph):
             points are removed and the new list of points argument(s) are
             drawn along with any text.
 
+            A Line, holding the points as arrays, may be given in place of
+            any list of points.
+
             Attribute `lines` contains the list of the lines passed as arguments.
             """
 
-        # Save the arguments
-        self.lines = args[:]
-
-        # create the image as a pixmap
-        self.graph_image = QPixmap(self.image_size_x, self.image_size_y)
-        self.graph_image.fill(self.background)
-
-        self._grid_and_texts()  # draw the grids and texts
+        super().draw(*args)
 
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
+    def _draw_lines(self, painter, lines, lod=None):
 
-        # set the font pixel size
-        new_font = QFont(painter.font())  # get a copy of the old font
-        new_font.setPixelSize(self.pixel_size)
-        painter.setFont(new_font)  # update the font
+        """Draws the `lines` using `painter`, see the draw method,
+            through LevelOfDetail `lod` if given."""
 
         # draw the scatter points (if any):
 
         # draw as individual points so each can be a different colour
-        for line in args:
+        for line in lines:
+
+            if isinstance(line, Line):
+                _draw_columns(painter, line, self.tx(line.x), self.ty(line.y), polyline=False,
+                              default_size=2, lod=lod)
+                continue
 
             for point in line:
 
@@ -599,16 +792,13 @@ class Scatter(Graph):
                     point_size = 2
 
                 if len(point) >= 5:  # if point has a text field
-                    painter.drawText(self.tx(point[0]), self.ty(point[1]), point[4])
+                    draw_text(painter, self.tx(point[0]), self.ty(point[1]), point[4])
 
                 # draw a rectangle at the point
                 painter.drawRect(self.tx(point[0]) - point_size // 2,
                                  self.ty(point[1]) - point_size // 2,
                                  point_size, point_size)
 
-        painter.end()
-        self.graph_label.setPixmap(self.graph_image)
-
 
 class Poly(Graph):
     """A graph object for use with Python Qt based programs. Draws the
@@ -659,25 +849,25 @@ class Poly(Graph):
             lines are removed and the new line argument(s) are drawn along
             with any text.
 
+            A Line, holding the points as arrays, may be given in place of
+            any list of points.
+
             Attribute `lines` contains the list of the lines passed as arguments."""
 
-        # Save the arguments
-        self.lines = args[:]
+        super().draw(*args)
 
-        # create the image as a pixmap
-        self.graph_image = QPixmap(self.image_size_x, self.image_size_y)
-        self.graph_image.fill(self.background)
+    def _draw_lines(self, painter, lines, lod=None):
 
-        self._grid_and_texts()  # draw the grids and texts
+        """Draws the `lines` using `painter`, see the draw method,
+            through LevelOfDetail `lod` if given."""
 
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
+        # draw lines using a QPainterPath to speed up rendering
+        for line in lines:
 
-        # draw the lines (if any):
+            if isinstance(line, Line):
+                _draw_columns(painter, line, self.tx(line.x), self.ty(line.y), markers=False, texts=False, lod=lod)
+                continue
 
-        # draw lines using a QPainterPath to speed up rendering
-        for line in args:
             # Create a QPainterPath
             path = QPainterPath()
 
@@ -702,9 +892,6 @@ class Poly(Graph):
 
             painter.drawPath(path)
 
-        painter.end()
-        self.graph_label.setPixmap(self.graph_image)
-
 
 class Polar(Graph):
     """A graph object for use with Python Qt based programs.
@@ -727,6 +914,8 @@ class Polar(Graph):
 
         """
 
+    _stretch_aspect = Qt.KeepAspectRatio  # the circles stay round
+
     def __init__(self, graph_label,
                  r_min=0, r_max=90,
                  theta_min=0, theta_max=360,
@@ -739,7 +928,8 @@ class Polar(Graph):
         """ Initialises the Polar graph object.
 
             graph_label is the label control on to which the Graph is
-            rendered as a QPixmap.
+            rendered as a QPixmap, or None to draw the Graph offscreen,
+            to be saved with save_image or save_svg.
 
             r_max and theta_max are the maximum values in the r and theta directions.
             r_min and theta_min are the minimum values in the r and theta directions.
@@ -772,6 +962,12 @@ class Polar(Graph):
 
         self.graph_image = None
 
+        self._static_layers = {}
+
+        self.renderer = None
+
+        self.level_of_detail = False
+
         # avoid division by zero errors:
 
         if r_max - r_min == 0:
@@ -830,78 +1026,46 @@ class Polar(Graph):
             lines are removed and the new line argument(s) are drawn along
             with any text.
 
+            A Line, holding the points as arrays, may be given in place of
+            any list of points.
+
             Attribute `lines` contains the list of the lines passed as arguments.
             """
 
-        # Save the arguments
-        self.lines = args[:]
-
-        # create the image as a pixmap
-        self.graph_image = QPixmap(self.image_size_x, self.image_size_y)
-        self.graph_image.fill(self.background)
-
-        self._grid_and_texts()  # draw the grids and texts
+        super().draw(*args)
 
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
-
-        # set the font pixel size
-        new_font = QFont(painter.font())  # get a copy of the old font
-        new_font.setPixelSize(self.pixel_size)
-        painter.setFont(new_font)  # update the font
-
-        # draw the lines (if any):
-
-        # draw as individual lines so each can be a different colour
-        for line in args:
-
-            for i, point in enumerate(line):
-
-                # if a colour is passed, use it
-                if len(point) >= 3:  # if point has a colour field
-                    painter.setPen(QColor(point[2]))
-                    painter.setBrush(QColor(point[2]))
-                else:
-                    painter.setPen(Qt.black)  # default colour
+    def _draw_lines(self, painter, lines, lod=None):
 
-                if i == 0:
-                    # first point is a move
-                    last_point = QPoint(self.pr(point[0], point[1]), self.pt(point[0], point[1]))
-
-                    if len(point) >= 4:  # if point has a point size field
-                        # draw a rectangle at start of point
-                        point_size = point[3]
-                        painter.drawRect(
-                            self.pr(point[0], point[1]) - point_size // 2,
-                            self.pt(point[0], point[1]) - point_size // 2,
-                            point_size, point_size)
+        """Draws the `lines` using `painter`, see the draw method,
+            through LevelOfDetail `lod` if given.
 
-                    if len(point) >= 5:  # if point has a text field
-                        painter.drawText(self.pr(point[0], point[1]), self.pt(point[0], point[1]), point[4])
+            Each line is transformed to image coordinates in one NumPy pass.
+            A line in a single colour is drawn as one polyline and the point
+            rectangles of each colour and size are drawn with one drawRects."""
 
-                else:
-                    # subsequent points
-                    if len(point) >= 4:  # if point has a point size field
-                        # draw a rectangle at the point
-                        point_size = point[3]
-                        painter.drawRect(
-                            self.pr(point[0], point[1]) - point_size // 2,
-                            self.pt(point[0], point[1]) - point_size // 2,
-                            point_size, point_size)
+        for line in lines:
+            if not line:
+                continue
 
-                    if len(point) >= 5:  # if point has a text field
-                        painter.drawText(self.pr(point[0], point[1]), self.pt(point[0], point[1]), point[4])
+            if isinstance(line, Line):
+                _draw_columns(painter, line, *self.polar_to_image(line.x, line.y), lod=lod)
+                continue
 
-                    # draw the line
-                    line_to = QPoint(self.pr(point[0], point[1]), self.pt(point[0], point[1]))
-                    painter.drawLine(last_point, line_to)
+            x, y = self.polar_to_image(*_columns(line))
+            colours = [point[2] if len(point) >= 3 else None for point in line]
 
-                    # update last point
-                    last_point = QPoint(self.pr(point[0], point[1]), self.pt(point[0], point[1]))
+            if len(set(colours)) == 1:
+                # the whole line in one colour
+                painter.setPen(QColor(colours[0]) if colours[0] else QColor(Qt.black))
+                painter.drawPolyline(_polyline(x, y, lod))
+            else:
+                # each segment in the colour of its end point
+                xs, ys = x.tolist(), y.tolist()
+                for i in range(1, len(line)):
+                    painter.setPen(QColor(colours[i]) if colours[i] else QColor(Qt.black))
+                    painter.drawLine(QLineF(xs[i - 1], ys[i - 1], xs[i], ys[i]))
 
-        painter.end()
-        self.graph_label.setPixmap(self.graph_image)
+            _draw_markers_and_texts(painter, line, x, y, lod=lod)
 
     def pRad(self, r):
 
@@ -942,24 +1106,39 @@ class Polar(Graph):
 
         return y
 
-    def _grid_and_texts(self):
+    def polar_to_image(self, r, theta):
 
-        """Draws the grids, grid labels and any texts on
-            pixmap: self.graph_image.
+        """Translate arrays of radial `r` and angle `theta` (radians) values
+            in graph coordinates to image coordinates in one pass.
 
-            Private method called by the (sub-classed) draw methods.
-            Do not call this method directly."""
+            returns the x and y values in image coordinates as float arrays."""
 
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
+        centre = min(self.image_size_x, self.image_size_y) / 2.0
+        radius = centre * (self.xmax - np.asarray(r, dtype=float)) / (self.xmax - self.xmin)
+        theta = np.asarray(theta, dtype=float)
 
-        # set the font pixel size
-        new_font = QFont(painter.font())  # get a copy of the old font
-        new_font.setPixelSize(self.pixel_size)
-        painter.setFont(new_font)  # update the font
+        return centre + radius * np.sin(theta), centre - radius * np.cos(theta)
+
+    def _texts(self, painter, fixed=None):
+
+        """Draws the texts and polar texts with `fixed` set as given, or all of the texts if None."""
+
+        Graph._texts(self, painter, fixed)
+
+        for t in self.polarTexts:
+            if fixed is None or bool(t[4]) == fixed:
+                painter.setPen(QColor(t[3]))
+                draw_text(painter, self.pr(t[1], t[2]), self.pt(t[1], t[2]), t[0])
+
+    def _grid_and_texts(self, painter, fixed_only=False):
 
-        # get the metrics of the new font
+        """Draws the grids, grid labels and the texts using `painter`,
+            only the fixed texts if `fixed_only`.
+
+            Private method called when the static layer is drawn.
+            Do not call this method directly."""
+
+        # get the metrics of the font
         metrics = painter.fontMetrics()
 
         # draw grids at intervals
@@ -978,11 +1157,11 @@ class Polar(Graph):
                 if (ri != 0):
                     painter.setPen(Qt.blue)
 
-                    painter.drawText(radius + 2, centreP.x() - 4,
-                                     self.xformat.format(
-                                         float(self.xmin) + float(self.xmax - self.xmin)
-                                         / float(self.xgrids) * ri)
-                                     )
+                    draw_text(painter, radius + 2, centreP.x() - 4,
+                                       self.xformat.format(
+                                           float(self.xmin) + float(self.xmax - self.xmin)
+                                           / float(self.xgrids) * ri)
+                                       )
 
         # first x axis label:
 
@@ -994,15 +1173,15 @@ class Polar(Graph):
         if self.show_labels_x:
             # draw at pixel width (+ a bit) back from the right of the image
             # and pixel height (+ a bit) up from the bottom
-            painter.drawText(4, centre - hy - 4, self.xformat.format(float(self.xmin)))
+            draw_text(painter, 4, centre - hy - 4, self.xformat.format(float(self.xmin)))
 
         # theta grids (radial lines)
         for yi in range(self.ygrids):
             yg = float(self.image_size_y) / float(self.ygrids) * yi
 
             painter.setPen(QColor('# 89a0cd'))
-            move_to = QPoint(centre, centre)
-            line_to = QPoint(centre - radius * math.sin(math.tau / self.ygrids * yi),
+            move_to = QPointF(centre, centre)
+            line_to = QPointF(centre - radius * math.sin(math.tau / self.ygrids * yi),
                              centre - radius * math.cos(math.tau / self.ygrids * yi))
             painter.drawLine(move_to, line_to)
 
@@ -1010,10 +1189,10 @@ class Polar(Graph):
                 # draw y axis labels other than first/final labels
                 if yi != 0:
                     painter.setPen(Qt.red)
-                    painter.drawText(line_to.x() + 4, line_to.y() - 2,
-                                     self.yformat.format(self.ymax -
-                                                         ((float(self.ymax - self.ymin) /
-                                                           float(self.ygrids) * yi))))
+                    draw_text(painter, line_to.x() + 4, line_to.y() - 2,
+                                       self.yformat.format(self.ymax -
+                                                           ((float(self.ymax - self.ymin) /
+                                                             float(self.ygrids) * yi))))
 
         # first theta grid label:
 
@@ -1023,7 +1202,7 @@ class Polar(Graph):
 
         if self.show_labels_y:
             # draw at pixel height from the top of the image
-            painter.drawText(centre + 4, hy, self.yformat.format(float(self.ymin)))
+            draw_text(painter, centre + 4, hy, self.yformat.format(float(self.ymin)))
 
         # draw borders with a Rect
         painter.setPen(Qt.blue)
@@ -1031,15 +1210,7 @@ class Polar(Graph):
                          self.image_size_y - 1)
 
         # draw texts(if any)
-        for t in self.texts:
-            painter.setPen(QColor(t[3]))
-            painter.drawText(self.tx(t[1]), self.ty(t[2]), t[0])
-
-        for t in self.polarTexts:
-            painter.setPen(QColor(t[3]))
-            painter.drawText(self.pr(t[1], t[2]), self.pt(t[1], t[2]), t[0])
-
-        painter.end()
+        self._texts(painter, True if fixed_only else None)
 
     def add_polar_text(self, text, r, theta, colour='black', fixed=False):
 
@@ -1131,59 +1302,35 @@ class PolarScatter(Polar):
             points are removed and the new list of points argument(s) are
             drawn along with any text.
 
+            A Line, holding the points as arrays, may be given in place of
+            any list of points.
+
             Attribute `lines` contains the list of the lines passed as arguments.
             """
 
-        # Save the arguments
-        self.lines = args[:]
-
-        # create the image as a pixmap
-        self.graph_image = QPixmap(self.image_size_x, self.image_size_y)
-        self.graph_image.fill(self.background)
-
-        self._grid_and_texts()  # draw the grids and texts
-
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
-
-        # set the font pixel size
-        new_font = QFont(painter.font())  # get a copy of the old font
-        new_font.setPixelSize(self.pixel_size)
-        painter.setFont(new_font)  # update the font
-
-        # draw the scatter points (if any):
+        super().draw(*args)
 
-        # draw as individual points so each can be a different colour
-        for line in args:
+    def _draw_lines(self, painter, lines, lod=None):
 
-            for point in line:
+        """Draws the `lines` using `painter`, see the draw method,
+            through LevelOfDetail `lod` if given.
 
-                # draw points as rectangles
+            The points are transformed to image coordinates in one NumPy pass and
+            the rectangles of each colour and size are drawn with one drawRects."""
 
-                # if a colour is passed, use it
-                if len(point) >= 3:
-                    painter.setBrush(QColor(point[2]))
-                    painter.setPen(QColor(point[2]))
-                else:
-                    painter.setBrush(Qt.black)  # default colour
-                    painter.setPen(Qt.black)
+        for line in lines:
+            if not line:
+                continue
 
-                if len(point) >= 4:  # if a point size has been given
-                    point_size = point[3]
-                else:
-                    point_size = 2
+            if isinstance(line, Line):
+                _draw_columns(painter, line, *self.polar_to_image(line.x, line.y), polyline=False,
+                              default_size=2, lod=lod)
+                continue
 
-                if len(point) >= 5:  # if point has a text field
-                    painter.drawText(self.pr(point[0], point[1]), self.pt(point[0], point[1]), point[4])
+            x, y = self.polar_to_image(*_columns(line))
 
-                # draw a rectangle at the point
-                painter.drawRect(self.pr(point[0], point[1]) - point_size // 2,
-                                 self.pt(point[0], point[1]) - point_size // 2,
-                                 point_size, point_size)
+            _draw_markers_and_texts(painter, line, x, y, default_size=2, lod=lod)
 
-        painter.end()
-        self.graph_label.setPixmap(self.graph_image)
 
 
 class PolarPoly(Polar):
@@ -1235,51 +1382,929 @@ class PolarPoly(Polar):
             lines are removed and the new line argument(s) are drawn along
             with any text.
 
+            A Line, holding the points as arrays, may be given in place of
+            any list of points.
+
             Attribute `lines` contains the list of the lines passed as arguments.
             """
 
-        # Save the arguments
-        self.lines = args[:]
+        super().draw(*args)
 
-        # create the image as a pixmap
-        self.graph_image = QPixmap(self.image_size_x, self.image_size_y)
-        self.graph_image.fill(self.background)
+    def _draw_lines(self, painter, lines, lod=None):
 
-        self._grid_and_texts()  # draw the grids and texts
+        """Draws the `lines` using `painter`, see the draw method,
+            through LevelOfDetail `lod` if given.
 
-        # draw on a pixmap using a painter
-        painter = QPainter()
-        painter.begin(self.graph_image)
+            Each line is transformed in one NumPy pass and drawn as one QPolygonF."""
 
-        # draw the lines (if any):
+        for line in lines:
+            if not line:
+                continue
 
-        # draw lines using a QPainterPath to speed up rendering
-        for line in args:
-            # Create a QPainterPath
-            path = QPainterPath()
+            if isinstance(line, Line):
+                _draw_columns(painter, line, *self.polar_to_image(line.x, line.y), markers=False,
+                              texts=False, lod=lod)
+                continue
 
-            for i, point in enumerate(line):
+            # if a colour is passed, use it
+            if len(line[0]) >= 3:  # if point has a colour field
+                painter.setPen(QColor(line[0][2]))
+            else:
+                painter.setPen(Qt.black)  # default colour
 
-                if i == 0:
-                    # if a colour is passed, use it
-                    if len(point) >= 3:  # if point has a colour field
-                        painter.setPen(QColor(point[2]))
-                    else:
-                        painter.setPen(Qt.black)  # default colour
+            x, y = self.polar_to_image(*_columns(line))
+            painter.drawPolyline(_polyline(x, y, lod))
 
-                    # first point is a move
-                    path.moveTo(self.pr(point[0], point[1]), self.pt(point[0], point[1]))
 
-                else:
-                    # subsequent points
 
-                    # draw the line
-                    path.lineTo(self.pr(point[0], point[1]), self.pt(point[0], point[1]))
+class PolarScene(Polar):
+    """A Polar graph kept as the items of a QGraphicsScene (retained mode)
+        for graphs that are re-drawn often with only a few points moving,
+        such as satellite positions over a pass track.
 
-            painter.drawPath(path)
+        Usage:
 
-        painter.end()
-        self.graph_label.setPixmap(self.graph_image)
+        Create a QGraphicsView, in place of the label.
+
+        Create the PolarScene object passing the view and the other
+        arguments as for a Polar graph.
+
+        Call draw with the lines as for a Polar graph. Lines of more than
+        one point are tracks, lines of one point are markers.
+
+        The grids and fixed texts, the other texts and the tracks are
+        items that are only re-painted when they change. Each marker is
+        an item that is moved in place, so moving a marker only re-paints
+        the area it moves over. The view repaints once for all the changes
+        made before control returns to the event loop.
+
+        Other methods as for the Polar object.
+        """
+
+    def __init__(self, graph_label, *args, **kwargs):
+
+        """ Initialises the PolarScene graph object.
+
+            graph_label is the QGraphicsView that shows the scene.
+            The other arguments are those of Polar.
+            """
+
+        super().__init__(graph_label, *args, **kwargs)
+
+        self.scene = QGraphicsScene()
+
+        # the static layer, texts and tracks, bottom to top
+        self._background_item = self.scene.addPixmap(QPixmap())
+        self._texts_item = _PaintedItem(self, lambda painter: self._texts(painter, False))
+        self._tracks_item = _PaintedItem(self, self._paint_tracks)
+        self.scene.addItem(self._texts_item)
+        self.scene.addItem(self._tracks_item)
+
+        self._background_layer = None
+        self._shown_texts = None
+        self._tracks = ()
+        self._markers = {}  # key: (rectangle item, text item)
+
+        graph_label.setScene(self.scene)
+        graph_label.setFrameShape(QFrame.NoFrame)
+        graph_label.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        graph_label.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        graph_label.setAlignment(Qt.AlignLeft | Qt.AlignTop)
+        self._set_scene_size()
+
+    def _set_scene_size(self):
+
+        """Sizes the scene and the view to the image size."""
+
+        self.scene.setSceneRect(0, 0, self.image_size_x, self.image_size_y)
+        self.graph_label.setFixedSize(self.image_size_x, self.image_size_y)
+
+    def draw(self, *args):
+
+        """Draw the graph on the scene of the view.
+
+            The arguments are lines as for the Polar draw method. A line of
+            one point is a marker, moved in place if a marker with the same
+            text and colour was drawn by the last call.
+
+            The tracks, lines of more than one point, are only re-painted
+            if they are not the same objects as in the last call.
+
+            Attribute `lines` contains the list of the lines passed as arguments.
+            """
+
+        # Save the arguments
+        self.lines = args[:]
+
+        static_layer = self._static_image()
+        if static_layer is not self._background_layer:
+            self._background_layer = static_layer
+            self._background_item.setPixmap(static_layer)
+
+        texts = tuple(t for t in self.texts + self.polarTexts if not t[4])
+        if texts != self._shown_texts:
+            self._shown_texts = texts
+            self._texts_item.update()
+
+        tracks = tuple(line for line in args if len(line) > 1)
+        if len(tracks) != len(self._tracks) or any(a is not b for a, b in zip(tracks, self._tracks)):
+            self._tracks = tracks
+            self._tracks_item.update()
+
+        self._move_markers([line for line in args if len(line) == 1])
+
+    def _paint_tracks(self, painter):
+
+        Polar._draw_lines(self, painter, self._tracks, self._level_of_detail())
+
+    def _move_markers(self, markers):
+
+        """Moves, adds and removes the marker items to show `markers`, lines of one point.
+
+            With `level_of_detail` set, the texts of the markers that would
+            overlap the texts of earlier markers are hidden."""
+
+        font = QFont(self.scene.font())
+        font.setPixelSize(self.pixel_size)
+        ascent = QFontMetricsF(font).ascent()
+        lod = self._level_of_detail()
+
+        shown = {}
+        for marker in markers:
+            if isinstance(marker, Line):
+                r, theta = marker.x[0], marker.y[0]
+                colour, point_size, text = marker.colour, marker.point_size, marker.labels.get(0, '')
+            else:
+                point = marker[0]
+                r, theta = point[0], point[1]
+                colour = point[2] if len(point) >= 3 else 'black'
+                point_size = point[3] if len(point) >= 4 else 0
+                text = point[4] if len(point) >= 5 else ''
+
+            key = (text, colour)
+            while key in shown:  # the same text and colour more than once
+                key += (len(shown),)
+
+            if key in self._markers:
+                rect_item, text_item = self._markers.pop(key)
+            else:
+                rect_item = QGraphicsRectItem()
+                rect_item.setPen(QColor(colour))
+                rect_item.setBrush(QColor(colour))
+                text_item = QGraphicsSimpleTextItem(text, rect_item)
+                text_item.setBrush(QColor(colour))
+                text_item.setFont(font)
+                text_item.setPos(0, -ascent)  # the text baseline at the point
+                self.scene.addItem(rect_item)
+
+            point_size = point_size or 0
+            rect = QRectF(-(point_size // 2), -(point_size // 2), point_size, point_size)
+            if rect_item.rect() != rect:
+                rect_item.setRect(rect)
+
+            x, y = self.polar_to_image(r, theta)
+            rect_item.setPos(float(x), float(y))
+            if lod is not None and text:
+                text_item.setVisible(lod.place_label(x, y, text, font))
+
+            shown[key] = (rect_item, text_item)
+
+        for rect_item, text_item in self._markers.values():
+            self.scene.removeItem(rect_item)  # no longer shown
+
+        self._markers = shown
+
+    def resize(self, size_x, size_y, text_pixel_size=None):
+
+        """Change the pixel size of the graph, see Graph.resize."""
+
+        self._texts_item.prepareGeometryChange()
+        self._tracks_item.prepareGeometryChange()
+
+        super().resize(size_x, size_y, text_pixel_size)
+
+        self.graph_label.resetTransform()
+        self._set_scene_size()
+
+        # re-painted at the new size at the next draw
+        self._shown_texts = None
+        self._tracks = ()
+
+    def stretch(self, size_x, size_y):
+
+        """Show the scene scaled to `size_x`, `size_y` without re-drawing it."""
+
+        scale = min(size_x / self.image_size_x, size_y / self.image_size_y)
+
+        self.graph_label.resetTransform()
+        self.graph_label.scale(scale, scale)
+        self.graph_label.setFixedSize(size_x, size_y)
+
+    def get_image(self):
+
+        """Returns the graph as an image, rendered from the scene."""
+
+        image = QImage(self.image_size_x, self.image_size_y, QImage.Format_ARGB32)
+        image.fill(self.background)
+
+        painter = QPainter(image)
+        self.scene.render(painter)
+        painter.end()
+
+        return image
+
+
+class _PaintedItem(QGraphicsItem):
+    """An item covering the whole of a graph painted by function(painter),
+        cached as a pixmap until update is called."""
+
+    def __init__(self, graph, paint_function):
+
+        super().__init__()
+
+        self.graph = graph
+        self.paint_function = paint_function
+
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.graph.image_size_x, self.graph.image_size_y)
+
+    def paint(self, painter, option, widget=None):
+
+        # set the font pixel size
+        new_font = QFont(painter.font())  # get a copy of the old font
+        new_font.setPixelSize(self.graph.pixel_size)
+        painter.setFont(new_font)  # update the font
+
+        self.paint_function(painter)
+
+
+class BackgroundRenderer(QObject):
+    """Draws graphs into QImages on a worker thread.
+
+        Usage:
+
+        Create one BackgroundRenderer and set it as the `renderer`
+        attribute of the graphs to draw on its thread. Their draw methods
+        then submit a snapshot of the graph and return at once.
+
+        The finished image is sent to the GUI thread by a queued signal
+        and swapped into the label. Only the latest frame of each graph is
+        drawn and shown: a frame that is replaced before it is drawn, or
+        finishes after a newer one was submitted, is dropped. Attributes
+        `rendered` and `dropped` count them.
+
+        Graphs drawn as scenes, PolarScene, are not supported.
+        """
+
+    frame_ready = pyqtSignal(object, int, QImage)  # graph, frame number, image
+
+    def __init__(self, parent=None):
+
+        super().__init__(parent)
+
+        self.rendered = 0
+        self.dropped = 0
+
+        self._latest = {}  # id(graph): latest frame number submitted
+        self._jobs = {}  # id(graph): (graph, frame number, snapshot, lines), waiting to be drawn
+        self._condition = threading.Condition()
+        self._stop = False
+
+        self.frame_ready.connect(self._show, Qt.QueuedConnection)
+
+        self._thread = threading.Thread(target=self._run, name='BackgroundRenderer', daemon=True)
+        self._thread.start()
+
+    def submit(self, graph, lines):
+
+        """Draw `graph` with `lines` on the worker thread, replacing any
+            frame of the graph that is still waiting."""
+
+        frame = self._latest.get(id(graph), 0) + 1
+        self._latest[id(graph)] = frame
+
+        with self._condition:
+            if id(graph) in self._jobs:
+                self.dropped += 1
+            self._jobs[id(graph)] = (graph, frame, graph._snapshot(), lines)
+            self._condition.notify()
+
+    def stop(self):
+
+        """Stop the worker thread, once any frame being drawn is finished."""
+
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self):
+
+        while True:
+            with self._condition:
+                while not self._jobs and not self._stop:
+                    self._condition.wait()
+                if self._stop:
+                    return
+                graph, frame, snapshot, lines = self._jobs.pop(next(iter(self._jobs)))
+
+            self.frame_ready.emit(graph, frame, snapshot._render(lines, QImage))
+
+    def _show(self, graph, frame, image):
+
+        """On the GUI thread: show the image unless a newer frame was submitted."""
+
+        if frame != self._latest.get(id(graph)):
+            self.dropped += 1
+            return
+
+        self.rendered += 1
+        graph.graph_image = QPixmap.fromImage(image)
+        graph.graph_label.setPixmap(graph.graph_image)
+
+
+class FrameScheduler(QObject):
+    """Coalesces the redraws of graphs into frames at a capped rate.
+
+        Usage:
+
+        Create one FrameScheduler for the application.
+
+        Call schedule with a graph and its lines instead of calling the
+        draw method of the graph. The graph is marked dirty with the
+        lines and drawn at the next frame, once, with the lines of the
+        last schedule call, however many calls were made in between.
+
+        Frames are at most `max_fps` per second. Attributes `requests`
+        and `frames` count the schedule calls and the draws made.
+        """
+
+    def __init__(self, max_fps=30, parent=None):
+
+        super().__init__(parent)
+
+        self.interval = 1.0 / max_fps  # seconds
+        self.requests = 0
+        self.frames = 0
+
+        self._dirty = {}  # id(graph): (graph, lines), in the order first scheduled
+        self._last_frame = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.render)
+
+    def schedule(self, graph, *lines):
+
+        """Mark `graph` to be drawn with `lines` at the next frame."""
+
+        self.requests += 1
+        self._dirty[id(graph)] = (graph, lines)
+
+        if not self._timer.isActive():
+            wait = self._last_frame + self.interval - time.monotonic()
+            self._timer.start(max(0, int(wait * 1000)))
+
+    def redraw(self, graph):
+
+        """Mark `graph` to be drawn with its current lines, e.g. after its texts have changed."""
+
+        pending = self._dirty.get(id(graph))
+        self.schedule(graph, *(pending[1] if pending else graph.lines))
+
+    def render(self):
+
+        """Draw the dirty graphs now."""
+
+        self._timer.stop()
+        self._last_frame = time.monotonic()
+
+        dirty, self._dirty = self._dirty, {}
+        for graph, lines in dirty.values():
+            graph.draw(*lines)
+            self.frames += 1
+
+    def flush(self):
+
+        """Draw any dirty graphs now, e.g. before the graphs are re-created."""
+
+        if self._dirty:
+            self.render()
+
+
+class MarkerAnimation(QObject):
+    """Moves the markers of a graph smoothly along interpolated tracks
+        at up to `max_fps` frames per second.
+
+        Usage:
+
+        Create a MarkerAnimation for a graph, a PolarScene is best as its
+        markers are moved in place.
+
+        Call set_tracks with the tracks of the markers over the next few
+        seconds, sampled at common times, whenever new positions are
+        computed. Each frame the positions at the current time are
+        interpolated for all of the markers in one NumPy pass and the
+        graph is drawn with them, so no positions are computed per frame.
+
+        Each frame must take less than `budget` seconds. When the frames
+        take longer, or the timer falls behind, the frame rate is lowered
+        to the next of FRAME_RATES, and raised again when the frames are
+        well within the budget. Attributes `frames` and `fps` give the
+        frames drawn and the current frame rate, `frame_time` the smoothed
+        time of a frame in seconds.
+        """
+
+    FRAME_RATES = (30, 20, 15, 10, 5, 2)
+
+    def __init__(self, graph, max_fps=30, budget=0.008, parent=None):
+
+        super().__init__(parent)
+
+        self.graph = graph
+        self.budget = budget
+        self.frame_rates = [fps for fps in self.FRAME_RATES if fps <= max_fps] or [max_fps]
+        self.frames = 0
+        self.frame_time = 0.0
+
+        self._rate = 0  # index in frame_rates
+        self._steady = 0  # frames since the rate was changed
+        self._late = 0  # late frames in a row
+        self._last_tick = None
+
+        self._times = None  # time.monotonic() seconds
+        self._r = None  # markers x times
+        self._theta = None
+        self._markers = []  # (colour, point size, text)
+        self._lines = ()
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    @property
+    def fps(self):
+        return self.frame_rates[self._rate]
+
+    def set_tracks(self, times, r, theta, markers, lines=()):
+
+        """Animate the markers along new tracks.
+
+            times -> array of time.monotonic() seconds, common to all of the tracks.
+            r, theta -> 2-D arrays of the graph coordinates, a row for each
+                marker, a column for each time.
+            markers -> list of (colour, point size, text) for each row.
+            lines -> lines drawn under the markers, e.g. pass tracks.
+            """
+
+        self._times = np.asarray(times, dtype=float)
+        self._r = np.asarray(r, dtype=float).reshape(len(markers), -1)
+        self._theta = np.unwrap(np.asarray(theta, dtype=float).reshape(len(markers), -1), axis=1)
+        self._markers = markers
+        self._lines = lines
+
+        if not self._timer.isActive():
+            self.start()
+        self._tick()
+
+    def start(self):
+
+        self._last_tick = None
+        self._timer.start(int(1000 / self.fps))
+
+    def stop(self):
+
+        self._timer.stop()
+
+    def positions(self, now):
+
+        """The interpolated (r, theta) arrays of the markers at time.monotonic() `now`,
+            held at the ends of the tracks."""
+
+        times = self._times
+        if len(times) < 2:
+            return self._r[:, 0], self._theta[:, 0]
+
+        i = min(max(int(np.searchsorted(times, now, side='right')) - 1, 0), len(times) - 2)
+        fraction = min(max((now - times[i]) / (times[i + 1] - times[i]), 0.0), 1.0)
+
+        r = self._r[:, i] + (self._r[:, i + 1] - self._r[:, i]) * fraction
+        theta = self._theta[:, i] + (self._theta[:, i + 1] - self._theta[:, i]) * fraction
+
+        return r, theta
+
+    def _tick(self):
+
+        start = time.monotonic()
+        if self._last_tick is not None and start - self._last_tick > 1.5 / self.fps:
+            self._late += 1
+        else:
+            self._late = 0
+        self._last_tick = start
+
+        if self._times is None:
+            return
+
+        r, theta = self.positions(start)
+        markers = [Line((r_i,), (theta_i,), colour, point_size, {0: text} if text else None)
+                   for r_i, theta_i, (colour, point_size, text) in zip(r.tolist(), theta.tolist(), self._markers)]
+        self.graph.draw(*self._lines, *markers)
+
+        self.frames += 1
+        self.frame_time += (time.monotonic() - start - self.frame_time) * 0.2
+        self._adapt()
+
+    def _adapt(self):
+
+        """Lower the frame rate if the frames are over budget or three in a row are late,
+            raise it after a second of frames well within the budget."""
+
+        self._steady += 1
+        if (self.frame_time > self.budget or self._late >= 3) and self._rate < len(self.frame_rates) - 1:
+            self._change_rate(self._rate + 1)
+        elif self.frame_time < self.budget / 3 and not self._late and self._steady > self.fps and self._rate > 0:
+            self._change_rate(self._rate - 1)
+
+    def _change_rate(self, rate):
+
+        self._rate = rate
+        self._steady = 0
+        self._late = 0
+        self._last_tick = None
+        self._timer.setInterval(int(1000 / self.fps))
+
+
+class LevelOfDetail(object):
+    """Keeps what is drawn in one frame of a dense graph bounded by the
+        screen resolution rather than by the number of points.
+
+        tracks -> polylines are simplified to within `tolerance` pixels,
+            see simplify_polyline.
+        markers -> only the first point drawn in each cell of a grid of
+            the marker size is marked, so markers do not pile up.
+        labels -> a label that would overlap a label already drawn, or
+            is off the graph, is left out. The labels drawn are kept in a
+            spatial grid of `label_cell` pixels, so each test only looks
+            at the labels near it. Earlier labels win.
+
+        Create one for each frame, see Graph.level_of_detail.
+
+        Attribute `culled` counts the markers and labels left out.
+        """
+
+    def __init__(self, size_x, size_y, tolerance=0.5, label_cell=32):
+
+        self.size_x = size_x
+        self.size_y = size_y
+        self.tolerance = tolerance
+        self.label_cell = label_cell
+        self.culled = 0
+
+        self._marker_grids = {}  # marker size: occupied cells, bool array
+        self._labels = {}  # (column, row): list of label rectangles (left, top, right, bottom)
+
+    def simplify(self, x, y):
+
+        """Indexes of the points of the polyline `x`, `y` to draw, see simplify_polyline."""
+
+        return simplify_polyline(x, y, self.tolerance)
+
+    def bin_markers(self, x, y, size):
+
+        """Indexes of the points at `x`, `y` to mark with markers of `size` pixels:
+            the first in each empty cell of the marker grid, on the graph."""
+
+        cell = max(int(size), 1)
+        columns = self.size_x // cell + 1
+        rows = self.size_y // cell + 1
+
+        grid = self._marker_grids.get(cell)
+        if grid is None:
+            grid = self._marker_grids[cell] = np.zeros(columns * rows, dtype=bool)
+
+        cx = np.floor(np.asarray(x) / cell).astype(np.int64)
+        cy = np.floor(np.asarray(y) / cell).astype(np.int64)
+        indexes = np.flatnonzero((cx >= 0) & (cx < columns) & (cy >= 0) & (cy < rows))
+        cells = cy[indexes] * columns + cx[indexes]
+
+        empty = ~grid[cells]
+        indexes, cells = indexes[empty], cells[empty]
+        cells, first = np.unique(cells, return_index=True)
+        grid[cells] = True
+
+        kept = np.sort(indexes[first])
+        self.culled += len(x) - len(kept)
+
+        return kept
+
+    def place_label(self, x, y, text, font):
+
+        """True if the label `text` in `font` with its baseline starting at
+            `x`, `y` can be drawn without overlapping the labels drawn, and
+            takes its place, else False."""
+
+        static_text, ascent = text_cache().lookup(text, font)
+        size = static_text.size()
+
+        left, top = float(x), float(y) - ascent
+        right, bottom = left + size.width(), top + size.height()
+
+        if right < 0 or bottom < 0 or left > self.size_x or top > self.size_y:
+            self.culled += 1
+            return False
+
+        cell = self.label_cell
+        cells = [(column, row)
+                 for column in range(int(left // cell), int(right // cell) + 1)
+                 for row in range(int(top // cell), int(bottom // cell) + 1)]
+
+        for key in cells:
+            for other_left, other_top, other_right, other_bottom in self._labels.get(key, ()):
+                if left < other_right and other_left < right and top < other_bottom and other_top < bottom:
+                    self.culled += 1
+                    return False
+
+        rectangle = (left, top, right, bottom)
+        for key in cells:
+            self._labels.setdefault(key, []).append(rectangle)
+
+        return True
+
+
+class TextCache(object):
+    """A least recently used cache of QStaticText, keyed by text and font.
+
+        A QStaticText holds the layout of its glyphs, so a label drawn
+        again, every frame for the pass labels, is not shaped again.
+        The colour is not part of the key: the text is drawn with the
+        pen of the painter.
+
+        Each thread has its own cache, see text_cache, as the graphs are
+        also drawn by the BackgroundRenderer thread.
+
+        Attributes `hits` and `misses` count the look ups.
+        """
+
+    def __init__(self, size=4096):
+
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+
+        self._texts = collections.OrderedDict()  # (text, font key): QStaticText
+
+        # the last font looked up, its key and ascent, as the font rarely changes between texts
+        self._font = None
+        self._font_key = None
+        self._ascent = 0.0
+
+    def lookup(self, text, font):
+
+        """The prepared QStaticText of `text` in `font` and the ascent of the font,
+            to put the static text, drawn from its top left, on the baseline.
+
+            Returns: (QStaticText, ascent in pixels)
+            """
+
+        if font != self._font:
+            self._font = QFont(font)
+            self._font_key = font.key()
+            self._ascent = QFontMetricsF(font).ascent()
+
+        key = (text, self._font_key)
+        static_text = self._texts.get(key)
+        if static_text is not None:
+            self._texts.move_to_end(key)
+            self.hits += 1
+            return static_text, self._ascent
+
+        self.misses += 1
+        static_text = QStaticText(text)
+        static_text.setTextFormat(Qt.PlainText)
+        static_text.setPerformanceHint(QStaticText.AggressiveCaching)
+        static_text.prepare(QTransform(), font)
+
+        self._texts[key] = static_text
+        if len(self._texts) > self.size:
+            self._texts.popitem(last=False)
+
+        return static_text, self._ascent
+
+    def clear(self):
+
+        self._texts.clear()
+        self._font = None
+
+
+_text_caches = threading.local()
+
+
+def text_cache():
+    """The TextCache of the calling thread."""
+
+    cache = getattr(_text_caches, 'cache', None)
+    if cache is None:
+        cache = _text_caches.cache = TextCache()
+
+    return cache
+
+
+def polygon_from_arrays(x, y):
+    """A QPolygonF of the points in arrays `x` and `y`, image coordinates,
+        written straight into the memory of the polygon."""
+
+    count = len(x)
+    polygon = QPolygonF(count)
+
+    if count:
+        memory = polygon.data()
+        memory.setsize(count * 2 * 8)  # QPointF is two doubles
+        points = np.frombuffer(memory, dtype=np.float64).reshape(count, 2)
+        points[:, 0] = x
+        points[:, 1] = y
+
+    return polygon
+
+
+# Chords of more points than this are searched with NumPy by simplify_polyline
+_SHORT_CHORD = 48
+
+
+def simplify_polyline(x, y, tolerance=0.5):
+    """Indexes of the points of the polyline `x`, `y` (image coordinates)
+        that draw it to within `tolerance` pixels.
+
+        Runs of points in the same `tolerance` sized pixel are reduced to
+        their first point in one NumPy pass, so no more points are left
+        than pixels along the line, then the Ramer-Douglas-Peucker
+        algorithm keeps the points further than `tolerance` from the chords
+        of the points kept. The first and last points are always kept."""
+
+    count = len(x)
+    if count < 3:
+        return np.arange(count)
+
+    # the first point of each run in the same pixel, and the last point
+    cx = np.floor(np.asarray(x) / tolerance)
+    cy = np.floor(np.asarray(y) / tolerance)
+    moved = np.empty(count, dtype=bool)
+    moved[0] = moved[-1] = True
+    moved[1:-1] = (cx[1:-1] != cx[:-2]) | (cy[1:-1] != cy[:-2])
+    indexes = np.flatnonzero(moved)
+
+    px = np.asarray(x, dtype=float)[indexes]
+    py = np.asarray(y, dtype=float)[indexes]
+    xs, ys = px.tolist(), py.tolist()  # Python floats are quicker than NumPy calls for short chords
+
+    keep = [False] * len(xs)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(xs) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        x0, y0 = xs[first], ys[first]
+        dx, dy = xs[last] - x0, ys[last] - y0
+        length = math.hypot(dx, dy)
+        limit = tolerance * length if length else tolerance
+
+        # the furthest point from the chord, distances times the length of the chord
+        if last - first > _SHORT_CHORD:
+            ex, ey = px[first + 1:last] - x0, py[first + 1:last] - y0
+            distances = np.abs(ex * dy - ey * dx) if length else np.hypot(ex, ey)
+            furthest = int(distances.argmax())
+            distance = distances[furthest]
+            furthest += first + 1
+        else:
+            furthest, distance = 0, -1.0
+            for i in range(first + 1, last):
+                if length:
+                    d = abs((xs[i] - x0) * dy - (ys[i] - y0) * dx)
+                else:
+                    d = math.hypot(xs[i] - x0, ys[i] - y0)  # a closed loop
+                if d > distance:
+                    furthest, distance = i, d
+
+        if distance > limit:
+            keep[furthest] = True
+            stack.append((first, furthest))
+            stack.append((furthest, last))
+
+    return indexes[np.array(keep)]
+
+
+def _polyline(x, y, lod=None):
+    """The QPolygonF of the polyline `x`, `y`, simplified if LevelOfDetail `lod` is given."""
+
+    if lod is not None:
+        kept = lod.simplify(x, y)
+        x, y = x[kept], y[kept]
+
+    return polygon_from_arrays(x, y)
+
+
+def draw_text(painter, x, y, text):
+    """Draws `text` with its baseline starting at image coordinates `x`, `y`,
+        as painter.drawText does, from the TextCache of the thread."""
+
+    if not text:
+        return
+
+    static_text, ascent = text_cache().lookup(text, painter.font())
+    painter.drawStaticText(QPointF(x, y - ascent), static_text)
+
+
+def _columns(line):
+    """The first two columns (x, y or r, theta) of a list of points as float arrays."""
+
+    values = np.array([point[:2] for point in line], dtype=float)
+
+    return values[:, 0], values[:, 1]
+
+
+def _draw_markers_and_texts(painter, line, x, y, default_size=None, lod=None):
+    """Draws the point rectangles and texts of the points in `line`
+        at image coordinates `x`, `y` using `painter`, through
+        LevelOfDetail `lod` if given.
+
+        The rectangles are grouped by colour and size and each group is
+        drawn with one drawRects call. Points without a size are not
+        marked unless `default_size` is given."""
+
+    xs = x.tolist()
+    ys = y.tolist()
+
+    groups = {}
+    for i, point in enumerate(line):
+        length = len(point)
+        if length >= 4:  # if point has a point size field
+            point_size = point[3]
+        elif default_size is None:
+            continue
+        else:
+            point_size = default_size
+
+        key = (point[2] if length >= 3 else None, point_size)
+        if key in groups:
+            groups[key].append(i)
+        else:
+            groups[key] = [i]
+
+    for (colour, point_size), indexes in groups.items():
+        if colour:
+            painter.setPen(QColor(colour))
+            painter.setBrush(QColor(colour))
+        else:
+            painter.setPen(Qt.black)  # default colour
+            painter.setBrush(Qt.black if default_size else Qt.NoBrush)
+
+        if lod is not None:
+            indexes = np.asarray(indexes)[lod.bin_markers(x[indexes], y[indexes], point_size + 1)].tolist()
+
+        offset = point_size // 2
+        painter.drawRects([QRectF(xs[i] - offset, ys[i] - offset, point_size, point_size) for i in indexes])
+
+    for i, point in enumerate(line):
+        if len(point) >= 5 and point[4]:  # if point has a text field
+            if lod is not None and not lod.place_label(xs[i], ys[i], point[4], painter.font()):
+                continue
+            painter.setPen(QColor(point[2]) if point[2] else QColor(Qt.black))
+            draw_text(painter, xs[i], ys[i], point[4])
+
+
+def _draw_columns(painter, line, x, y, polyline=True, markers=True, texts=True, default_size=None, lod=None):
+    """Draws Line `line` at image coordinates `x`, `y` using `painter`,
+        through LevelOfDetail `lod` if given.
+
+        The line is drawn as one polyline and the rectangles at the points
+        as one drawPoints call with a square pen of the point size, so
+        nothing is allocated per point apart from the labels."""
+
+    colour = QColor(line.colour)
+    painter.setPen(colour)
+
+    if polyline and len(x) > 1:
+        painter.drawPolyline(_polyline(x, y, lod))
+
+    point_size = line.point_size if line.point_size is not None else default_size
+    if markers and point_size:
+        # a rectangle of point_size with its outline
+        painter.setPen(QPen(colour, point_size + 1, Qt.SolidLine, Qt.SquareCap))
+        if lod is not None:
+            kept = lod.bin_markers(x, y, point_size + 1)
+            painter.drawPoints(polygon_from_arrays(x[kept], y[kept]))
+        else:
+            painter.drawPoints(polygon_from_arrays(x, y))
+        painter.setPen(colour)
+
+    if texts:
+        for i, text in line.labels.items():
+            if lod is None or lod.place_label(x[i], y[i], text, painter.font()):
+                draw_text(painter, x[i], y[i], text)
 
 
 def reCreateGraph(graph, new_x_size=None, new_y_size=None, new_text_pixel_size=None):
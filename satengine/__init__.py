@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""satengine.
+
+    Satellite pass prediction for SkyHamSat without any Qt dependency.
+
+    The engine takes plain data (satellite dicts, Observer, Skyfield
+    objects and Julian dates) so that it can be used by the GUI,
+    the command line and batch jobs alike. Only NumPy and Skyfield
+    are imported.
+
+    Usage:
+
+        catalog = Catalog.load('amateur.txt', 'satslist.json')
+        engine = PassEngine(catalog, Observer('51.388 N', '0.754 W', 100))
+        engine.transit_list(['AO-91'], 3)
+    """
+
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+
+from .cache import EventCache
+from .catalog import (SATSLIST_URL, TLE_URL, Catalog, SatelliteFilter, download, load_satellites, norad_number,
+                      satellites_filtered, satslist_csv_to_json)
+from .client import ServiceClient, ServiceError
+from .doppler import REFERENCE_FREQUENCIES, doppler_shift, downlink_frequency, uplink_frequency
+from .engine import PassEngine
+from .horizon import HorizonMask, find_masked_events, observer_events
+from .observer import Observer, observer_location
+from .passdb import PassDatabase, PassPredictor
+from .passes import EVENT_NAMES, PassDetails, event_list_from, find_events, passes_from_events
+from .positions import (NO_POSITION, adaptive_pass_track, alt_azimuth, look_angles, pass_details, pass_times,
+                        pass_track, rise_lower_bound, simplify_track)
+from .schedule import pass_weights, plan_schedule, satellite_priorities, schedule_passes, slew_gaps
+from .sunlight import (CIVIL_TWILIGHT, SUN_EPHEMERIS, PassIllumination, SunEphemeris, illumination,
+                       optically_visible, pass_illumination, sun_position, transponder_likely_on)
+from .timeline import PassTimeline, merged_passes, satellite_passes
+from .timescale import JULIAN_SEC, ts, utc_iso
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Caches of computed rise, transit and set events."""
+
+# standard imports:
+
+import threading
+
+# Third party modules:
+import numpy as np
+
+# Project modules:
+from .horizon import observer_events
+from .timescale import ts
+
+
+class EventCache(object):
+    """Caches the events found for each satellite and observer.
+
+        The events for a satellite are found over a window that is
+        `extra_days` longer than asked for, so that later queries, for
+        example 'the next day from now' every few seconds, are answered
+        from the cache until the window runs out.
+
+        Entries are keyed by NORAD number, TLE epoch and observer key,
+        so loading new TLEs or moving the observer never returns stale events.
+        """
+
+    def __init__(self, extra_days=1.0, max_entries=5000):
+
+        self.extra_days = extra_days
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = {}  # key -> (start: Julian, end: Julian, times: Time, events: array)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(satellite, observer):
+        """Cache key of `satellite` (EarthSatellite) seen by `observer` (Observer)."""
+
+        return satellite.model.satnum, satellite.epoch.tt, observer.key
+
+    def events(self, satellite, observer, start, end, altitude_degrees=0.0):
+        """The (times: Time, events: int array) of `satellite` seen by
+            `observer` from `start` to `end` (Julian TT dates), above
+            the observer's horizon mask if it has one."""
+
+        key = self.key(satellite, observer) + (altitude_degrees,)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry and entry[0] <= start and end <= entry[1]:
+            self.hits += 1
+        else:
+            self.misses += 1
+            window_end = end + self.extra_days
+            times, events = observer_events(satellite, observer, ts.tt_jd(start), ts.tt_jd(window_end),
+                                            altitude_degrees)
+            entry = (start, window_end, times, np.asarray(events))
+
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+                self._entries[key] = entry
+
+        cached_start, cached_end, times, events = entry
+        if not len(events):
+            return times, events
+
+        tt = times.tt
+        in_range = (tt >= start) & (tt <= end)
+        return times[in_range], events[in_range]
+
+    def clear(self):
+        """Remove all the cached events."""
+
+        with self._lock:
+            self._entries.clear()
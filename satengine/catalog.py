@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""The catalog of satellites: TLEs merged with the satellite information."""
+
+# standard imports:
+
+import json
+import urllib.request
+
+# Third party modules:
+from skyfield.api import load
+
+TLE_URL = 'http://celestrak.com/NORAD/elements/amateur.txt'
+SATSLIST_URL = 'http://www.ne.jp/asahi/hamradio/je9pel/satslist.csv'
+
+
+class SatelliteFilter(object):
+    """Selects satellites by their features and mode.
+
+        A satellite matches if it has any of the selected features
+        and the mode is 'Any' or one of its modes.
+        """
+
+    def __init__(self, transponder=True, uplink=True, downlink=True, beacon=True, mode='Any'):
+
+        self.transponder = transponder
+        self.uplink = uplink
+        self.downlink = downlink
+        self.beacon = beacon
+        self.mode = mode
+
+    @property
+    def key(self):
+        """Hashable tuple of the filter settings."""
+
+        return self.transponder, self.uplink, self.downlink, self.beacon, self.mode
+
+    def has_feature(self, s):
+        """True if satellite dict `s` has any of the selected features."""
+
+        hasTransponder = self.transponder and s['Transponder Uplink']
+        hasUplink = self.uplink and s['Uplinks']
+        hasDownlink = self.downlink and s['Downlinks']
+        hasBeacon = self.beacon and s['Beacons']
+
+        return any([hasTransponder, hasUplink, hasDownlink, hasBeacon])
+
+    def matches(self, s, dont_filter=False):
+        """True if satellite dict `s` is selected by the filter."""
+
+        hasMode = (self.mode == 'Any') or (self.mode in s['Modes'])
+
+        return (dont_filter or self.has_feature(s)) and hasMode
+
+
+class Catalog(object):
+    """The satellites that have both TLEs and satellite information.
+
+        Attribute `satellites` is a dict of satellite dicts keyed by satellite name.
+        Attribute `by_number` is a dict of Skyfield EarthSatellite objects keyed by NORAD number.
+        """
+
+    def __init__(self, satellites, by_number):
+
+        self.satellites = satellites
+        self.by_number = by_number
+
+    @classmethod
+    def load(cls, tle_source=TLE_URL, satslist_file='satslist.json'):
+        """Returns a new Catalog loaded from the TLEs and the json satellite information."""
+
+        return cls(*load_satellites(tle_source, satslist_file))
+
+    def satellite(self, satellite_name):
+        """The EarthSatellite for `satellite_name`.
+
+            Raises ValueError if the satellite does not have a valid NORAD number
+            and KeyError if it is not in the catalog."""
+
+        return self.by_number[int(self.satellites[satellite_name]['Number'])]
+
+    def filtered(self, satellite_filter=None, dont_filter=False):
+        """Generator to provide the satellite dicts selected by `satellite_filter`.
+
+            yields -> a satellite dict
+            """
+
+        if satellite_filter is None:
+            satellite_filter = SatelliteFilter()
+
+        for s in self.satellites.values():
+            if satellite_filter.matches(s, dont_filter):
+                yield s
+
+    def modes(self, satellite_filter=None):
+        """Sorted list of the modes of the satellites having
+            any of the features selected by `satellite_filter`."""
+
+        if satellite_filter is None:
+            satellite_filter = SatelliteFilter()
+
+        mode_list = set()
+        for s in self.satellites.values():
+            if satellite_filter.has_feature(s) and s['Modes']:
+                mode_list.update(s['Modes'])
+
+        return sorted(mode_list)
+
+
+def load_satellites(tle_source=TLE_URL, satslist_file='satslist.json'):
+    """Load the TLEs and the satellite information and merge the two.
+
+        tle_source -> a url or file name of the TLEs.
+        satslist_file -> the json file created from satslist.csv.
+
+        Returns: (satellites, by_number)
+            satellites -> dict of satellite dicts, keyed by satellite name,
+                for the active satellites that have TLEs.
+            by_number -> dict of Skyfield EarthSatellite objects keyed by NORAD number.
+        """
+
+    satellite_body_objects = load.tle_file(tle_source)
+    by_number = {sat.model.satnum: sat for sat in satellite_body_objects}
+
+    with open(satslist_file, 'r') as f:
+        satellite_data = json.load(f)
+
+    satellites = {s: satellite_data[s] for s in satellite_data
+                  if (norad_number(satellite_data[s]) in by_number
+                      and satellite_data[s]['Status'] in ['active', 'operational'])}
+
+    return satellites, by_number
+
+
+def norad_number(satellite_info):
+    """Returns the NORAD number of the satellite dict as an int,
+        or None if it does not have a valid number."""
+
+    try:
+        return int(satellite_info['Number'])
+    except ValueError:
+        return None
+
+
+def satellites_filtered(satellites, transponder=True, uplink=True, downlink=True, beacon=True,
+                        mode='Any', dont_filter=False):
+    """Generator to provide the satellite dicts in `satellites`
+        filtered by the feature flags and mode.
+
+        yields -> a satellite dict
+        """
+
+    satellite_filter = SatelliteFilter(transponder, uplink, downlink, beacon, mode)
+    for s in satellites.values():
+        if satellite_filter.matches(s, dont_filter):
+            yield s
+
+
+def download(url, filename, encoding=None):
+    """Download the text at `url` and save it in file `filename`."""
+
+    req = urllib.request.Request(url)
+    response = urllib.request.urlopen(req)
+    data = response.read().decode().splitlines()
+
+    with open(filename, 'w', encoding=encoding) as f:
+        for line in data:
+            f.write(line + '\n')
+
+
+def satslist_csv_to_json(csv_file='satslist.csv', json_file='satslist.json'):
+    """Convert the JE9PEL satslist.csv file to the satslist.json file.
+
+        Filter on active satellites from the file
+        create a dict of satellite dicts keyed by satellite name
+        and save it as the json file.
+        """
+
+    default = {'Satellite': '', 'Number': '', 'Transponder Uplink': [], 'Transponder Downlink': [], 'Uplinks': [],
+               'Downlinks': [], 'Beacons': [], 'Modes': [], 'Callsign': '', 'Status': ''}
+    csv_field_names = ['Satellite', 'Number', 'Uplink', 'Downlink', 'Beacon', 'Mode', 'Callsign', 'Status']
+
+    with open(csv_file, 'r') as f:
+        lines = [line.strip() for line in f]
+
+    # Generate the active satellites from the file
+    filter_active = (csv for csv in lines if csv.split(';')[7] == 'active' or 'operational')
+
+    # create a list of dicts using a comprehension by zipping the key names
+    # with the csv items
+    active_sats_list = [dict(zip(csv_field_names, (s.strip() for s in sat.strip().split(';'))))
+                        for sat in filter_active]
+
+    # remove duplicates by using satellite_name numbers
+    sat_number_list = []
+    for sat in active_sats_list[:]:
+        if sat['Number'] in sat_number_list:
+            active_sats_list.remove(sat)
+        else:
+            sat_number_list.append(sat['Number'])
+
+    sats_dict = {}
+    for s in active_sats_list:
+
+        sat_dict = default.copy()
+        for k in ['Satellite', 'Number', 'Callsign', 'Status']:
+            sat_dict[k] = s[k]
+
+        if s['Uplink']:
+            if '-' in s['Uplink']:
+                sat_dict['Transponder Uplink'] = s['Uplink'].split('-')
+            else:
+                sat_dict['Uplinks'] = s['Uplink'].split('/')
+
+        if s['Downlink']:
+            if '-' in s['Uplink']:
+                sat_dict['Transponder Downlink'] = s['Downlink'].split('-')
+            else:
+                sat_dict['Downlinks'] = s['Downlink'].split('/')
+
+        if s['Beacon']:
+            sat_dict['Beacons'] = s['Beacon'].split('/')
+
+        if s['Mode']:
+            sat_dict['Modes'] = s['Mode'].replace('bps ', 'bps:').split(' ')
+
+        sats_dict[s['Satellite']] = sat_dict
+
+    with open(json_file, 'w') as f:
+        json.dump(sats_dict, f)
+
+    return sats_dict
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""ServiceClient, a PassEngine look-alike that asks a PassService.
+
+    Lets the GUI run as a thin client of a shared local service
+    instead of doing its own propagation.
+    """
+
+# standard imports:
+
+import http.client
+import json
+import threading
+from urllib.parse import urlencode, urlsplit
+
+# Third party modules:
+import numpy as np
+from skyfield.api import Angle
+
+# Project modules:
+from .catalog import Catalog
+from .passes import PassDetails
+from .sunlight import PassIllumination
+from .timescale import ts
+
+
+class ServiceError(Exception):
+    """Exception raised when the service returns an error."""
+    pass
+
+
+class ServiceClient(object):
+    """Provides the PassEngine methods used by the GUI from a PassService at `url`.
+
+        The observer is the one the service was started with, setting
+        the `observer` attribute has no effect on the predictions.
+        """
+
+    def __init__(self, url='http://127.0.0.1:8787', timeout=10.0):
+
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+        self.observer = None
+
+        self._connection = None
+        self._lock = threading.Lock()
+
+        self.load_catalog()
+
+    def load_catalog(self):
+        """Get the satellite dicts from the service, e.g. after it has loaded new TLEs.
+
+            Returns: the new Catalog, it has no EarthSatellites.
+            """
+
+        self.catalog = Catalog(self.get('/catalog'), {})
+        return self.catalog
+
+    def get(self, path, **params):
+        """GET `path` with the query `params` and return the decoded JSON.
+
+            A keep-alive connection is reused, and re-opened once if it was closed."""
+
+        target = path + ('?' + urlencode(params, doseq=True) if params else '')
+
+        with self._lock:
+            for attempt in (1, 2):
+                if self._connection is None:
+                    self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                try:
+                    self._connection.request('GET', target)
+                    response = self._connection.getresponse()
+                    body = response.read()
+                    break
+                except (http.client.HTTPException, ConnectionError):
+                    self._connection.close()
+                    self._connection = None
+                    if attempt == 2:
+                        raise
+
+        data = json.loads(body.decode())
+        if response.status != 200:
+            raise ServiceError(data.get('error', response.reason))
+
+        return data
+
+    def next_passes(self, satellite_name, number_of_passes, start=None, days=1):
+        """Returns: event_list: list of (ts, 'rise' | 'transit' | 'set')"""
+
+        params = {'satellite': satellite_name, 'passes': number_of_passes, 'days': days}
+        if start is not None:
+            params['start'] = float(start)
+
+        return [(ts.tt_jd(t), name) for t, name in self.get('/events', **params)]
+
+    def transit_list(self, satellite_names, number_of_passes, sort=True, start=None):
+        """:returns: [rise time: Julian, transit time: Julian, set time: Julian,
+                        satellite name: string, maximum altitude: degrees]
+
+            A satellite without any passes has an entry with zero times and altitude,
+            as PassEngine.transit_list.
+            """
+
+        if not satellite_names:
+            return []
+
+        params = {'satellite': list(satellite_names), 'passes': number_of_passes}
+        if start is not None:
+            params['start'] = float(start)
+
+        transit_list = [[p['rise'], p['transit'], p['set'], p['satellite'], p['max_altitude']]
+                        for p in self.get('/passes', **params)]
+
+        # the service leaves out the satellites its filter does not match
+        found = {record[3] for record in transit_list}
+        missing = [[0, 0, 0, name, 0.0] for name in satellite_names if name not in found]
+        if missing:
+            transit_list.extend(missing)
+            if sort:
+                transit_list.sort()
+
+        if not sort:
+            order = {name: i for i, name in enumerate(satellite_names)}
+            transit_list.sort(key=lambda t: order[t[3]])
+
+        return transit_list
+
+    def alt_azimuth(self, satellite_name, calc_time):
+        """Returns: alt: Angle, az: Angle, slant velocity: km/sec"""
+
+        look = self.get('/look', satellite=satellite_name, time=float(calc_time))[0]
+
+        return Angle(degrees=look['alt']), Angle(degrees=look['az']), look['slant_velocity']
+
+    def rise_lower_bound(self, satellite_name, calc_time):
+        """Returns `calc_time`, the orbits are not known here, so the satellite may rise at any time."""
+
+        return calc_time
+
+    def pass_details(self, satellite_name, passes, start=None):
+        """Returns: list of PassDetails of `passes`, [[rise, transit, set, satellite name, ...], ...]"""
+
+        if not len(passes):
+            return []
+
+        params = {'satellite': satellite_name,
+                  'pass': [','.join(repr(float(t)) for t in record[:3]) for record in passes]}
+        if start is not None:
+            params['start'] = float(start)
+
+        return [PassDetails.from_dict(d) for d in self.get('/details', **params)]
+
+    def pass_illumination(self, satellite_name, passes, start=None):
+        """Returns: list of PassIllumination of `passes`, [[rise, transit, set, satellite name, ...], ...]"""
+
+        if not len(passes):
+            return []
+
+        params = {'satellite': satellite_name,
+                  'pass': [','.join(repr(float(t)) for t in record[:3]) for record in passes]}
+        if start is not None:
+            params['start'] = float(start)
+
+        return [PassIllumination.from_dict(d) for d in self.get('/light', **params)]
+
+    def next_pass_details(self, satellite_name, number_of_passes, start=None, days=1):
+        """Returns: list of PassDetails of the next `number_of_passes` passes"""
+
+        params = {'satellite': satellite_name, 'passes': number_of_passes, 'days': days}
+        if start is not None:
+            params['start'] = float(start)
+
+        return [PassDetails.from_dict(d) for d in self.get('/details', **params)]
+
+    def pass_track(self, satellite_name, rise_time, setting_time, interval):
+        """Returns: (times: Julian array, alt: degrees array, az: radians array,
+                     slant velocity: km/sec array)
+            """
+
+        track = self.get('/track', satellite=satellite_name,
+                         rise=float(rise_time), set=float(setting_time), interval=interval)
+
+        return (np.array(track['times']), np.array(track['alt']),
+                np.array(track['az']), np.array(track['slant_velocity']))
+
+    def adaptive_pass_track(self, satellite_name, rise_time, setting_time, max_error=0.25, label_interval=None):
+        """Returns: (times: Julian array, alt: degrees array, az: radians array,
+                     slant velocity: km/sec array)
+            """
+
+        track = self.get('/track', satellite=satellite_name, rise=float(rise_time), set=float(setting_time),
+                         max_error=max_error, label_interval=label_interval or 0)
+
+        return (np.array(track['times']), np.array(track['alt']),
+                np.array(track['az']), np.array(track['slant_velocity']))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Doppler shift of satellite frequencies."""
+
+SPEED_OF_LIGHT = 300000  # km/sec
+
+REFERENCE_FREQUENCIES = (145.9e6, 436.5e6)  # Hz, 2 m and 70 cm, for Doppler figures of passes
+
+
+def doppler_shift(slant_velocity, frequency):
+    """Doppler shift in Hz of `frequency` (Hz) received from a satellite
+        moving at `slant_velocity` (km/sec, positive when moving away).
+
+        Works equally with NumPy arrays of slant velocities."""
+
+    return -slant_velocity / SPEED_OF_LIGHT * frequency
+
+
+def downlink_frequency(frequency, slant_velocity):
+    """Frequency (Hz) heard on the ground for a satellite transmitting on `frequency` (Hz)."""
+
+    return frequency + doppler_shift(slant_velocity, frequency)
+
+
+def uplink_frequency(frequency, slant_velocity):
+    """Frequency (Hz) to transmit so that the satellite receives `frequency` (Hz)."""
+
+    return frequency - doppler_shift(slant_velocity, frequency)
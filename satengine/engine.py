@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""PassEngine, the pass prediction used by the GUI, command line and services."""
+
+# Project modules:
+from .cache import EventCache
+from .doppler import doppler_shift
+from .passes import event_list_from, passes_from_events
+from .positions import NO_POSITION, adaptive_pass_track, alt_azimuth, pass_details, pass_track, rise_lower_bound
+from .sunlight import pass_illumination
+from .timescale import ts
+
+
+class PassEngine(object):
+    """Predicts passes for the satellites in a Catalog seen by an Observer.
+
+        Satellites are referred to by name, times are Julian TT dates.
+        Found events are kept in an EventCache so that repeated
+        predictions, e.g. by timers, do not re-run the event search.
+
+        The `observer` and `catalog` attributes may be replaced at any time,
+        a satellite that is not in the catalog then has no passes or position.
+        """
+
+    def __init__(self, catalog, observer, cache=None):
+
+        self.catalog = catalog
+        self.observer = observer
+        self.cache = cache if cache is not None else EventCache()
+
+    def next_passes(self, satellite_name, number_of_passes, start=None, days=1):
+        """The events for the next `number_of_passes` passes of the
+            satellite within `days` of `start` (Julian, default now).
+
+            Returns: event_list: list of (ts, 'rise' | 'transit' | 'set'),
+                empty if the satellite is not in the catalog or has no valid NORAD number.
+            """
+
+        if start is None:
+            start = ts.now().tt
+
+        try:
+            satellite = self.catalog.satellite(satellite_name)
+        except (KeyError, ValueError):
+            return []
+
+        times, events = self.cache.events(satellite, self.observer, start, start + days)
+
+        return event_list_from(times, events, number_of_passes)
+
+    def transit_list(self, satellite_names, number_of_passes, sort=True, start=None):
+        """:returns: [rise time: Julian, transit time: Julian, set time: Julian,
+                        satellite name: string, maximum altitude: degrees]
+
+            A satellite without any passes has an entry with zero times and altitude.
+            """
+
+        if start is None:
+            start = ts.now().tt
+
+        transit_list = []
+
+        for sat in satellite_names:
+            passes = passes_from_events(self.next_passes(sat, number_of_passes, start), sat)
+
+            # the maximum altitudes of all of the passes in one vectorized computation
+            transit_list.extend(details.record for details in self.pass_details(sat, passes, start))
+
+            if not passes:
+                transit_list.append([0, 0, 0, sat, 0.0])
+
+        if sort:
+            transit_list.sort()
+
+        return transit_list
+
+    def alt_azimuth(self, satellite_name, calc_time):
+        """Returns: alt: Angle, az: Angle, slant velocity: km/sec"""
+
+        try:
+            satellite = self.catalog.satellite(satellite_name)
+        except (KeyError, ValueError):
+            return NO_POSITION
+
+        return alt_azimuth(satellite, self.observer.location, calc_time)
+
+    def rise_lower_bound(self, satellite_name, calc_time):
+        """A Julian time that the satellite cannot rise before, from `calc_time`.
+
+            It is `calc_time` for a satellite not in the catalog or without a valid NORAD number,
+            whose passes are empty anyway.
+            """
+
+        try:
+            satellite = self.catalog.satellite(satellite_name)
+        except (KeyError, ValueError):
+            return calc_time
+
+        horizon = self.observer.horizon
+        min_altitude = horizon.min_elevation if horizon is not None else 0.0
+
+        return rise_lower_bound(satellite, self.observer.location, calc_time, min_altitude)
+
+    def pass_details(self, satellite_name, passes, start=None):
+        """The PassDetails of `passes` of the satellite, from one vectorized computation.
+
+            passes -> [[rise time: Julian, transit time: Julian, set time: Julian,
+                        satellite name: string, ...], ...], e.g. from passes_from_events.
+            start -> Julian, where a pass in progress (rise time 0) is taken to start.
+
+            Returns: list of PassDetails, empty if the satellite is not in the catalog
+                or has no valid NORAD number.
+            """
+
+        try:
+            satellite = self.catalog.satellite(satellite_name)
+        except (KeyError, ValueError):
+            return []
+
+        return pass_details(satellite, self.observer.location, passes, start)
+
+    def pass_illumination(self, satellite_name, passes, start=None):
+        """The PassIllumination, sunlit and visible parts, of `passes` of the satellite,
+            from one vectorized computation, as pass_details.
+
+            Returns: list of PassIllumination, empty if the satellite is not in the catalog
+                or has no valid NORAD number.
+            """
+
+        try:
+            satellite = self.catalog.satellite(satellite_name)
+        except (KeyError, ValueError):
+            return []
+
+        return pass_illumination(satellite, self.observer.location, passes, start)
+
+    def next_pass_details(self, satellite_name, number_of_passes, start=None, days=1):
+        """The PassDetails of the next `number_of_passes` passes of the
+            satellite within `days` of `start` (Julian, default now), as next_passes."""
+
+        if start is None:
+            start = ts.now().tt
+
+        passes = passes_from_events(self.next_passes(satellite_name, number_of_passes, start, days), satellite_name)
+
+        return self.pass_details(satellite_name, passes, start)
+
+    def pass_track(self, satellite_name, rise_time, setting_time, interval):
+        """Track of a pass with points every `interval` seconds.
+
+            Returns: (times: Julian array, alt: degrees array, az: radians array,
+                      slant velocity: km/sec array)
+            """
+
+        satellite = self.catalog.satellite(satellite_name)
+
+        return pass_track(satellite, self.observer.location, rise_time, setting_time, interval)
+
+    def adaptive_pass_track(self, satellite_name, rise_time, setting_time, max_error=0.25, label_interval=None):
+        """Track of a pass with points where the track bends, to within
+            `max_error` degrees, and every `label_interval` seconds if given.
+
+            Returns: (times: Julian array, alt: degrees array, az: radians array,
+                      slant velocity: km/sec array)
+            """
+
+        satellite = self.catalog.satellite(satellite_name)
+
+        return adaptive_pass_track(satellite, self.observer.location, rise_time, setting_time,
+                                   max_error, label_interval)
+
+    def doppler(self, satellite_name, calc_time, frequency):
+        """Doppler shift in Hz of `frequency` (Hz) for the satellite at `calc_time`."""
+
+        alt, az, slant_velocity = self.alt_azimuth(satellite_name, calc_time)
+
+        return doppler_shift(slant_velocity, frequency)
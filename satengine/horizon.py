@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Horizon masks: the elevation of the local horizon in each direction.
+
+    Trees and buildings around a site hide a satellite until it is above
+    them, so the rise and set are where the elevation of the satellite
+    crosses the elevation of the horizon at its azimuth. Skyfield's
+    find_events only searches for a constant altitude, so the masked
+    events are found from it in two steps:
+
+        the events above the lowest point of the mask are found with
+            find_events, a satellite is only visible within those passes,
+        the passes are sampled in one vectorized call of
+            elevation - mask(azimuth), whose changes of sign are refined
+            by false position, all of the crossings at once.
+
+    The mask is a dense lookup table over azimuth, so looking up the
+    horizon of every sample is one indexing operation. The cost of a
+    masked prediction is that of the flat horizon prediction plus a few
+    look_angles calls over the passes.
+
+    A mask file has a line for each point of the profile, azimuth and
+    elevation in degrees separated by spaces or a comma, with # comments:
+
+        # az  el
+        0     5.0
+        90    12.5
+        180   3.0
+        270   8.0
+
+    The elevation between points is interpolated linearly around the circle.
+    """
+
+# standard imports:
+
+import hashlib
+
+# Third party modules:
+import numpy as np
+
+# Project modules:
+from .positions import look_angles
+from .timescale import JULIAN_SEC, ts
+
+MASK_RESOLUTION = 0.1  # degrees of azimuth between the entries of the lookup table
+MASK_STEP = 10.0  # seconds between the samples of the passes searched for crossings of the mask
+MASK_ITERATIONS = 3  # steps of false position refining each crossing found between samples
+
+
+class HorizonMask(object):
+    """The elevation of the horizon around a site, from a profile of (azimuth, elevation) points in degrees.
+
+        The profile is interpolated into a table every `resolution` degrees
+        of azimuth, looked up by elevation() with a multiply and an index.
+
+        Attribute `key` is a short text identifying the mask, part of the
+        key of the observer used by the caches.
+        """
+
+    def __init__(self, points, resolution=MASK_RESOLUTION):
+
+        points = sorted((float(az) % 360.0, float(el)) for az, el in points)
+        if not points:
+            raise ValueError('A horizon mask needs at least one point')
+
+        self.points = points
+        self.resolution = resolution
+
+        azimuths = np.array([az for az, el in points])
+        elevations = np.array([el for az, el in points])
+        table_azimuths = np.arange(int(round(360.0 / resolution))) * resolution
+        self.table = np.interp(table_azimuths, azimuths, elevations, period=360.0)
+        self._low = np.append(self.table, self.table[0])
+        self._rise = np.diff(np.append(self._low, self.table[1]))
+
+        self.min_elevation = float(self.table.min())
+        self.max_elevation = float(self.table.max())
+
+        self.key = hashlib.sha1(repr((resolution, points)).encode()).hexdigest()[:16]
+
+    @classmethod
+    def load(cls, path, resolution=MASK_RESOLUTION):
+        """The HorizonMask of the mask file `path`, see the module docstring."""
+
+        points = []
+        with open(path) as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.split('#', 1)[0].replace(',', ' ').strip()
+                if not line:
+                    continue
+                try:
+                    az, el = (float(v) for v in line.split())
+                except ValueError:
+                    raise ValueError(f'{path} line {line_number}: expected azimuth and elevation, got {line!r}')
+                points.append((az, el))
+
+        return cls(points, resolution)
+
+    def elevation(self, azimuth):
+        """The elevation of the horizon in degrees at `azimuth` (degrees, or an array of them)."""
+
+        position = np.mod(np.asarray(azimuth, dtype=float), 360.0) / self.resolution
+        index = position.astype(int)
+        fraction = position - index
+
+        # linear between the entries, so that the horizon has no steps for a track to flicker across
+        return self._low[index] + fraction * self._rise[index]
+
+    def __eq__(self, other):
+        return isinstance(other, HorizonMask) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f'HorizonMask({len(self.points)} points, {self.min_elevation:0.1f}° to {self.max_elevation:0.1f}°)'
+
+
+def observer_events(satellite, observer, start_ts, end_ts, altitude_degrees=0.0):
+    """The rise, transit and set events of `satellite` seen by `observer` (Observer)
+        from `start_ts` to `end_ts`, above its horizon mask if it has one.
+
+        Returns: (times: Time, events: int array) as Skyfield's find_events
+        """
+
+    if observer.horizon is None:
+        return satellite.find_events(observer.location, start_ts, end_ts, altitude_degrees=altitude_degrees)
+
+    return find_masked_events(satellite, observer.location, observer.horizon, start_ts, end_ts, altitude_degrees)
+
+
+def find_masked_events(satellite, location, mask, start_ts, end_ts, altitude_degrees=0.0, step=MASK_STEP):
+    """The rise, transit and set events of `satellite` seen from `location` (a Topos)
+        above the HorizonMask `mask`, and `altitude_degrees`, from `start_ts` to `end_ts`.
+
+        A rise is where the satellite comes above the mask, a set where it
+        goes behind it, so an obstruction in the middle of a pass makes two
+        passes. A transit is only reported if the satellite is visible at
+        the transit. A gap in the mask narrower than the track covers in
+        `step` seconds may be missed.
+
+        Returns: (times: Time, events: int array) as Skyfield's find_events
+        """
+
+    lowest = max(mask.min_elevation, altitude_degrees)
+    times, events = satellite.find_events(location, start_ts, end_ts, altitude_degrees=lowest)
+    start, end = start_ts.tt, end_ts.tt
+
+    def clearance(sample_times):
+        """Degrees the satellite is above the horizon at `sample_times`, negative below it."""
+        alt, az, distance, slant_velocity = look_angles(satellite, location, sample_times)
+        return alt - np.maximum(mask.elevation(np.degrees(az)), altitude_degrees)
+
+    # the intervals above the lowest point of the mask, outside them the satellite is hidden
+    if len(events):
+        up_at_start = events[0] != 0
+    else:
+        alt, az, distance, slant_velocity = look_angles(satellite, location, start)
+        up_at_start = alt[0] > lowest
+
+    intervals = []
+    transits = []
+    interval_start = start if up_at_start else None
+    for t, event in zip(times.tt, events):
+        if event == 0:
+            interval_start = t
+        elif event == 1:
+            transits.append(t)
+        elif interval_start is not None:
+            intervals.append((interval_start, t))
+            interval_start = None
+    if interval_start is not None:
+        intervals.append((interval_start, end))
+
+    if not intervals:
+        return ts.tt_jd(np.empty(0)), np.empty(0, dtype=int)
+
+    # every interval, with the transits, sampled in one call
+    segments = [np.union1d(np.arange(first, last, step * JULIAN_SEC), [last]) for first, last in intervals]
+    lengths = np.array([len(segment) for segment in segments])
+    firsts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    lasts = firsts + lengths - 1
+
+    sample_times = np.concatenate(segments)
+    transits = np.array(transits)
+    transit_samples = np.searchsorted(sample_times, transits)
+    sample_times = np.insert(sample_times, transit_samples, transits)
+    firsts += np.searchsorted(transit_samples, firsts, side='right')
+    lasts += np.searchsorted(transit_samples, lasts, side='right')
+    transit_samples += np.arange(len(transits))
+
+    heights = clearance(sample_times)
+    visible = heights > 0
+
+    # changes of visibility between samples, not across intervals
+    changes = np.flatnonzero(visible[:-1] != visible[1:])
+    changes = changes[~np.isin(changes, lasts)]
+    rising = ~visible[changes]
+
+    # refined by false position, all of the crossings at once, with the Illinois
+    # change that halves the height of an end of the bracket that is kept twice
+    t_low, t_high = sample_times[changes], sample_times[changes + 1]
+    h_low, h_high = heights[changes], heights[changes + 1]
+    kept_high = np.zeros(len(changes), dtype=bool)
+    kept_low = np.zeros(len(changes), dtype=bool)
+    for i in range(MASK_ITERATIONS if len(changes) else 0):
+        t = _secant(t_low, h_low, t_high, h_high)
+        h = clearance(t)
+        replace_low = (h > 0) == (h_low > 0)
+        h_high = np.where(replace_low & kept_high, h_high / 2, h_high)
+        h_low = np.where(~replace_low & kept_low, h_low / 2, h_low)
+        t_low, h_low = np.where(replace_low, t, t_low), np.where(replace_low, h, h_low)
+        t_high, h_high = np.where(replace_low, t_high, t), np.where(replace_low, h_high, h)
+        kept_high, kept_low = replace_low, ~replace_low
+    crossings = _secant(t_low, h_low, t_high, h_high)
+
+    event_times = [crossings]
+    event_codes = [np.where(rising, 0, 2)]
+
+    # an interval that starts or ends with the satellite visible rises or sets there,
+    # unless it is the start or end of the search
+    interval_starts = np.array([first for first, last in intervals])
+    interval_ends = np.array([last for first, last in intervals])
+    starts_visible = visible[firsts] & (interval_starts > start)
+    ends_visible = visible[lasts] & (interval_ends < end)
+    event_times.extend([interval_starts[starts_visible], interval_ends[ends_visible]])
+    event_codes.extend([np.zeros(starts_visible.sum(), dtype=int), np.full(ends_visible.sum(), 2)])
+
+    visible_transits = transits[visible[transit_samples]]
+    event_times.append(visible_transits)
+    event_codes.append(np.ones(len(visible_transits), dtype=int))
+
+    event_times = np.concatenate(event_times)
+    event_codes = np.concatenate(event_codes)
+    order = np.argsort(event_times, kind='stable')
+
+    return ts.tt_jd(event_times[order]), event_codes[order]
+
+
+def _secant(t_low, h_low, t_high, h_high):
+    """Where the line through (t_low, h_low) and (t_high, h_high) crosses zero, for brackets of a crossing."""
+
+    return t_low - h_low * (t_high - t_low) / (h_high - h_low)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""The observer's location."""
+
+# Third party modules:
+from skyfield.api import Topos
+
+
+class Observer(object):
+    """An observer's location on the Earth.
+
+        latitude and longitude are strings such as '51.38833333333 N'
+        and '0.75416666666 W', elevation_m is in metres.
+        horizon -> optional HorizonMask of the trees and buildings around
+            the site, passes are predicted above it.
+
+        Attribute `location` is the Skyfield Topos used for calculations.
+        Attribute `key` is a hashable tuple identifying the location,
+        used by the caches.
+        """
+
+    def __init__(self, latitude='51.38833333333 N', longitude='0.75416666666 W', elevation_m=100.0, horizon=None):
+
+        self.latitude = latitude
+        self.longitude = longitude
+        self.elevation_m = float(elevation_m)
+        self.horizon = horizon
+
+        self.location = Topos(latitude, longitude, elevation_m=self.elevation_m)
+
+        self.key = (latitude, longitude, self.elevation_m)
+        if horizon is not None:
+            self.key += (horizon.key,)
+
+    def __eq__(self, other):
+        return isinstance(other, Observer) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        horizon = f', {self.horizon!r}' if self.horizon is not None else ''
+        return f'Observer({self.latitude!r}, {self.longitude!r}, {self.elevation_m!r}{horizon})'
+
+
+def observer_location(latitude, longitude, elevation_m):
+    """Returns the observer location as a Topos.
+
+        latitude and longitude are strings such as '51.38833333333 N'."""
+
+    return Topos(latitude, longitude, elevation_m=elevation_m)
@@ -0,0 +1,477 @@
+# -*- coding: utf-8 -*-
+"""A persistent store of predicted passes, for time range queries.
+
+    The passes of each satellite are kept in an SQLite file with the
+    time range they were predicted over. Passes are indexed by their
+    time interval and maximum altitude in an R*Tree, so a query such as
+    'every pass above 30° between 18:00 and 23:00 each evening this
+    week' reads only the passes that overlap the times asked for.
+    Each pass is stored with its PassDetails, computed with its
+    prediction, so reports of the passes need no more propagation.
+
+    A satellite whose stored passes do not cover a query, or were
+    predicted from older TLEs or for another observer, is predicted on
+    demand and stored. A PassPredictor fills the store ahead of time
+    on its own thread, so that queries are normally answered from it.
+
+    Usage:
+        database = PassDatabase('passes.sqlite')
+        database.transit_list(engine, satellite_names, start, end, min_altitude=30)
+    """
+
+# standard imports:
+
+import sqlite3
+import threading
+
+# Project modules:
+from .client import ServiceClient, ServiceError
+from .passes import PassDetails
+from .timeline import satellite_passes
+from .timescale import ts
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS passes (
+    id INTEGER PRIMARY KEY,
+    observer TEXT NOT NULL,
+    satellite TEXT NOT NULL,
+    up REAL NOT NULL,
+    rise REAL NOT NULL,
+    transit REAL NOT NULL,
+    setting REAL NOT NULL,
+    max_altitude REAL NOT NULL,
+    aos_az REAL NOT NULL,
+    transit_az REAL NOT NULL,
+    los_az REAL NOT NULL,
+    min_range REAL NOT NULL,
+    max_slant_velocity REAL NOT NULL,
+    max_slant_acceleration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS passes_by_satellite ON passes (observer, satellite, setting);
+CREATE TABLE IF NOT EXISTS coverage (
+    observer TEXT NOT NULL,
+    satellite TEXT NOT NULL,
+    epoch REAL NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    PRIMARY KEY (observer, satellite)
+);
+'''
+
+# id, time interval and altitude range of each pass, the altitude range is the single max altitude.
+# R*Tree coordinates are 32 bit floats, rounded outwards, so the times are in days from INDEX_EPOCH
+# and the query is made exact with the times and altitude of the passes table.
+RTREE_SCHEMA = 'CREATE VIRTUAL TABLE IF NOT EXISTS pass_index USING rtree(id, start, end, low, high)'
+
+# Without the R*Tree module, an ordinary index on the set time
+INDEX_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pass_index (id INTEGER PRIMARY KEY, start REAL, end REAL, low REAL, high REAL);
+CREATE INDEX IF NOT EXISTS pass_index_by_end ON pass_index (end);
+'''
+
+# PRAGMA user_version of the tables above, a file with older tables is emptied and they are made again
+SCHEMA_VERSION = 2
+DROP_SCHEMA = '''
+DROP TABLE IF EXISTS passes;
+DROP TABLE IF EXISTS coverage;
+DROP TABLE IF EXISTS pass_index;
+'''
+
+COLUMNS = {'transit_list': 'p.rise, p.transit, p.setting, p.satellite, p.max_altitude',
+           'details': 'p.rise, p.transit, p.setting, p.satellite, p.aos_az, p.transit_az, p.los_az, p.max_altitude, '
+                      'p.min_range, p.max_slant_velocity, p.max_slant_acceleration'}
+
+QUERY = '''
+SELECT {columns}
+FROM pass_index i JOIN passes p ON p.id = i.id
+WHERE i.start <= :end_index AND i.end >= :start_index AND i.high >= :min_altitude
+    AND p.up < :end AND p.setting > :start AND p.max_altitude >= :min_altitude AND p.observer = :observer
+ORDER BY p.up, p.satellite
+'''
+
+INDEX_EPOCH = 2451545.0  # J2000
+
+SEARCH_WINDOW = 1.0  # days of events searched at a time when predicting
+
+
+def observer_key(engine):
+    """The text identifying the observer of `engine`, passes are stored for each observer."""
+
+    if isinstance(engine, ServiceClient):
+        return f'service {engine.host}:{engine.port}'  # the observer is the service's
+
+    return repr(engine.observer.key)
+
+
+def satellite_epoch(engine, satellite_name):
+    """The TLE epoch (Julian) of the satellite, 0 if it is not known.
+
+        A ServiceClient has no TLEs, the epoch is the one in the service's catalog."""
+
+    if isinstance(engine, ServiceClient):
+        return engine.catalog.satellites.get(satellite_name, {}).get('Epoch', 0.0)
+
+    try:
+        return engine.catalog.satellite(satellite_name).epoch.tt
+    except (ValueError, KeyError):
+        return 0.0
+
+
+class PassDatabase(object):
+    """Predicted passes stored in the SQLite file `path`, ':memory:' for a store that is not kept.
+
+        The PassDatabase may be used from several threads.
+
+        Attributes `hits` and `misses` count the satellites answered from
+        the store and predicted on demand.
+        """
+
+    def __init__(self, path='passes.sqlite'):
+
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.RLock()  # held for each use of the connection
+        self._predicting = {}  # Lock of each (observer, satellite), held while it is checked and predicted
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+        with self._lock, self._connection:
+            if self._connection.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                self._connection.executescript(DROP_SCHEMA)
+                self._connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self._connection.executescript(SCHEMA)
+            try:
+                self._connection.execute(RTREE_SCHEMA)
+            except sqlite3.OperationalError:
+                self._connection.executescript(INDEX_SCHEMA)
+
+    def close(self):
+
+        with self._lock:
+            self._connection.close()
+
+    def coverage(self, engine, satellite_name):
+        """(start, end) Julian of the stored passes of the satellite, None if there are none
+            for the observer of `engine` and the satellite's current TLE."""
+
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT epoch, start, end FROM coverage WHERE observer = ? AND satellite = ?',
+                (observer_key(engine), satellite_name)).fetchone()
+
+        if row is None or row[0] != satellite_epoch(engine, satellite_name):
+            return None
+
+        return row[1], row[2]
+
+    def ensure(self, engine, satellite_name, start, end):
+        """Predict and store the passes of the satellite from `start` to `end` (Julian)
+            that are not stored already.
+
+            The stored range is extended forwards if it starts by `start`,
+            otherwise the satellite is predicted again from `start`.
+
+            Only the prediction of the same satellite for the same observer
+            is waited for, e.g. a query of the GUI is not held up by the
+            PassPredictor filling the store with other satellites.
+
+            Returns: True if the passes were already stored.
+            """
+
+        with self._lock:
+            predicting = self._predicting.setdefault((observer_key(engine), satellite_name), threading.Lock())
+
+        with predicting:
+            covered = self.coverage(engine, satellite_name)
+            with self._lock:
+                if covered and covered[0] <= start and end <= covered[1]:
+                    self.hits += 1
+                    return True
+                self.misses += 1
+
+            if covered and covered[0] <= start <= covered[1]:
+                self._predict(engine, satellite_name, covered[0], covered[1], end)
+            else:
+                self._predict(engine, satellite_name, start, start, end)
+
+        return False
+
+    def _predict(self, engine, satellite_name, start, predict_from, end):
+        """Store the passes of the satellite that rise from `predict_from` to `end`,
+            the stored range becomes `start` to `end`."""
+
+        observer = observer_key(engine)
+        extending = predict_from > start
+
+        passes = []
+        for key, record in satellite_passes(engine, satellite_name, predict_from, end, SEARCH_WINDOW):
+            if record is None:
+                continue
+            if extending and not record[0]:
+                continue  # in progress at the end of the stored range, already stored
+            passes.append(record)
+
+        # the reports of all of the passes in one vectorized computation
+        details = engine.pass_details(satellite_name, passes, predict_from)
+
+        with self._lock, self._connection:
+            connection = self._connection
+            if not extending:
+                self._delete(observer, satellite_name)
+
+            for d in details:
+                up = d.rise or predict_from
+                cursor = connection.execute(
+                    'INSERT INTO passes (observer, satellite, up, rise, transit, setting, max_altitude, '
+                    'aos_az, transit_az, los_az, min_range, max_slant_velocity, max_slant_acceleration) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (observer, satellite_name, up, d.rise, d.transit, d.setting, d.max_altitude,
+                     d.aos_az, d.transit_az, d.los_az, d.min_range, d.max_slant_velocity, d.max_slant_acceleration))
+                connection.execute('INSERT INTO pass_index (id, start, end, low, high) VALUES (?, ?, ?, ?, ?)',
+                                   (cursor.lastrowid, up - INDEX_EPOCH, d.setting - INDEX_EPOCH,
+                                    d.max_altitude, d.max_altitude))
+
+            connection.execute('INSERT OR REPLACE INTO coverage (observer, satellite, epoch, start, end) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               (observer, satellite_name, satellite_epoch(engine, satellite_name), start, end))
+
+    def _delete(self, observer, satellite_name):
+        """Delete the stored passes of the satellite, the caller holds the lock in a transaction."""
+
+        self._connection.execute('DELETE FROM pass_index WHERE id IN '
+                                 '(SELECT id FROM passes WHERE observer = ? AND satellite = ?)',
+                                 (observer, satellite_name))
+        self._connection.execute('DELETE FROM passes WHERE observer = ? AND satellite = ?',
+                                 (observer, satellite_name))
+        self._connection.execute('DELETE FROM coverage WHERE observer = ? AND satellite = ?',
+                                 (observer, satellite_name))
+
+    def prune(self, before):
+        """Delete the passes of all observers that set before Julian `before`."""
+
+        with self._lock, self._connection:
+            connection = self._connection
+            connection.execute('DELETE FROM pass_index WHERE id IN (SELECT id FROM passes WHERE setting < ?)',
+                               (before,))
+            connection.execute('DELETE FROM passes WHERE setting < ?', (before,))
+            connection.execute('UPDATE coverage SET start = ? WHERE start < ?', (before, before))
+
+    def query(self, engine, start, end, min_altitude=0.0, satellite_names=None):
+        """The stored passes that are up at any time from `start` to `end` (Julian)
+            with a maximum altitude of at least `min_altitude` degrees, in order of rise.
+
+            Only the stored passes are returned, see transit_list.
+
+            satellite_names -> optional, only the passes of these satellites.
+
+            Returns: [[rise time: Julian, transit time: Julian, set time: Julian,
+                       satellite name: string, maximum altitude: degrees], ...]
+                A rise time is 0 for a pass that was in progress at the start of its prediction.
+            """
+
+        return [list(row) for row in self._select('transit_list', engine, start, end, min_altitude, satellite_names)]
+
+    def _select(self, columns, engine, start, end, min_altitude, satellite_names):
+        """The rows of the COLUMNS `columns` of the passes for query."""
+
+        with self._lock:
+            rows = self._connection.execute(QUERY.format(columns=COLUMNS[columns]),
+                                            {'start': start, 'end': end,
+                                             'start_index': start - INDEX_EPOCH - 1e-3,
+                                             'end_index': end - INDEX_EPOCH + 1e-3,
+                                             'min_altitude': min_altitude,
+                                             'observer': observer_key(engine)}).fetchall()
+
+        if satellite_names is not None:
+            names = set(satellite_names)
+            rows = [row for row in rows if row[3] in names]
+
+        return rows
+
+    def transit_list(self, engine, satellite_names, start=None, end=None, min_altitude=0.0, number_of_passes=None):
+        """The passes of `satellite_names` that are up at any time from `start`
+            (Julian, default now) to `end` (default a day later), as query.
+
+            The satellites whose passes are not stored are predicted first.
+
+            number_of_passes -> optional, the most passes of each satellite.
+            """
+
+        if start is None:
+            start = ts.now().tt
+        if end is None:
+            end = start + 1
+
+        for name in satellite_names:
+            self.ensure(engine, name, start, end)
+
+        transit_list = self.query(engine, start, end, min_altitude, satellite_names)
+
+        return _limited(transit_list, number_of_passes)
+
+    def pass_details(self, engine, satellite_names, start=None, end=None, min_altitude=0.0, number_of_passes=None):
+        """The PassDetails of the passes of `satellite_names` up at any time
+            from `start` to `end`, as transit_list, in order of rise.
+
+            The reports were computed when the passes were predicted, so
+            they can be listed, sorted and filtered without propagation.
+            """
+
+        if start is None:
+            start = ts.now().tt
+        if end is None:
+            end = start + 1
+
+        for name in satellite_names:
+            self.ensure(engine, name, start, end)
+
+        rows = self._select('details', engine, start, end, min_altitude, satellite_names)
+
+        return _limited([PassDetails(*row) for row in rows], number_of_passes)
+
+    def aos_azimuths(self, engine, transit_list):
+        """The azimuth where each stored pass of `transit_list` rises, degrees, from its PassDetails,
+            NaN for a pass that is not stored, e.g. for plan_schedule.
+
+            Returns: list of the azimuths
+            """
+
+        if not len(transit_list):
+            return []
+
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT satellite, setting, aos_az FROM passes WHERE observer = ? AND setting >= ? AND setting <= ?',
+                (observer_key(engine), min(record[2] for record in transit_list),
+                 max(record[2] for record in transit_list))).fetchall()
+
+        aos_az = {(name, setting): az for name, setting, az in rows}
+
+        return [aos_az.get((record[3], record[2]), float('nan')) for record in transit_list]
+
+    def daily_passes(self, engine, satellite_names, first_day, days, start_hour, end_hour, min_altitude=0.0):
+        """The passes that are up between `start_hour` and `end_hour` UTC each day,
+            e.g. 18 and 23 for every evening, for `days` from the UTC date `first_day`,
+            a (year, month, day) tuple. An end hour before the start hour ends the next day.
+
+            Returns: a transit list as query.
+            """
+
+        year, month, day = first_day
+        if end_hour <= start_hour:
+            end_hour += 24
+
+        windows = [(ts.utc(year, month, day + n, start_hour).tt, ts.utc(year, month, day + n, end_hour).tt)
+                   for n in range(days)]
+        if not windows:
+            return []
+
+        for name in satellite_names:
+            self.ensure(engine, name, windows[0][0], windows[-1][1])
+
+        transit_list = []
+        for window_start, window_end in windows:
+            transit_list.extend(self.query(engine, window_start, window_end, min_altitude, satellite_names))
+
+        return transit_list
+
+
+def _limited(passes, number_of_passes):
+    """The first `number_of_passes` of `passes` of each satellite, all of them if it is None."""
+
+    if number_of_passes is None:
+        return passes
+
+    counts = {}
+    limited = []
+    for record in passes:
+        name = record.satellite if isinstance(record, PassDetails) else record[3]
+        counts[name] = counts.get(name, 0) + 1
+        if counts[name] <= number_of_passes:
+            limited.append(record)
+
+    return limited
+
+
+class PassPredictor(object):
+    """Keeps a PassDatabase filled with the passes of satellites `days` ahead, on its own thread.
+
+        database -> PassDatabase.
+        engine -> PassEngine or ServiceClient, its observer may be changed at any time.
+        satellite_names -> the satellites to predict, see set_satellites.
+        interval -> seconds between passes over the satellites, each
+            extends the stored passes to `days` from then and prunes
+            the passes that set more than `keep` days before.
+        keep -> days of past passes kept, so that queries from now
+            are answered from the stored passes.
+
+        Attribute `predicted` counts the satellites predicted.
+        """
+
+    def __init__(self, database, engine, satellite_names=(), days=14.0, interval=3600.0, keep=1.0):
+
+        self.database = database
+        self.engine = engine
+        self.days = days
+        self.interval = interval
+        self.keep = keep
+
+        self.predicted = 0
+        self.errors = 0
+        self.last_error = None
+
+        self._satellite_names = list(satellite_names)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_satellites(self, satellite_names):
+        """Predict for `satellite_names` from the next pass over the satellites."""
+
+        self._satellite_names = list(satellite_names)
+        self.wake()
+
+    def wake(self):
+        """Start a pass over the satellites now, e.g. when the observer or the TLEs have changed."""
+
+        self._wake.set()
+
+    def start(self):
+        """Start predicting on a new thread."""
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='PassPredictor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop predicting and wait for the thread to finish."""
+
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = ts.now().tt
+
+            for name in self._satellite_names:
+                if self._stop.is_set() or self._wake.is_set():
+                    break
+                try:
+                    if not self.database.ensure(self.engine, name, now - self.keep, now + self.days):
+                        self.predicted += 1
+                except (OSError, KeyError, ValueError, ServiceError, sqlite3.Error) as e:
+                    self.errors += 1
+                    self.last_error = e
+            else:
+                self.database.prune(now - self.keep)
+                self._wake.wait(self.interval)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Rise, transit and set events and passes."""
+
+# Project modules:
+from .doppler import doppler_shift
+from .timescale import JULIAN_SEC
+
+EVENT_NAMES = ('rise', 'transit', 'set')
+
+
+def find_events(satellite, observer, start_ts, end_ts, number_of_passes=None):
+    """Find the rise, transit and set events of `satellite` as seen
+        by `observer` (a Topos) between `start_ts` and `end_ts`.
+
+        number_of_passes -> stop after this many 'set' events, None for no limit.
+
+        Returns: event_list: list of (ts, 'rise' | 'transit' | 'set')
+        """
+
+    event_times_ts, events = satellite.find_events(observer, start_ts, end_ts, altitude_degrees=0.0)
+
+    return event_list_from(event_times_ts, events, number_of_passes)
+
+
+def event_list_from(event_times_ts, events, number_of_passes=None):
+    """Convert the times and event numbers from Skyfield's find_events
+        to an event list of (ts, 'rise' | 'transit' | 'set'),
+        stopping after `number_of_passes` 'set' events if given."""
+
+    event_list = []
+
+    passes = 0
+    for ti, event in zip(event_times_ts, events):
+        if number_of_passes is not None and passes >= number_of_passes:
+            break
+        event_name = EVENT_NAMES[event]
+        event_list.append((ti, event_name))
+        if event_name == 'set':
+            passes += 1
+
+    return event_list
+
+
+def passes_from_events(event_list, satellite_name):
+    """Group an event list from `find_events` into passes.
+
+        Returns: [[rise time: Julian, transit time: Julian, set time: Julian,
+                    satellite name: string], ...]
+            A time is 0 if the event was not found, e.g. the rise of
+            a satellite that was already up at the start.
+            Passes without a set event are not included.
+        """
+
+    transit_list = []
+
+    pass_info = [0, 0, 0, satellite_name]
+    for pass_event in event_list:
+        if pass_event[1] == 'rise':
+            pass_info[0] = pass_event[0].tt
+        elif pass_event[1] == 'transit':
+            pass_info[1] = pass_event[0].tt
+        elif pass_event[1] == 'set':
+            pass_info[2] = pass_event[0].tt
+            transit_list.append(pass_info)
+            pass_info = [0, 0, 0, satellite_name]
+
+    return transit_list
+
+
+class PassDetails(object):
+    """A pass with what is needed to report, sort and filter passes without more propagation.
+
+        rise, transit, setting -> Julian, rise is 0 for a pass in progress at
+            the start of the prediction, transit is 0 if it was not found.
+        satellite -> satellite name.
+        aos_az, transit_az, los_az -> azimuths at the start, the highest point
+            and the end of the pass, degrees.
+        max_altitude -> degrees.
+        min_range -> km.
+        max_slant_velocity -> the largest slant velocity, either way, km/sec.
+        max_slant_acceleration -> the largest rate of change of the slant velocity, km/sec².
+        """
+
+    FIELDS = ('rise', 'transit', 'setting', 'satellite', 'aos_az', 'transit_az', 'los_az', 'max_altitude',
+              'min_range', 'max_slant_velocity', 'max_slant_acceleration')
+
+    def __init__(self, rise, transit, setting, satellite, aos_az, transit_az, los_az, max_altitude,
+                 min_range, max_slant_velocity, max_slant_acceleration):
+
+        self.rise = rise
+        self.transit = transit
+        self.setting = setting
+        self.satellite = satellite
+        self.aos_az = aos_az
+        self.transit_az = transit_az
+        self.los_az = los_az
+        self.max_altitude = max_altitude
+        self.min_range = min_range
+        self.max_slant_velocity = max_slant_velocity
+        self.max_slant_acceleration = max_slant_acceleration
+
+    @property
+    def duration(self):
+        """Seconds from rise to set, 0 if the rise was not found."""
+
+        return (self.setting - self.rise) / JULIAN_SEC if self.rise else 0.0
+
+    @property
+    def record(self):
+        """[rise, transit, set, satellite name, maximum altitude], as a transit list entry."""
+
+        return [self.rise, self.transit, self.setting, self.satellite, self.max_altitude]
+
+    def doppler(self, frequency):
+        """The largest Doppler shift of `frequency` (Hz) in the pass, Hz."""
+
+        return abs(doppler_shift(self.max_slant_velocity, frequency))
+
+    def doppler_rate(self, frequency):
+        """The largest rate of change of the Doppler shift of `frequency` (Hz) in the pass, Hz/sec."""
+
+        return abs(doppler_shift(self.max_slant_acceleration, frequency))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, fields):
+        return cls(*(fields[name] for name in cls.FIELDS))
+
+    def __repr__(self):
+        return (f'PassDetails({self.satellite}, max_altitude={self.max_altitude:0.1f}°, '
+                f'duration={self.duration:0.0f} s, min_range={self.min_range:0.0f} km)')
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""Positions of satellites seen by the observer."""
+
+# Third party modules:
+import numpy as np
+from skyfield.api import Angle
+from skyfield.sgp4lib import theta_GMST1982
+
+# Project modules:
+from .passes import PassDetails
+from .timescale import JULIAN_SEC, ts
+
+NO_POSITION = (Angle(degrees=0), Angle(degrees=0), 0)  # alt, az, slant velocity
+
+# WGS84
+EARTH_RADIUS = 6378.137  # km
+EARTH_FLATTENING = 1 / 298.257223563
+EARTH_ROTATION = 7.292115e-5  # rad/sec
+
+
+def alt_azimuth(satellite, observer, calc_time):
+    """Position of `satellite` seen by `observer` (a Topos) at Julian `calc_time`.
+
+        Returns: alt: Angle, az: Angle, slant velocity: km/sec
+        """
+
+    difference = satellite - observer
+    topocentric = difference.at(ts.tt_jd(calc_time))
+    pos = topocentric.position.km
+    alt, az, distance = topocentric.altaz()
+    velocity = topocentric.velocity.km_per_s
+
+    d = np.dot(velocity, pos) / np.linalg.norm(pos)  # slant velocity km/sec
+
+    return alt, az, d
+
+
+def observer_itrs(observer):
+    """ITRS (Earth fixed) position in km of `observer` (a Topos) on the WGS84 ellipsoid.
+
+        Returns: (xyz array, latitude radians, longitude radians)
+        """
+
+    latitude = observer.latitude.radians
+    longitude = observer.longitude.radians
+    height = observer.elevation.km
+
+    e2 = EARTH_FLATTENING * (2 - EARTH_FLATTENING)
+    n = EARTH_RADIUS / np.sqrt(1 - e2 * np.sin(latitude) ** 2)
+
+    xyz = np.array([(n + height) * np.cos(latitude) * np.cos(longitude),
+                    (n + height) * np.cos(latitude) * np.sin(longitude),
+                    (n * (1 - e2) + height) * np.sin(latitude)])
+
+    return xyz, latitude, longitude
+
+
+def satellite_itrs(satellite, times):
+    """Earth fixed position (km) and velocity (km/sec) of `satellite` at an array of Julian `times`.
+
+        SGP4 is run on the whole array and its TEME vectors are rotated by
+        the Greenwich sidereal angle, as Skyfield does, but without the
+        precession and nutation that Skyfield computes for the GCRS, which
+        cancel out when the observer is also on the Earth.
+
+        Returns: (position 3xN array, velocity 3xN array)
+        """
+
+    t = ts.tt_jd(np.atleast_1d(np.asarray(times, dtype=float)))
+
+    position, velocity, messages = satellite._position_and_velocity_TEME_km(t)
+    theta, theta_dot = theta_GMST1982(t.whole, t.ut1_fraction)
+
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+    x = cos_t * position[0] + sin_t * position[1]
+    y = -sin_t * position[0] + cos_t * position[1]
+
+    vx = cos_t * velocity[0] + sin_t * velocity[1] + EARTH_ROTATION * y
+    vy = -sin_t * velocity[0] + cos_t * velocity[1] - EARTH_ROTATION * x
+
+    return np.array([x, y, position[2]]), np.array([vx, vy, velocity[2]])
+
+
+def look_angles(satellite, observer, times):
+    """Positions of `satellite` seen by `observer` (a Topos) at an array
+        of Julian `times`, computed in one vectorized call.
+
+        Returns: (alt: degrees array, az: radians array, distance: km array,
+                  slant velocity: km/sec array)
+        """
+
+    position, velocity = satellite_itrs(satellite, times)
+    site, latitude, longitude = observer_itrs(observer)
+
+    dx, dy, dz = position - site[:, np.newaxis]
+
+    sin_lat, cos_lat = np.sin(latitude), np.cos(latitude)
+    sin_lon, cos_lon = np.sin(longitude), np.cos(longitude)
+
+    east = -sin_lon * dx + cos_lon * dy
+    north = -sin_lat * cos_lon * dx - sin_lat * sin_lon * dy + cos_lat * dz
+    up = cos_lat * cos_lon * dx + cos_lat * sin_lon * dy + sin_lat * dz
+
+    distance_km = np.sqrt(dx * dx + dy * dy + dz * dz)
+    alt = np.degrees(np.arcsin(up / distance_km))
+    az = np.mod(np.arctan2(east, north), 2 * np.pi)
+
+    slant_velocity = (dx * velocity[0] + dy * velocity[1] + dz * velocity[2]) / distance_km
+
+    return alt, az, distance_km, slant_velocity
+
+
+def rise_lower_bound(satellite, observer, calc_time, min_altitude=0.0):
+    """A Julian time that the satellite cannot rise above `min_altitude`
+        (degrees, the lowest point of the horizon) seen by `observer`
+        (a Topos) before, from where it is at `calc_time`.
+
+        The satellite is visible only within the Earth central angle
+        arccos(site radius / orbit radius * cos(min_altitude)) - min_altitude
+        of the site, widest at apogee,
+        and the central angle between them closes no faster than the
+        angular rate of the satellite at perigee plus the rotation of the
+        Earth. Margins are added for the elements being mean elements and
+        for the Earth not being a sphere, so the bound is early rather than
+        late; it is `calc_time` for a satellite that may already be up.
+
+        It costs one SGP4 position, against the event search of a rise.
+        """
+
+    model = satellite.model
+    position, velocity = satellite_itrs(satellite, calc_time)
+    position = position[:, 0]
+    site, latitude, longitude = observer_itrs(observer)
+
+    radius = np.linalg.norm(position)
+    apogee = model.a * (1 + model.ecco) * model.radiusearthkm * 1.01
+    if not np.isfinite(radius) or not model.no_kozai:
+        return calc_time
+
+    site_radius = np.linalg.norm(site)
+    angle = np.arccos(np.clip(np.dot(position, site) / (radius * site_radius), -1.0, 1.0))
+    h = np.radians(min_altitude)
+    visible = np.arccos(min(site_radius / max(apogee, radius) * np.cos(h), 1.0)) - h + np.radians(0.5)
+
+    e = model.ecco
+    perigee_rate = model.no_kozai / 60 * np.sqrt((1 + e) / (1 - e) ** 3)  # rad/sec
+    closing_rate = perigee_rate * 1.1 + EARTH_ROTATION
+
+    return calc_time + max(angle - visible, 0.0) / closing_rate * JULIAN_SEC
+
+
+def pass_details(satellite, observer, passes, start=None, step=5.0):
+    """The PassDetails of `passes` of `satellite` seen by `observer` (a Topos),
+        from one vectorized computation of all of the passes.
+
+        Each pass is sampled every `step` seconds, at its rise and set and
+        a second either side of its transit, where the slant velocity
+        changes fastest, and the samples are reduced pass by pass.
+
+        passes -> [[rise time: Julian, transit time: Julian, set time: Julian,
+                    satellite name: string, ...], ...]
+        start -> Julian, where a pass in progress (rise time 0) is taken
+            to start, default its transit.
+
+        Returns: list of PassDetails
+        """
+
+    if not len(passes):
+        return []
+
+    segments = []
+    for rise, transit, setting, name in (record[:4] for record in passes):
+        first = rise or start or transit or setting
+        extra = [setting]
+        if transit:
+            extra.extend(t for t in (transit - JULIAN_SEC, transit, transit + JULIAN_SEC) if first <= t <= setting)
+        segments.append(np.union1d(np.arange(first, setting, step * JULIAN_SEC), extra))
+
+    lengths = np.array([len(times) for times in segments])
+    firsts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    lasts = firsts + lengths - 1
+
+    times = np.concatenate(segments)
+    alt, az, distance, slant_velocity = look_angles(satellite, observer, times)
+
+    # rate of change of the slant velocity from each sample to the next, none across passes
+    acceleration = np.zeros(len(times))
+    acceleration[:-1] = np.diff(slant_velocity) / (np.diff(times) / JULIAN_SEC)
+    acceleration[lasts] = 0.0
+
+    highest = np.array([first + int(np.argmax(alt[first:last + 1])) for first, last in zip(firsts, lasts)])
+    az = np.degrees(az)
+
+    max_altitude = alt[highest]
+    min_range = np.minimum.reduceat(distance, firsts)
+    max_slant_velocity = np.maximum.reduceat(np.abs(slant_velocity), firsts)
+    max_slant_acceleration = np.maximum.reduceat(np.abs(acceleration), firsts)
+
+    return [PassDetails(record[0], record[1], record[2], record[3],
+                        float(az[firsts[i]]), float(az[highest[i]]), float(az[lasts[i]]), float(max_altitude[i]),
+                        float(min_range[i]), float(max_slant_velocity[i]), float(max_slant_acceleration[i]))
+            for i, record in enumerate(passes)]
+
+
+def pass_times(rise_time, setting_time, interval):
+    """Julian times from `rise_time` to `setting_time` (Julian)
+        every `interval` seconds, not going past the setting time."""
+
+    step = JULIAN_SEC * interval
+    count = int((setting_time - rise_time) / step) + 1
+
+    return rise_time + step * np.arange(max(count, 1))
+
+
+def simplify_track(alt, az, max_error, keep=None):
+    """Indexes of the points of a track of `alt` (degrees) and `az` (radians)
+        arrays that follow it to within `max_error` degrees on a polar chart.
+
+        The track is projected as on the polar graphs, 90 - alt from the
+        centre, so the swing of the azimuth near the zenith is no longer
+        a jump, and the Ramer-Douglas-Peucker algorithm keeps the points
+        furthest from the chords of the points kept: points gather where
+        the track curves and are sparse where it is straight.
+
+        keep -> optional bool array of points that must be kept,
+            the first and last points are always kept.
+        """
+
+    count = len(alt)
+    if count < 3:
+        return np.arange(count)
+
+    r = 90.0 - np.asarray(alt, dtype=float)
+    x = r * np.sin(az)
+    y = r * np.cos(az)
+
+    kept = np.zeros(count, dtype=bool) if keep is None else np.array(keep, dtype=bool)
+    kept[0] = kept[-1] = True
+
+    forced = np.flatnonzero(kept)
+    stack = list(zip(forced[:-1], forced[1:]))
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        dx, dy = x[last] - x[first], y[last] - y[first]
+        ex, ey = x[first + 1:last] - x[first], y[first + 1:last] - y[first]
+
+        length = np.hypot(dx, dy)
+        if length:
+            distance = np.abs(ex * dy - ey * dx) / length
+        else:
+            distance = np.hypot(ex, ey)
+
+        furthest = int(distance.argmax())
+        if distance[furthest] > max_error:
+            furthest += first + 1
+            kept[furthest] = True
+            stack.append((first, furthest))
+            stack.append((furthest, last))
+
+    return np.flatnonzero(kept)
+
+
+def adaptive_pass_track(satellite, observer, rise_time, setting_time, max_error=0.25, label_interval=None,
+                        step=2.0):
+    """Track of a pass from `rise_time` to `setting_time` (Julian) with
+        the points placed where the track bends, see simplify_track.
+
+        The pass is computed every `step` seconds in one vectorized call
+        and reduced to the points needed to draw it to within `max_error`
+        degrees, so a short low pass still gets a smooth curve while the
+        straight ends of a long high pass need only a few points.
+
+        label_interval -> optional seconds, the points every `label_interval`
+            from `rise_time`, as pass_times, are always included so that
+            the labels of a track stay in wall-clock steps.
+
+        Returns: (times: Julian array, alt: degrees array, az: radians array,
+                  slant velocity: km/sec array)
+        """
+
+    times = pass_times(rise_time, setting_time, step)
+    label_times = pass_times(rise_time, setting_time, label_interval) if label_interval else np.empty(0)
+
+    times = np.union1d(np.append(times, setting_time), label_times)
+    alt, az, distance, slant_velocity = look_angles(satellite, observer, times)
+
+    kept = simplify_track(alt, az, max_error, np.isin(times, label_times))
+
+    return times[kept], alt[kept], az[kept], slant_velocity[kept]
+
+
+def pass_track(satellite, observer, rise_time, setting_time, interval):
+    """Track of a pass from `rise_time` to `setting_time` (Julian)
+        with points every `interval` seconds.
+
+        Returns: (times: Julian array, alt: degrees array, az: radians array,
+                  slant velocity: km/sec array)
+        """
+
+    times = pass_times(rise_time, setting_time, interval)
+    alt, az, distance, slant_velocity = look_angles(satellite, observer, times)
+
+    return times, alt, az, slant_velocity
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""Rotator path planning for a whole pass.
+
+    Az/el rotators have a limited azimuth range, often with an overlap
+    past 360°, and limited slew rates. A pass crossing the end stop, or
+    going near overhead where the azimuth swings quickly, makes a rotator
+    that simply follows the satellite unwind mid-pass and lose it.
+
+    plan_pass looks at the whole pass at AOS and chooses:
+
+        the mode, normal, or flip if the rotator can: the azimuth stays
+            near the AOS azimuth and the elevation sweeps from 0° through
+            the zenith to 180°, so a pass near overhead needs no fast swing
+            of the azimuth and the far side of the pass is pointed at with
+            the azimuth turned by 180°,
+        the azimuth overlap, which turn of the azimuth range to use for
+            the whole track,
+
+    then computes a slew-rate-feasible command schedule and the pointing
+    error along the pass. It takes a few milliseconds per pass.
+    """
+
+# Third party modules:
+import numpy as np
+
+# Project modules:
+from .positions import look_angles
+from .timescale import JULIAN_SEC
+
+
+class RotatorLimits(object):
+    """The ranges and slew rates of an az/el rotator.
+
+        az_min, az_max -> azimuth range, degrees, e.g. 0 to 450 for 90° of overlap.
+        el_min, el_max -> elevation range, degrees, el_max of 180 allows flip mode.
+        az_rate, el_rate -> maximum slew rates, degrees per second.
+        """
+
+    def __init__(self, az_min=0.0, az_max=450.0, el_min=0.0, el_max=90.0, az_rate=6.0, el_rate=6.0):
+
+        self.az_min = az_min
+        self.az_max = az_max
+        self.el_min = el_min
+        self.el_max = el_max
+        self.az_rate = az_rate
+        self.el_rate = el_rate
+
+    @property
+    def can_flip(self):
+        return self.el_max > 90.0
+
+
+class RotatorPlan(object):
+    """A command schedule for one pass.
+
+        mode -> 'normal' or 'flip'.
+        overlap -> the number of turns (multiples of 360°) added to the azimuth at AOS.
+        times -> Julian array of the commands.
+        az, el -> arrays of the commands, degrees in rotator coordinates.
+        error -> array of the angle between where the rotator points and the satellite, degrees.
+        """
+
+    def __init__(self, mode, overlap, times, az, el, error):
+
+        self.mode = mode
+        self.overlap = overlap
+        self.times = times
+        self.az = az
+        self.el = el
+        self.error = error
+
+    @property
+    def max_error(self):
+        return float(self.error.max()) if len(self.error) else 0.0
+
+    @property
+    def mean_error(self):
+        return float(self.error.mean()) if len(self.error) else 0.0
+
+    @property
+    def start(self):
+        return self.times[0]
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    def command_at(self, calc_time):
+        """Rotator (az, el) command at Julian `calc_time`, interpolated.
+
+            Before the pass this is the AOS position, to pre-position
+            the rotator, after the pass it is the LOS position."""
+
+        return (float(np.interp(calc_time, self.times, self.az)),
+                float(np.interp(calc_time, self.times, self.el)))
+
+    def __repr__(self):
+        return (f'RotatorPlan({self.mode}, overlap={self.overlap}, points={len(self.times)}, '
+                f'max_error={self.max_error:0.2f}°)')
+
+
+def pointing_error(az1, el1, az2, el2):
+    """Angle between two arrays of directions, all in degrees."""
+
+    az1, el1, az2, el2 = (np.radians(a) for a in (az1, el1, az2, el2))
+    cos_angle = np.sin(el1) * np.sin(el2) + np.cos(el1) * np.cos(el2) * np.cos(az1 - az2)
+
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+
+def rate_limited(target, seconds, rate):
+    """Follow `target` (degrees) at times `seconds`, slewing at most `rate` degrees per second.
+
+        Starts on the first target, i.e. pre-positioned at AOS."""
+
+    steps = np.diff(target)
+    max_steps = rate * np.diff(seconds)
+
+    if np.all(np.abs(steps) <= max_steps):
+        return target.copy()  # feasible as it is
+
+    commanded = np.empty_like(target)
+    position = commanded[0] = target[0]
+    for i in range(1, len(target)):
+        position += min(max(target[i] - position, -max_steps[i - 1]), max_steps[i - 1])
+        commanded[i] = position
+
+    return commanded
+
+
+def _wrapped_into(az, az_min, az_max):
+    """Azimuths moved by whole turns into [az_min, az_max] where they are outside it,
+        wrapping to the lowest turn, which makes the rotator unwind."""
+
+    outside = (az < az_min) | (az > az_max)
+    wrapped = az.copy()
+    wrapped[outside] = az_min + np.mod(az[outside] - az_min, 360.0)
+
+    return wrapped
+
+
+def _flipped(az, el, reference):
+    """Flip mode rotator (az, el) for a track, all in degrees, with the rotator azimuth kept
+        within 90° of `reference`, an azimuth or an array of one for each sample: the samples
+        on the far side of the sky from the reference are pointed at with the azimuth turned
+        by 180° and an elevation past 90°."""
+
+    offset = np.mod(az - reference + 180.0, 360.0) - 180.0
+    far = np.abs(offset) > 90.0
+
+    return (reference + np.where(far, offset - np.copysign(180.0, offset), offset),
+            np.where(far, 180.0 - el, el))
+
+
+def _candidates(az, el, limits):
+    """Generator of (mode, overlap, rotator az, rotator el) paths for the pass."""
+
+    unwrapped = np.degrees(np.unwrap(np.radians(az)))
+
+    modes = [('normal', unwrapped, el)]
+    if limits.can_flip:
+        # through the zenith with the azimuth kept near that of AOS or of LOS, or the whole pass over the top
+        for reference in (az[0], az[-1], unwrapped + 180.0):
+            modes.append(('flip',) + _flipped(az, el, reference))
+
+    for mode, mode_az, mode_el in modes:
+        low, high = mode_az.min(), mode_az.max()
+
+        # the turns that have the whole track in the azimuth range, failing that those with part of it
+        first = int(np.ceil((limits.az_min - low) / 360.0))
+        last = int(np.floor((limits.az_max - high) / 360.0))
+        if first > last:
+            first = int(np.ceil((limits.az_min - high) / 360.0))
+            last = max(int(np.floor((limits.az_max - low) / 360.0)), first)
+
+        for overlap in range(first, last + 1):
+            rotator_az = _wrapped_into(mode_az + 360.0 * overlap, limits.az_min, limits.az_max)
+            yield mode, overlap, rotator_az, np.clip(mode_el, limits.el_min, limits.el_max)
+
+
+def plan_track(times, az, el, limits):
+    """Plan the rotator commands for a pass track.
+
+        times -> Julian array, az and el -> arrays in degrees of the satellite.
+        limits -> RotatorLimits.
+
+        Returns the RotatorPlan with the smallest maximum pointing error,
+        then the smallest mean error, preferring normal mode.
+        """
+
+    seconds = (times - times[0]) / JULIAN_SEC
+
+    best = None
+    best_score = None
+    for mode, overlap, target_az, target_el in _candidates(az, el, limits):
+        command_az = rate_limited(target_az, seconds, limits.az_rate)
+        command_el = rate_limited(target_el, seconds, limits.el_rate)
+
+        # where the rotator really points, past 90° of elevation it points over the top
+        over = command_el > 90.0
+        pointing_az = np.where(over, command_az + 180.0, command_az)
+        pointing_el = np.where(over, 180.0 - command_el, command_el)
+
+        error = pointing_error(pointing_az, pointing_el, az, el)
+
+        score = (round(float(error.max()), 1), round(float(error.mean()), 2), mode != 'normal', abs(overlap))
+        if best_score is None or score < best_score:
+            best = RotatorPlan(mode, overlap, times, command_az, command_el, error)
+            best_score = score
+
+    return best
+
+
+def plan_pass(satellite, observer, rise_time, setting_time, limits, interval=1.0):
+    """Plan the rotator commands for the pass of `satellite` seen by `observer` (a Topos)
+        from `rise_time` to `setting_time` (Julian), sampled every `interval` seconds.
+
+        Returns: RotatorPlan
+        """
+
+    step = JULIAN_SEC * interval
+    times = np.append(np.arange(rise_time, setting_time, step), setting_time)
+
+    alt, az, distance, slant_velocity = look_angles(satellite, observer, times)
+
+    return plan_track(times, np.degrees(az), alt, limits)
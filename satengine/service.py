@@ -0,0 +1,522 @@
+# -*- coding: utf-8 -*-
+"""Local pass prediction HTTP/JSON service.
+
+    One PassEngine, with its EventCache, is shared by every client,
+    so that several SkyHamSat instances at the same site do not each
+    repeat the same propagation.
+
+    Responses are cached for a short time bucket and identical requests
+    arriving while a response is being computed wait for that computation
+    rather than starting their own (request coalescing).
+
+    Endpoints, all GET and returning JSON:
+
+        /passes   upcoming passes of the filtered satellites, with their maximum altitudes
+                  ?transponder=1&uplink=1&downlink=1&beacon=1&mode=Any
+                   &satellite=NAME&passes=3&start=Julian
+        /events   rise, transit and set events of a satellite
+                  ?satellite=NAME&passes=3&start=Julian&days=1
+        /track    pass track of a satellite
+                  ?satellite=NAME&rise=Julian&set=Julian&interval=30
+                  or, placed where the track bends, to within max_error degrees
+                  ?satellite=NAME&rise=Julian&set=Julian&max_error=0.25&label_interval=120
+        /details  pass reports: azimuths, maximum altitude, minimum range, peak slant velocity and its rate
+                  ?satellite=NAME&passes=3&start=Julian&days=1
+                  or for given passes ?satellite=NAME&pass=rise,transit,set&start=Julian (pass may be repeated)
+        /light    sunlit and optically visible parts of given passes
+                  ?satellite=NAME&pass=rise,transit,set&start=Julian (pass may be repeated)
+        /look     live look angles and slant velocity
+                  ?satellite=NAME&time=Julian (satellite may be repeated)
+        /catalog  the satellite dicts, with the 'Epoch' (Julian) of each TLE
+        /stats    request and cache statistics
+
+    Times are Julian TT dates, 'start' and 'time' default to now.
+
+    Run with:
+        python -m satengine.service --tle amateur.txt --port 8787
+    """
+
+# standard imports:
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+# Project modules:
+from .catalog import TLE_URL, Catalog, SatelliteFilter
+from .engine import PassEngine
+from .horizon import HorizonMask
+from .observer import Observer
+from .timescale import JULIAN_SEC, ts, utc_iso
+
+DEFAULT_PORT = 8787
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class RequestError(ValueError):
+    """Exception for a request that cannot be answered, sent as a 400 response."""
+    pass
+
+
+class Coalescer(object):
+    """Runs computations on an executor, caching the results by key.
+
+        While a computation for a key is running, other requests for the
+        same key wait for it rather than starting their own.
+        Results are kept for `ttl` seconds.
+        """
+
+    def __init__(self, executor, ttl=60.0, max_entries=10000):
+
+        self.executor = executor
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self.computed = 0
+        self.coalesced = 0
+        self.hits = 0
+
+        self._results = {}  # key -> (expiry time, result)
+        self._in_flight = {}  # key -> Future
+
+    async def get(self, key, func, *args):
+        """The result of func(*args), from the cache if computed for `key`."""
+
+        now = time.monotonic()
+
+        cached = self._results.get(key)
+        if cached and cached[0] > now:
+            self.hits += 1
+            return cached[1]
+
+        future = self._in_flight.get(key)
+        if future is None:
+            self.computed += 1
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, func, *args)
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._done(key, f))
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(future)
+
+    def _done(self, key, future):
+        """Store the result of a finished computation."""
+
+        del self._in_flight[key]
+
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        now = time.monotonic()
+        if len(self._results) >= self.max_entries:
+            self._results = {k: v for k, v in self._results.items() if v[0] > now}
+            if len(self._results) >= self.max_entries:
+                self._results.clear()
+
+        self._results[key] = (now + self.ttl, future.result())
+
+
+class PassService(object):
+    """The asyncio HTTP/JSON pass prediction service.
+
+        engine -> the PassEngine shared by all requests.
+        pass_resolution -> seconds, 'now' is rounded down to this for /passes and /events
+            so that requests within it share a result.
+        look_resolution -> seconds, as pass_resolution for /look.
+        """
+
+    def __init__(self, engine, workers=4, pass_resolution=10.0, look_resolution=0.5):
+
+        self.engine = engine
+        self.pass_resolution = pass_resolution
+        self.look_resolution = look_resolution
+
+        self.executor = ThreadPoolExecutor(workers)
+        self.coalescer = Coalescer(self.executor)
+
+        self.requests = 0
+        self.server = None
+
+        self.routes = {'/passes': self.passes,
+                       '/events': self.events,
+                       '/track': self.track,
+                       '/details': self.details,
+                       '/light': self.light,
+                       '/look': self.look,
+                       '/catalog': self.catalog,
+                       '/stats': self.stats}
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        """Start listening for connections."""
+
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self.server
+
+    async def _handle_connection(self, reader, writer):
+        """Serve the HTTP/1.1 requests on a connection, keeping it alive unless asked not to."""
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(http_response('HTTP/1.1', 400, error_body('Malformed request line'), False))
+                    await writer.drain()
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length:
+                    await reader.readexactly(length)  # GET bodies are ignored
+
+                connection = headers.get('connection', '').lower()
+                if version == 'HTTP/1.0':
+                    keep_alive = connection == 'keep-alive'
+                else:
+                    keep_alive = connection != 'close'
+
+                status, body = await self.respond(method, target)
+
+                writer.write(http_response(version, status, body, keep_alive))
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # client went away or sent a malformed request
+        finally:
+            writer.close()
+
+    async def respond(self, method, target):
+        """Returns: (status, body bytes) for the request."""
+
+        self.requests += 1
+
+        if method != 'GET':
+            return 405, error_body('Only GET is supported')
+
+        url = urlsplit(target)
+        handler = self.routes.get(url.path.rstrip('/'))
+        if handler is None:
+            return 404, error_body(f'Unknown path {url.path}')
+
+        try:
+            return 200, await handler(parse_qs(url.query))
+        except (RequestError, KeyError) as e:
+            return 400, error_body(f'Bad request: {e}')
+        except Exception as e:
+            return 500, error_body(f'{type(e).__name__}: {e}')
+
+    def _now_bucket(self, params, name, resolution):
+        """Julian time from `params[name]`, or now rounded down to `resolution` seconds."""
+
+        if name in params:
+            return get_float(params, name)
+
+        step = JULIAN_SEC * resolution
+        return math.floor(ts.now().tt / step) * step
+
+    async def passes(self, params):
+        """Upcoming passes of the filtered satellites."""
+
+        satellite_filter = filter_from(params)
+        names = tuple(params.get('satellite', ()))
+        number_of_passes = get_int(params, 'passes', 3)
+        start = self._now_bucket(params, 'start', self.pass_resolution)
+
+        key = ('passes', satellite_filter.key, names, number_of_passes, start)
+        return await self.coalescer.get(key, self._passes, satellite_filter, names, number_of_passes, start)
+
+    def _passes(self, satellite_filter, names, number_of_passes, start):
+
+        satellite_names = [s['Satellite'] for s in self.engine.catalog.filtered(satellite_filter)
+                           if not names or s['Satellite'] in names]
+
+        transit_list = self.engine.transit_list(satellite_names, number_of_passes, True, start)
+
+        return to_json([{'satellite': name,
+                         'rise': rise, 'transit': transit, 'set': setting,
+                         'rise_utc': utc_iso(rise), 'transit_utc': utc_iso(transit), 'set_utc': utc_iso(setting),
+                         'max_altitude': max_altitude}
+                        for rise, transit, setting, name, max_altitude in transit_list])
+
+    async def events(self, params):
+        """Rise, transit and set events of a satellite."""
+
+        satellite_name = get_satellite(params)
+        number_of_passes = get_int(params, 'passes', 3)
+        days = get_float(params, 'days', 1.0)
+        start = self._now_bucket(params, 'start', self.pass_resolution)
+
+        key = ('events', satellite_name, number_of_passes, days, start)
+        return await self.coalescer.get(key, self._events, satellite_name, number_of_passes, days, start)
+
+    def _events(self, satellite_name, number_of_passes, days, start):
+
+        event_list = self.engine.next_passes(satellite_name, number_of_passes, start, days)
+
+        return to_json([[t.tt, name] for t, name in event_list])
+
+    async def track(self, params):
+        """Track of a pass of a satellite."""
+
+        satellite_name = self._tracked_satellite(params)
+        rise = get_float(params, 'rise')
+        setting = get_float(params, 'set')
+        interval = get_float(params, 'interval', 30.0)
+        if interval <= 0:
+            raise RequestError('interval must be positive')
+
+        max_error = get_float(params, 'max_error', 0.0)
+        label_interval = get_float(params, 'label_interval', 0.0)
+        if max_error < 0 or label_interval < 0:
+            raise RequestError('max_error and label_interval must not be negative')
+
+        key = ('track', satellite_name, rise, setting, interval, max_error, label_interval)
+        return await self.coalescer.get(key, self._track, satellite_name, rise, setting, interval,
+                                        max_error, label_interval)
+
+    def _tracked_satellite(self, params):
+        """The 'satellite' parameter, checked to have an orbit to track.
+
+            The other endpoints answer with no passes for a satellite that is not
+            in the catalog or has no valid NORAD number, as the PassEngine does."""
+
+        satellite_name = get_satellite(params)
+        try:
+            self.engine.catalog.satellite(satellite_name)
+        except (KeyError, ValueError):
+            raise RequestError(f'no orbit for satellite {satellite_name}')
+
+        return satellite_name
+
+    def _track(self, satellite_name, rise, setting, interval, max_error=0.0, label_interval=0.0):
+
+        if max_error:
+            times, alt, az, slant_velocity = self.engine.adaptive_pass_track(satellite_name, rise, setting,
+                                                                             max_error, label_interval or None)
+        else:
+            times, alt, az, slant_velocity = self.engine.pass_track(satellite_name, rise, setting, interval)
+
+        return to_json({'satellite': satellite_name,
+                        'times': times.tolist(), 'alt': alt.tolist(), 'az': az.tolist(),
+                        'slant_velocity': slant_velocity.tolist()})
+
+    async def details(self, params):
+        """PassDetails of the next passes, or of the given passes, of a satellite."""
+
+        satellite_name = get_satellite(params)
+        number_of_passes = get_int(params, 'passes', 3)
+        days = get_float(params, 'days', 1.0)
+        start = self._now_bucket(params, 'start', self.pass_resolution)
+
+        passes = get_passes(params)
+
+        key = ('details', satellite_name, number_of_passes, days, start, passes)
+        return await self.coalescer.get(key, self._details, satellite_name, number_of_passes, days, start, passes)
+
+    def _details(self, satellite_name, number_of_passes, days, start, passes):
+
+        if passes:
+            details = self.engine.pass_details(satellite_name, [list(times) + [satellite_name] for times in passes],
+                                               start)
+        else:
+            details = self.engine.next_pass_details(satellite_name, number_of_passes, start, days)
+
+        return to_json([d.to_dict() for d in details])
+
+    async def light(self, params):
+        """PassIllumination of the given passes of a satellite."""
+
+        satellite_name = get_satellite(params)
+        start = self._now_bucket(params, 'start', self.pass_resolution)
+        passes = get_passes(params)
+
+        key = ('light', satellite_name, start, passes)
+        return await self.coalescer.get(key, self._light, satellite_name, start, passes)
+
+    def _light(self, satellite_name, start, passes):
+
+        lights = self.engine.pass_illumination(satellite_name, [list(times) + [satellite_name] for times in passes],
+                                               start)
+
+        return to_json([light.to_dict() for light in lights])
+
+    async def look(self, params):
+        """Live look angles of satellites, all the filtered satellites if none is given."""
+
+        names = tuple(params.get('satellite', ()))
+        satellite_filter = filter_from(params)
+        calc_time = self._now_bucket(params, 'time', self.look_resolution)
+
+        key = ('look', names, satellite_filter.key, calc_time)
+        return await self.coalescer.get(key, self._look, names, satellite_filter, calc_time)
+
+    def _look(self, names, satellite_filter, calc_time):
+
+        if not names:
+            names = [s['Satellite'] for s in self.engine.catalog.filtered(satellite_filter)]
+
+        looks = []
+        for satellite_name in names:
+            alt, az, slant_velocity = self.engine.alt_azimuth(satellite_name, calc_time)
+            looks.append({'satellite': satellite_name, 'time': calc_time,
+                          'alt': alt.degrees, 'az': az.degrees, 'slant_velocity': float(slant_velocity)})
+
+        return to_json(looks)
+
+    async def catalog(self, params):
+        """The satellite dicts of the catalog, each with the 'Epoch' of its TLE,
+            so that clients can tell when the service has newer TLEs."""
+
+        catalog = self.engine.catalog
+        return to_json({name: dict(satellite, Epoch=catalog.satellite(name).epoch.tt)
+                        for name, satellite in catalog.satellites.items()})
+
+    async def stats(self, params):
+        """Request and cache statistics."""
+
+        return to_json({'requests': self.requests,
+                        'computed': self.coalescer.computed,
+                        'coalesced': self.coalescer.coalesced,
+                        'response_cache_hits': self.coalescer.hits,
+                        'event_cache_hits': self.engine.cache.hits,
+                        'event_cache_misses': self.engine.cache.misses})
+
+
+def to_json(data):
+    """`data` as JSON bytes."""
+
+    return json.dumps(data).encode()
+
+
+def http_response(version, status, body, keep_alive):
+    """The HTTP response bytes with the JSON `body`."""
+
+    return (f'{version} {status} {REASONS[status]}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n'
+            f'\r\n'.encode('latin-1') + body)
+
+
+def error_body(message):
+    """JSON error response body."""
+
+    return to_json({'error': message})
+
+
+def get_float(params, name, default=None):
+    """Float parameter `name` from the parsed query string."""
+
+    if name not in params:
+        if default is None:
+            raise RequestError(f'missing parameter {name}')
+        return default
+
+    try:
+        return float(params[name][0])
+    except ValueError:
+        raise RequestError(f'parameter {name} must be a number')
+
+
+def get_int(params, name, default):
+    """Int parameter `name` from the parsed query string."""
+
+    return int(get_float(params, name, default))
+
+
+def get_satellite(params):
+    """The 'satellite' parameter."""
+
+    if 'satellite' not in params:
+        raise RequestError('missing parameter satellite')
+    return params['satellite'][0]
+
+
+def get_passes(params):
+    """The 'pass' parameters, each rise,transit,set Julian times, as a tuple of tuples."""
+
+    try:
+        passes = tuple(tuple(float(t) for t in value.split(',')) for value in params.get('pass', ()))
+    except ValueError:
+        raise RequestError('pass must be rise,transit,set Julian times')
+    if any(len(times) != 3 for times in passes):
+        raise RequestError('pass must be rise,transit,set Julian times')
+
+    return passes
+
+
+def filter_from(params):
+    """SatelliteFilter from the query parameters, all features if none are given."""
+
+    flags = [params.get(name, ['0'])[0] not in ('0', 'false', '')
+             for name in ('transponder', 'uplink', 'downlink', 'beacon')]
+    if not any(flags):
+        flags = [True] * 4
+
+    return SatelliteFilter(*flags, mode=params.get('mode', ['Any'])[0])
+
+
+async def serve(service, host, port):
+    """Run `service` (PassService) on `host`:`port` until cancelled."""
+
+    server = await service.start(host, port)
+    print(f'Serving on http://{host}:{port}', file=sys.stderr)
+
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    """Run the service until interrupted."""
+
+    parser = argparse.ArgumentParser(description='Local SkyHamSat pass prediction service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--lat', default='51.38833333333 N', help="Observer latitude, e.g. '51.388 N'")
+    parser.add_argument('--lon', default='0.75416666666 W', help="Observer longitude, e.g. '0.754 W'")
+    parser.add_argument('--elevation', type=float, default=100.0, help='Observer elevation, metres')
+    parser.add_argument('--tle', default=TLE_URL, help='TLE url or file name')
+    parser.add_argument('--satslist', default='satslist.json', help='Satellite information json file')
+    parser.add_argument('--horizon', help='Horizon mask file of azimuth, elevation lines, see satengine.horizon')
+    parser.add_argument('--workers', type=int, default=4, help='Threads computing predictions')
+    args = parser.parse_args(argv)
+
+    horizon = HorizonMask.load(args.horizon) if args.horizon else None
+    engine = PassEngine(Catalog.load(args.tle, args.satslist),
+                        Observer(args.lat, args.lon, args.elevation, horizon))
+    service = PassService(engine, args.workers)
+
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.executor.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""Sunlight on satellites and at the observer, for whole pass tracks at once.
+
+    A satellite is sunlit when the Sun, seen from the satellite, is above
+    the limb of the Earth. Some satellites only switch their transponders
+    on in sunlight, when their batteries allow it, and a satellite can only
+    be seen by eye or in a telescope when it is sunlit and the observer's
+    sky is dark.
+
+    The Sun is taken from a SunEphemeris: the low precision formulae of
+    the Astronomical Almanac, good to about 0.01°, tabulated every hour
+    for each day asked for and interpolated, so a pass track of any
+    length needs only array arithmetic after its SGP4 positions.
+
+    Usage:
+        lights = engine.pass_illumination(satellite_name, passes)
+        working = transponder_likely_on(lights)
+    """
+
+# standard imports:
+
+import threading
+
+# Third party modules:
+import numpy as np
+from skyfield.sgp4lib import theta_GMST1982
+
+# Project modules:
+from .positions import EARTH_RADIUS, observer_itrs, satellite_itrs
+from .timescale import JULIAN_SEC, ts
+
+AU = 149597870.7  # km
+
+CIVIL_TWILIGHT = -6.0  # degrees, the Sun is below this for the sky to be dark enough to see a satellite
+SUN_TABLE_STEP = 1 / 24  # days between the entries of the SunEphemeris tables
+TRANSPONDER_SUNLIT_FRACTION = 0.5  # a pass at least this sunlit has a transponder that is likely on
+
+
+def sun_position(times):
+    """Position of the Sun in km, of the equator and equinox of date, at an array of Julian `times`,
+        from the low precision formulae of the Astronomical Almanac.
+
+        Returns: 3xN array
+        """
+
+    n = np.atleast_1d(np.asarray(times, dtype=float)) - 2451545.0
+
+    mean_longitude = np.radians(280.460 + 0.9856474 * n)
+    g = np.radians(357.528 + 0.9856003 * n)  # mean anomaly
+    longitude = mean_longitude + np.radians(1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    obliquity = np.radians(23.439 - 0.0000004 * n)
+    distance = (1.00014 - 0.01671 * np.cos(g) - 0.00014 * np.cos(2 * g)) * AU
+
+    return np.array([distance * np.cos(longitude),
+                     distance * np.cos(obliquity) * np.sin(longitude),
+                     distance * np.sin(obliquity) * np.sin(longitude)])
+
+
+class SunEphemeris(object):
+    """Positions of the Sun from tables of sun_position every `step` days, kept for each day used.
+
+        May be shared between threads, see SUN_EPHEMERIS.
+        """
+
+    def __init__(self, step=SUN_TABLE_STEP, max_days=400):
+
+        self.step = step
+        self.max_days = max_days
+        self.points = int(round(1 / step))
+
+        self._tables = {}  # day number -> (points + 1)x3 array
+        self._lock = threading.Lock()
+
+    def position(self, times):
+        """Position of the Sun in km at an array of Julian `times`, as sun_position.
+
+            Returns: 3xN array
+            """
+
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        days = np.floor(times)
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        tables = np.array([self._table(day) for day in unique_days])
+
+        position = (times - days) / self.step
+        index = np.minimum(position.astype(int), self.points - 1)
+        fraction = (position - index)[:, np.newaxis]
+
+        low = tables[day_index, index]
+        high = tables[day_index, index + 1]
+
+        return (low + fraction * (high - low)).T
+
+    def _table(self, day):
+        """The table of the Sun's positions over the Julian day number `day`."""
+
+        with self._lock:
+            table = self._tables.get(day)
+        if table is not None:
+            return table
+
+        table = sun_position(day + self.step * np.arange(self.points + 1)).T
+
+        with self._lock:
+            if len(self._tables) >= self.max_days:
+                self._tables.clear()
+            self._tables[day] = table
+
+        return table
+
+
+SUN_EPHEMERIS = SunEphemeris()
+
+
+def illumination(satellite, observer, times, ephemeris=SUN_EPHEMERIS):
+    """Sunlight on `satellite` and at `observer` (a Topos) at an array
+        of Julian `times`, computed in one vectorized call.
+
+        Returns: (sun margin: degrees array, the height of the centre of the Sun
+                    above the limb of the Earth seen from the satellite,
+                    positive when it is sunlit,
+                  sun altitude: degrees array, at the observer)
+        """
+
+    times = np.atleast_1d(np.asarray(times, dtype=float))
+
+    position, velocity = satellite_itrs(satellite, times)
+    sun = _earth_fixed(ephemeris.position(times), times)
+    site, latitude, longitude = observer_itrs(observer)
+
+    radius = np.linalg.norm(position, axis=0)
+    earth = np.arcsin(np.clip(EARTH_RADIUS / radius, -1.0, 1.0))  # angular radius of the Earth
+    sun_direction = sun / np.linalg.norm(sun, axis=0)
+    earth_to_sun = np.arccos(np.clip(-np.sum(position * sun_direction, axis=0) / radius, -1.0, 1.0))
+    sun_margin = np.degrees(earth_to_sun - earth)
+
+    up = np.array([np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude), np.sin(latitude)])
+    site_to_sun = sun - site[:, np.newaxis]
+    sun_altitude = np.degrees(np.arcsin(up @ site_to_sun / np.linalg.norm(site_to_sun, axis=0)))
+
+    return sun_margin, sun_altitude
+
+
+def _earth_fixed(vectors, times):
+    """3xN `vectors` of the equator of date rotated by the Greenwich sidereal angle, as satellite_itrs."""
+
+    t = ts.tt_jd(times)
+    theta, theta_dot = theta_GMST1982(t.whole, t.ut1_fraction)
+
+    cos_t = np.cos(theta)
+    sin_t = np.sin(theta)
+
+    return np.array([cos_t * vectors[0] + sin_t * vectors[1], -sin_t * vectors[0] + cos_t * vectors[1], vectors[2]])
+
+
+class PassIllumination(object):
+    """The sunlit and optically visible parts of a pass.
+
+        start, setting -> Julian, the pass from its rise, or the start of the
+            prediction for a pass in progress, to its set.
+        satellite -> satellite name.
+        rise -> Julian, 0 for a pass in progress, as in the transit list.
+        sunlit -> [(start, end), ...] Julian, the satellite is in sunlight.
+        visible -> [(start, end), ...] Julian, the satellite is sunlit and the
+            observer's Sun is below civil twilight, it can be seen.
+        sun_altitude -> degrees, the observer's Sun at the start of the pass.
+        """
+
+    FIELDS = ('rise', 'start', 'setting', 'satellite', 'sunlit', 'visible', 'sun_altitude')
+
+    def __init__(self, rise, start, setting, satellite, sunlit, visible, sun_altitude):
+
+        self.rise = rise
+        self.start = start
+        self.setting = setting
+        self.satellite = satellite
+        self.sunlit = sunlit
+        self.visible = visible
+        self.sun_altitude = sun_altitude
+
+    @property
+    def sunlit_fraction(self):
+        """The fraction of the pass that the satellite is sunlit, 0 to 1."""
+
+        length = self.setting - self.start
+        if length <= 0:
+            return 1.0 if self.sunlit else 0.0
+
+        return sum(end - start for start, end in self.sunlit) / length
+
+    @property
+    def visible_seconds(self):
+        """Seconds of the pass that the satellite can be seen."""
+
+        return sum(end - start for start, end in self.visible) / JULIAN_SEC
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, fields):
+        values = dict(fields)
+        values['sunlit'] = [tuple(interval) for interval in values['sunlit']]
+        values['visible'] = [tuple(interval) for interval in values['visible']]
+        return cls(*(values[name] for name in cls.FIELDS))
+
+    def __repr__(self):
+        return (f'PassIllumination({self.satellite}, sunlit={self.sunlit_fraction:0.0%}, '
+                f'visible={self.visible_seconds:0.0f} s)')
+
+
+def pass_illumination(satellite, observer, passes, start=None, step=10.0, twilight=CIVIL_TWILIGHT,
+                      ephemeris=SUN_EPHEMERIS):
+    """The PassIllumination of `passes` of `satellite` seen by `observer` (a Topos),
+        from one vectorized computation of all of the passes.
+
+        Each pass is sampled every `step` seconds, and the ends of its
+        sunlit and visible parts are interpolated between the samples.
+
+        passes -> [[rise time: Julian, transit time: Julian, set time: Julian,
+                    satellite name: string, ...], ...]
+        start -> Julian, where a pass in progress (rise time 0) is taken
+            to start, default its transit.
+        twilight -> degrees, the Sun is below this at the observer for
+            the sky to be dark enough to see the satellite.
+
+        Returns: list of PassIllumination
+        """
+
+    if not len(passes):
+        return []
+
+    segments = []
+    for rise, transit, setting, name in (record[:4] for record in passes):
+        first = rise or start or transit or setting
+        segments.append(np.union1d(np.arange(first, setting, step * JULIAN_SEC), [setting]))
+
+    bounds = np.cumsum([0] + [len(times) for times in segments])
+
+    times = np.concatenate(segments)
+    sun_margin, sun_altitude = illumination(satellite, observer, times, ephemeris)
+    visible_margin = np.minimum(sun_margin, twilight - sun_altitude)
+
+    lights = []
+    for i, record in enumerate(passes):
+        first, last = bounds[i], bounds[i + 1]
+        lights.append(PassIllumination(record[0], float(times[first]), record[2], record[3],
+                                       _intervals(times[first:last], sun_margin[first:last]),
+                                       _intervals(times[first:last], visible_margin[first:last]),
+                                       float(sun_altitude[first])))
+
+    return lights
+
+
+def _intervals(times, margin):
+    """[(start, end), ...] of the `times` where `margin` is positive,
+        the ends interpolated linearly between the samples."""
+
+    positive = margin > 0
+    changes = np.flatnonzero(positive[:-1] != positive[1:])
+
+    crossings = times[changes] - margin[changes] * (times[changes + 1] - times[changes]) / (
+        margin[changes + 1] - margin[changes])
+
+    ends = crossings.tolist()
+    if positive[0]:
+        ends.insert(0, float(times[0]))
+    if positive[-1]:
+        ends.append(float(times[-1]))
+
+    return list(zip(ends[::2], ends[1::2]))
+
+
+def transponder_likely_on(lights, min_fraction=TRANSPONDER_SUNLIT_FRACTION):
+    """The PassIlluminations of `lights` that are sunlit for at least `min_fraction`
+        of the pass, when a satellite that only runs its transponder in sunlight is likely to be heard."""
+
+    return [light for light in lights if light.sunlit_fraction >= min_fraction]
+
+
+def optically_visible(lights):
+    """The PassIlluminations of `lights` with a part that can be seen, see PassIllumination.visible."""
+
+    return [light for light in lights if light.visible]
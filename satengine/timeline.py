@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""Lazy time ordered streams of the passes of a set of satellites.
+
+    satellite_passes is a generator of the passes of one satellite that
+    searches for them a window at a time, only when asked for the next
+    one. merged_passes is a k-way merge of those generators in a heap,
+    yielding the passes of all of the satellites in order of rise time.
+    A satellite is only searched when its next pass could be the next
+    one out of the merge, so taking the next few passes of a large
+    catalog only predicts for the satellites that contribute to them.
+
+    A satellite that has not been searched yet is kept in the heap at
+    a lower bound of its rise time, from its position and orbit (see
+    positions.rise_lower_bound), that is moved on as the merge reaches it.
+
+    The PassTimeline keeps the passes taken from a merged stream up to a
+    horizon from now, for the upcoming passes graph.
+    """
+
+# standard imports:
+
+import heapq
+import itertools
+
+# Project modules:
+from .passes import passes_from_events
+from .timescale import JULIAN_SEC, ts
+
+ALL_PASSES = 1000  # number_of_passes that is more than the passes in a search window
+MAX_PASS_DAYS = 4.0  # a pass that has not set after this long is not followed any further
+MIN_BOUND_STEP = 5 / 1440  # days, the rise time bound is moved on until it moves less than this
+
+
+def satellite_passes(engine, satellite_name, start, end, window=1 / 24):
+    """Generator of the passes of the satellite that rise from `start` to `end` (Julian), in time order.
+
+        The events are searched for `window` days at a time, as the
+        generator is advanced. A pass that has not set by the end of a
+        window is searched for again from its rise, and a pass in progress
+        at `start` is followed to its set, so that it comes first.
+
+        engine -> PassEngine or ServiceClient.
+
+        yields -> (time, pass): pass is [rise time: Julian, transit time: Julian,
+                    set time: Julian, satellite name] and time its rise time,
+                    or `start` for a pass already in progress, which has a rise time of 0.
+                  Or (time, None) after each window, when all of the passes
+                    that rise before time have been yielded.
+        """
+
+    search = start
+    days = min(window, end - start)
+    alt, az, slant_velocity = engine.alt_azimuth(satellite_name, start)
+    in_progress = alt.degrees > 0
+    while search < end:
+        event_list = engine.next_passes(satellite_name, ALL_PASSES, start=search, days=days)
+
+        passes = passes_from_events(event_list, satellite_name)
+        for record in passes:
+            if record[0] < end:
+                yield record[0] or search, record
+
+        last_set = passes[-1][2] if passes else search
+        rises = [t.tt for t, event in event_list if event == 'rise' and last_set < t.tt < end]
+        if passes:
+            in_progress = False
+
+        if in_progress and days < MAX_PASS_DAYS:
+            days *= 2  # a pass in progress longer than the window
+        elif rises and rises[0] - JULIAN_SEC > search:
+            # a pass that sets after the window, search again from its rise
+            search = rises[0] - JULIAN_SEC
+            days = window
+        elif rises and days < MAX_PASS_DAYS:
+            days *= 2  # a pass longer than the window
+        else:
+            search += days
+            days = min(window, end - search)
+
+        if search < end:
+            yield search, None
+
+
+def merged_passes(engine, satellite_names, start=None, end=None, window=1 / 24, number_of_passes=None):
+    """Generator of the passes of `satellite_names` that rise from `start`
+        (Julian, default now) to `end` (default a day later), in order of rise time.
+
+        A pass already in progress at `start` has a rise time of 0 and comes first.
+
+        number_of_passes -> optional, the most passes to take from each satellite.
+
+        Usage:
+            next_20 = list(itertools.islice(merged_passes(engine, names), 20))
+
+        yields -> [rise time: Julian, transit time: Julian, set time: Julian, satellite name]
+        """
+
+    if start is None:
+        start = ts.now().tt
+    if end is None:
+        end = start + 1
+
+    names = list(satellite_names)
+
+    # (time, satellite index, pass or None): None advances the satellite at that time
+    heap = [(engine.rise_lower_bound(name, start), i, None) for i, name in enumerate(names)]
+    heapq.heapify(heap)
+
+    sources = {}  # satellite index: satellite_passes generator
+    while heap and heap[0][0] < end:
+        key, i, record = heapq.heappop(heap)
+
+        if record is not None:
+            yield record
+            # no later pass of the satellite can rise before this one sets
+            heapq.heappush(heap, (record[2], i, None))
+            continue
+
+        source = sources.get(i)
+        if source is None:
+            if key > start:
+                bound = engine.rise_lower_bound(names[i], key)
+                if bound - key > MIN_BOUND_STEP:
+                    heapq.heappush(heap, (bound, i, None))
+                    continue
+
+            source = satellite_passes(engine, names[i], key, end, window)
+            if number_of_passes is not None:
+                source = _limited(source, number_of_passes)
+            sources[i] = source
+
+        item = next(source, None)
+        if item is not None:
+            heapq.heappush(heap, (item[0], i, item[1]))
+
+
+def _limited(source, number_of_passes):
+    """`source`, a satellite_passes generator, stopped after `number_of_passes` passes."""
+
+    count = 0
+    for item in source:
+        yield item
+        if item[1] is not None:
+            count += 1
+            if count >= number_of_passes:
+                return
+
+
+class PassTimeline(object):
+    """The passes of a set of satellites that rise within a horizon from now, kept up to date.
+
+        The passes are taken in order of rise time from a merged_passes
+        stream, only as far as the horizon, and kept in a heap ordered by
+        set time. An update drops the passes that have set and takes the
+        passes that have come within the horizon; between those the caller
+        only re-projects the times against now.
+
+        engine -> PassEngine or ServiceClient.
+        days -> the length of each stream, a new stream is started when
+            the horizon passes its end.
+        database -> optional PassDatabase, the streams are read from its
+            stored passes instead of merged_passes.
+
+        Usage:
+            timeline = PassTimeline(engine)
+            timeline.update(satellite_names, horizon=3 / 24)  # on each redraw
+            for rise, transit, setting, name, max_altitude in timeline.transit_list(): ...
+
+        Call clear when the observer or the TLEs change.
+
+        Attribute `predictions` counts the passes taken from the streams.
+        """
+
+    def __init__(self, engine, days=1.0, database=None):
+
+        self.engine = engine
+        self.days = days
+        self.database = database
+        self.predictions = 0
+
+        self._heap = []  # (set time, sequence, pass record)
+        self._sequence = itertools.count()
+        self._names = None  # the satellites of the stream
+        self._stream = None
+        self._stream_start = 0.0
+        self._stream_end = 0.0
+        self._in_progress = True  # whether to take the passes in progress at the start of the stream
+        self._next = None  # the next pass of the stream, after the horizon
+
+    def clear(self):
+        """Forget all of the passes, they are predicted again at the next update."""
+
+        self._heap = []
+        self._names = None
+        self._stream = None
+        self._stream_end = 0.0
+        self._next = None
+
+    def update(self, satellite_names, now=None, horizon=1 / 8):
+        """Bring the timeline up to date for `satellite_names` at Julian `now` (default now).
+
+            Passes that have set are dropped, and the passes that rise
+            before `horizon` days from now are taken from the stream.
+
+            Returns: the number of passes taken.
+            """
+
+        if now is None:
+            now = ts.now().tt
+
+        names = frozenset(satellite_names)
+        if names != self._names:
+            self.clear()
+            self._names = names
+
+        while self._heap and self._heap[0][0] < now:
+            heapq.heappop(self._heap)
+
+        horizon_end = now + horizon
+        taken = 0
+        while True:
+            if self._next is None:
+                self._next = self._next_pass(now, horizon_end)
+                if self._next is None:
+                    break
+
+            rise = self._next[0]
+            if rise >= horizon_end:
+                break
+
+            self._add(self._next, now)
+            self._next = None
+            taken += 1
+
+        return taken
+
+    def _next_pass(self, now, horizon_end):
+        """The next pass from the stream, starting a new stream when it has run out
+            before the horizon. None if there are no more passes before the horizon."""
+
+        while True:
+            if self._stream is None:
+                if now < self._stream_end:
+                    # passes in progress at the start were taken from the stream before
+                    start = self._stream_end
+                    self._in_progress = False
+                else:
+                    start = now
+                    self._in_progress = True
+                    self._heap = []
+                self._stream_start = start
+                self._stream_end = max(start, horizon_end) + self.days
+                if self.database is not None:
+                    self._stream = iter(self.database.transit_list(self.engine, sorted(self._names),
+                                                                   start, self._stream_end))
+                else:
+                    self._stream = merged_passes(self.engine, sorted(self._names), start, self._stream_end)
+
+            for record in self._stream:
+                if self._in_progress or record[0] >= self._stream_start:
+                    return record
+
+            self._stream = None
+            if self._stream_end >= horizon_end:
+                return None
+
+    def _add(self, record, now):
+        """Add a pass from the stream with its maximum altitude, if the stream does not have it."""
+
+        self.predictions += 1
+
+        rise, transit, setting, name = record[:4]
+        if setting < now:
+            return
+
+        if len(record) > 4:
+            max_altitude = record[4]
+        else:
+            # the altitude at the transit, or now for a pass already past its transit
+            alt, az, slant_velocity = self.engine.alt_azimuth(name, transit or now)
+            max_altitude = alt.degrees
+
+        heapq.heappush(self._heap, (setting, next(self._sequence), [rise, transit, setting, name, max_altitude]))
+
+    def transit_list(self):
+        """:returns: [[rise time: Julian, transit time: Julian, set time: Julian,
+                        satellite name: string, maximum altitude: degrees], ...] sorted by rise time.
+
+            A rise time is 0 for a pass that was in progress when predicted.
+            """
+
+        records = [list(entry[2]) for entry in self._heap]
+
+        return sorted(records, key=lambda record: (record[0], record[3]))
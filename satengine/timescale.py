@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""Time scale shared by the satengine modules.
+
+    Times are passed between the modules as Julian TT dates (floats)
+    or Skyfield Time objects made from this time scale.
+    """
+
+# Third party modules:
+from skyfield.api import load
+
+JULIAN_SEC = 1 / 86400
+
+ts = load.timescale()
+
+
+def utc_iso(julian, places=0):
+    """Julian TT date as a UTC ISO string, '' if zero."""
+
+    if not julian:
+        return ''
+    return ts.tt_jd(julian).utc_iso(places=places)
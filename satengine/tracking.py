@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""Tracking output to a rotator and radio through hamlib rotctld and rigctld.
+
+    A Tracker runs on its own thread at a fixed rate (5-10 Hz), computing
+    the look angles and Doppler corrected frequencies of one satellite a
+    short time ahead, to make up for the latency of the commands, and
+    sending them with the hamlib TCP protocols:
+
+        rotctld: 'P az el'        set position
+        rigctld: 'F freq'         set (downlink) frequency
+                 'I freq'         set split (uplink) frequency
+
+    Both daemons reply 'RPRT 0' on success.
+
+    FakeDaemon is a local stand-in for rotctld/rigctld that records the
+    commands, for testing without hardware.
+    """
+
+# standard imports:
+
+import collections
+import socket
+import socketserver
+import threading
+import time
+
+# Project modules:
+from .doppler import downlink_frequency, uplink_frequency
+from .horizon import observer_events
+from .passes import event_list_from, passes_from_events
+from .positions import alt_azimuth
+from .rotator import plan_pass
+from .timescale import JULIAN_SEC, ts
+
+ROTCTLD_PORT = 4533
+RIGCTLD_PORT = 4532
+
+
+class HamlibError(Exception):
+    """Exception raised when a daemon replies with an error."""
+    pass
+
+
+class HamlibConnection(object):
+    """A TCP connection to rotctld or rigctld.
+
+        Connects at once, raising OSError if the daemon cannot be reached.
+        After a timeout or a dropped connection the next command connects
+        again, so that a late reply is not read as the reply to it.
+
+        Attribute `latency` is the round trip time of the last command, in seconds.
+        """
+
+    def __init__(self, host='127.0.0.1', port=ROTCTLD_PORT, timeout=2.0):
+
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.latency = 0.0
+
+        self._socket = None
+        self._file = None
+        self.connect()
+
+    def connect(self):
+        """Open the connection, closing the old one if it is open."""
+
+        self.close()
+
+        self._socket = socket.create_connection((self.host, self.port), self.timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile('r')
+
+    def command(self, line):
+        """Send a set command and wait for its 'RPRT' reply.
+
+            Raises HamlibError if the reply is not 'RPRT 0', and OSError
+            if the daemon cannot be reached or does not reply in time."""
+
+        if self._socket is None:
+            self.connect()
+
+        start = time.perf_counter()
+
+        try:
+            self._socket.sendall((line + '\n').encode())
+            reply = self._file.readline()
+        except OSError:
+            self.close()  # the reply may still come, and would be out of step
+            raise
+
+        self.latency = time.perf_counter() - start
+
+        if not reply:
+            self.close()
+            raise HamlibError(f'{line!r} -> connection closed by {self.host}:{self.port}')
+
+        reply = reply.strip()
+        if reply != 'RPRT 0':
+            raise HamlibError(f'{line!r} -> {reply!r}')
+
+    def close(self):
+
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._file = self._socket = None
+
+
+class Rotator(object):
+    """An az/el rotator controlled through rotctld."""
+
+    def __init__(self, host='127.0.0.1', port=ROTCTLD_PORT):
+
+        self.connection = HamlibConnection(host, port)
+
+    def set_position(self, azimuth, elevation):
+        """Point the rotator, azimuth and elevation in degrees."""
+
+        self.connection.command(f'P {azimuth:.1f} {elevation:.1f}')
+
+    def close(self):
+        self.connection.close()
+
+
+class Rig(object):
+    """A radio controlled through rigctld."""
+
+    def __init__(self, host='127.0.0.1', port=RIGCTLD_PORT):
+
+        self.connection = HamlibConnection(host, port)
+
+    def set_frequency(self, frequency):
+        """Set the receive frequency, Hz."""
+
+        self.connection.command(f'F {frequency:.0f}')
+
+    def set_split_frequency(self, frequency):
+        """Set the transmit (split) frequency, Hz."""
+
+        self.connection.command(f'I {frequency:.0f}')
+
+    def close(self):
+        self.connection.close()
+
+
+class TimingStats(object):
+    """Keeps the last `size` samples of a time, in seconds, and summarises them."""
+
+    def __init__(self, size=1000):
+
+        self.samples = collections.deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def summary(self):
+        """Returns: dict of count, mean, p50, p95 and max in milliseconds."""
+
+        if not self.samples:
+            return {'count': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+        ordered = sorted(self.samples)
+        count = len(ordered)
+        return {'count': count,
+                'mean': sum(ordered) / count * 1e3,
+                'p50': ordered[count // 2] * 1e3,
+                'p95': ordered[min(count - 1, int(count * 0.95))] * 1e3,
+                'max': ordered[-1] * 1e3}
+
+
+class Tracker(object):
+    """Tracks a satellite with a rotator and/or radio on a dedicated thread.
+
+        satellite -> Skyfield EarthSatellite.
+        observer -> Observer.
+        rotator -> Rotator or None.
+        rig -> Rig or None.
+        downlink, uplink -> satellite frequencies in Hz, or None not to set them.
+        rate -> updates per second.
+        lookahead -> seconds ahead of now that positions are computed for,
+            the measured command latency is added to this.
+        min_elevation -> the rotator is not moved while the satellite is lower, degrees.
+        limits -> optional RotatorLimits, if given each pass is planned at AOS with
+            rotator.plan_pass and the rotator follows the plan, pre-positioning
+            for the next pass while the satellite is down.
+        on_update -> optional callable(state dict) called from the tracking thread
+            after each update.
+
+        Attribute `state` holds the last update: time, az, el, slant_velocity,
+        downlink, uplink and the rotator command rotator_az, rotator_el.
+        Attribute `plan` is the RotatorPlan of the current or next pass.
+        """
+
+    def __init__(self, satellite, observer, rotator=None, rig=None, downlink=None, uplink=None,
+                 rate=10.0, lookahead=0.1, min_elevation=0.0, on_update=None, limits=None):
+
+        self.satellite = satellite
+        self.observer = observer
+        self.rotator = rotator
+        self.rig = rig
+        self.downlink = downlink
+        self.uplink = uplink
+        self.rate = rate
+        self.lookahead = lookahead
+        self.min_elevation = min_elevation
+        self.on_update = on_update
+        self.limits = limits
+
+        self.plan = None
+        self._next_plan_search = 0.0  # Julian
+
+        self.state = {}
+        self.errors = 0
+        self.last_error = None
+
+        self.jitter = TimingStats()
+        self.compute_time = TimingStats()
+        self.rotator_latency = TimingStats()
+        self.rig_latency = TimingStats()
+
+        self._latency = 0.0  # smoothed command latency, seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start tracking on a new thread."""
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='Tracker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop tracking and wait for the thread to finish."""
+
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        """The timing loop, updates are scheduled on absolute deadlines so that they do not drift."""
+
+        period = 1.0 / self.rate
+        deadline = time.perf_counter()
+
+        while not self._stop.is_set():
+            self.jitter.add(abs(time.perf_counter() - deadline))
+
+            try:
+                self.update()
+            except Exception as e:  # e.g. a daemon gone away, tracking carries on at the next update
+                self.errors += 1
+                self.last_error = e
+
+            deadline += period
+            delay = deadline - time.perf_counter()
+            if delay < 0:
+                deadline = time.perf_counter()  # overran, start again from now
+            elif self._stop.wait(delay):
+                break
+
+    def update(self):
+        """Compute the position and frequencies and send them, once."""
+
+        start = time.perf_counter()
+
+        calc_time = ts.now().tt + (self.lookahead + self._latency) * JULIAN_SEC
+        alt, az, slant_velocity = alt_azimuth(self.satellite, self.observer.location, calc_time)
+
+        state = {'time': calc_time, 'az': az.degrees, 'el': alt.degrees, 'slant_velocity': slant_velocity,
+                 'downlink': None, 'uplink': None,
+                 'rotator_az': az.degrees, 'rotator_el': max(alt.degrees, 0.0)}
+        move_rotator = state['el'] >= self.min_elevation
+
+        if self.limits and self.pass_plan(calc_time):
+            state['rotator_az'], state['rotator_el'] = self.plan.command_at(calc_time)
+            move_rotator = True
+        if self.downlink:
+            state['downlink'] = downlink_frequency(self.downlink, slant_velocity)
+        if self.uplink:
+            state['uplink'] = uplink_frequency(self.uplink, slant_velocity)
+
+        self.compute_time.add(time.perf_counter() - start)
+
+        latency = 0.0
+        if self.rotator and move_rotator:
+            self.rotator.set_position(state['rotator_az'], state['rotator_el'])
+            self.rotator_latency.add(self.rotator.connection.latency)
+            latency = max(latency, self.rotator.connection.latency)
+
+        if self.rig:
+            if state['downlink']:
+                self.rig.set_frequency(state['downlink'])
+                self.rig_latency.add(self.rig.connection.latency)
+                latency = max(latency, self.rig.connection.latency)
+            if state['uplink']:
+                self.rig.set_split_frequency(state['uplink'])
+                self.rig_latency.add(self.rig.connection.latency)
+                latency = max(latency, self.rig.connection.latency)
+
+        # exponentially smoothed so one slow reply does not jerk the lookahead
+        self._latency += (latency - self._latency) * 0.1
+
+        self.state = state
+        if self.on_update:
+            self.on_update(state)
+
+    def pass_plan(self, calc_time):
+        """The RotatorPlan for the pass in progress or the next pass
+            after Julian `calc_time`, None if there is no pass within a day."""
+
+        if self.plan and calc_time <= self.plan.end:
+            return self.plan
+
+        self.plan = None
+        if calc_time < self._next_plan_search:
+            return None
+
+        event_list = event_list_from(*observer_events(self.satellite, self.observer,
+                                                      ts.tt_jd(calc_time), ts.tt_jd(calc_time + 1)))
+        for rise, transit, setting, name in passes_from_events(event_list, ''):
+            self.plan = plan_pass(self.satellite, self.observer.location, rise or calc_time, setting, self.limits)
+            return self.plan
+
+        self._next_plan_search = calc_time + 0.01  # look again in about 15 minutes
+        return None
+
+    def statistics(self):
+        """Returns: dict of the timing summaries, in milliseconds."""
+
+        return {'jitter': self.jitter.summary(),
+                'compute': self.compute_time.summary(),
+                'rotator_latency': self.rotator_latency.summary(),
+                'rig_latency': self.rig_latency.summary(),
+                'errors': self.errors}
+
+
+class _FakeDaemonHandler(socketserver.StreamRequestHandler):
+    """Replies 'RPRT 0' to each command line and records it."""
+
+    def handle(self):
+
+        for line in self.rfile:
+            command = line.decode().strip()
+            if not command:
+                continue
+            if command in ('q', 'Q'):
+                break
+
+            if self.server.delay:
+                time.sleep(self.server.delay)
+
+            with self.server.lock:
+                self.server.commands.append((time.perf_counter(), command))
+
+            if command in ('p', 'f', 'i'):  # get commands
+                self.wfile.write(b'0\n' if command != 'p' else b'0\n0\n')
+            else:
+                self.wfile.write(b'RPRT 0\n')
+
+
+class FakeDaemon(socketserver.ThreadingTCPServer):
+    """A local stand-in for rotctld or rigctld.
+
+        Attribute `commands` is a list of (perf_counter time, command line).
+        delay -> seconds to wait before replying, to simulate slow hardware.
+
+        Usage:
+            daemon = FakeDaemon()
+            daemon.start()
+            rotator = Rotator('127.0.0.1', daemon.port)
+        """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, delay=0.0):
+
+        super().__init__((host, port), _FakeDaemonHandler)
+
+        self.delay = delay
+        self.commands = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve on a daemon thread."""
+
+        threading.Thread(target=self.serve_forever, name='FakeDaemon', daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""SkyHamSat chart export.
+
+    Draws pass charts to image files without a window, e.g. for a web
+    page or printed schedules:
+
+        a polar chart of all the passes of each satellite for each day,
+        a timeline of the passes of all the satellites for each day.
+
+    The charts are drawn with graphqt5 on the offscreen Qt platform,
+    the satellites are shared out across a pool of worker processes,
+    each with its own QGuiApplication.
+
+    Files are written as <out>/<YYYY-MM-DD>/<satellite>.png (or .svg)
+    and <out>/<YYYY-MM-DD>/timeline.png.
+
+    e.g.
+        python skyhamsat_charts.py --lat '51.388 N' --lon '0.754 W' --mode FM --days 2 --out charts
+    """
+
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+
+# standard imports:
+
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+# Project modules:
+import satengine
+from satengine import ts, utc_iso
+from satengine.timeline import ALL_PASSES, MAX_PASS_DAYS
+
+PLOT_COLOURS = ('firebrick', 'sandybrown', 'olive', 'darkgreen', 'purple', 'blue')
+
+# Pass tracks are drawn to within this many degrees of the satellite path
+TRACK_ERROR = 0.25
+
+# Set in each worker process by _init_worker
+_application = None
+_engine = None
+_options = None
+
+
+def _init_worker(tle_source, satslist_file, latitude, longitude, elevation, options):
+    """Create the offscreen QGuiApplication and load the satellites once per worker process."""
+
+    global _application, _engine, _options
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from PyQt5.QtGui import QGuiApplication
+
+    _application = QGuiApplication.instance() or QGuiApplication(['skyhamsat_charts'])
+
+    catalog = satengine.Catalog.load(tle_source, satslist_file)
+    horizon = satengine.HorizonMask.load(options['horizon']) if options['horizon'] else None
+    _engine = satengine.PassEngine(catalog, satengine.Observer(latitude, longitude, elevation, horizon))
+    _options = options
+
+
+def file_name(text):
+    """`text` made safe to use as a file name."""
+
+    return re.sub(r'[^\w.+-]+', '_', text).strip('_') or 'satellite'
+
+
+def day_passes(satellite_name, day_start):
+    """The passes of the satellite in the day from `day_start` (Julian).
+
+        Returns: list of [rise, transit, set, name, max altitude], a pass in
+            progress at the start or end of the day is cut at the day, and
+            its maximum altitude is the highest it is within the day.
+        """
+
+    day_end = day_start + 1
+    event_list = _engine.next_passes(satellite_name, ALL_PASSES, start=day_start, days=1)
+    if event_list and event_list[-1][1] != 'set':
+        # a pass still up at the end of the day, followed to its set to be cut at the day
+        event_list = _engine.next_passes(satellite_name, ALL_PASSES, start=day_start, days=1 + MAX_PASS_DAYS)
+
+    passes = []
+    for rise, transit, setting, name in satengine.passes_from_events(event_list, satellite_name):
+        if rise >= day_end:
+            break
+        passes.append([rise, transit if transit < day_end else 0, min(setting, day_end), name])
+
+    # the maximum altitudes of all of the passes in one vectorized computation
+    return [[d.rise or day_start, d.transit, d.setting, d.satellite, d.max_altitude]
+            for d in _engine.pass_details(satellite_name, passes, day_start)]
+
+
+def _polar_chart(task):
+    """Draw the polar chart of one satellite for one day.
+
+        task -> (day: 'YYYY-MM-DD', day start: Julian, satellite name)
+
+        Returns: (day, list of the passes, list of the files written)
+        """
+
+    from graphqt5 import Line, Polar
+
+    day, day_start, satellite_name = task
+    passes = day_passes(satellite_name, day_start)
+
+    size = _options['size']
+    graph = Polar(None, size_x=size, size_y=size, text_pixel_size=max(10, size // 40),
+                  background=_options['background'])
+    graph.set_grid_label_format('{:0.0f}°', '{:0.0f}°')
+    graph.add_text_by_proportion(f' {satellite_name} {day}', 0, .95, 'purple', True)
+    graph.add_text_by_proportion(f' {len(passes)} passes', 0, .02, 'blue', True)
+
+    lines = []
+    for p, (rise, transit, setting, name, max_altitude) in enumerate(passes):
+        times, alts, azs, velocities = _engine.adaptive_pass_track(satellite_name, rise, setting, TRACK_ERROR)
+
+        labels = {}
+        if len(times):
+            labels[0] = f' {utc_iso(times[0])[11:16]}'
+            labels[len(times) - 1] = f' {utc_iso(setting)[11:16]}'
+        lines.append(Line(alts, azs, PLOT_COLOURS[p % len(PLOT_COLOURS)], 4, labels))
+
+    graph.draw(*lines)
+
+    return day, passes, _save(graph, day, file_name(satellite_name))
+
+
+def _timeline_chart(task):
+    """Draw the timeline of the passes of all the satellites for one day.
+
+        task -> (day: 'YYYY-MM-DD', day start: Julian, list of the passes of the day)
+
+        Returns: (day, None, list of the files written)
+        """
+
+    from graphqt5 import Graph, Line
+
+    day, day_start, passes = task
+
+    graph = Graph(None, 0, 24, 0, 90, xgrids=12, ygrids=9,
+                  size_x=_options['size'] * 2, size_y=_options['size'],
+                  text_pixel_size=max(10, _options['size'] // 40), background=_options['background'])
+    graph.set_grid_label_format('{:0.0f}', '{:0.0f}°')
+    graph.add_text_by_proportion(f'          Passes {day}', 0, .95, 'purple', True)
+    graph.add_text_by_proportion('Hours UTC', 0.8, 0.02, 'blue', True)
+
+    lines = []
+    for p, (rise, transit, setting, name, max_altitude) in enumerate(sorted(passes)):
+        lines.append(Line(((rise - day_start) * 24, (setting - day_start) * 24), (max_altitude, max_altitude),
+                          PLOT_COLOURS[p % len(PLOT_COLOURS)], 6, {1: f' {name}'}))
+
+    graph.draw(*lines)
+
+    return day, None, _save(graph, day, 'timeline')
+
+
+def _save(graph, day, name):
+    """Save the graph in the formats asked for, returns the file names."""
+
+    directory = os.path.join(_options['out'], day)
+    os.makedirs(directory, exist_ok=True)
+
+    saved = []
+    for image_format in _options['formats']:
+        filename = os.path.join(directory, f'{name}.{image_format}')
+        if image_format == 'svg':
+            graph.save_svg(filename, name)
+        else:
+            graph.save_image(filename)
+        saved.append(filename)
+
+    return saved
+
+
+def export_charts(args, satellite_names, days):
+    """Draw the charts of `satellite_names` for `days`, a list of ('YYYY-MM-DD', start: Julian).
+
+        The polar charts are drawn first, the timeline of each day is drawn
+        when all of the satellites of that day have been predicted.
+
+        Generator of the names of the files written.
+        """
+
+    options = {'out': args.out, 'formats': args.format, 'size': args.size, 'background': args.background,
+               'horizon': args.horizon}
+    init_args = (args.tle, args.satslist, args.lat, args.lon, args.elevation, options)
+    polar_tasks = [(day, day_start, name) for day, day_start in days for name in satellite_names]
+
+    if args.jobs == 1:
+        _init_worker(*init_args)
+        pool = None
+        imap = map
+    else:
+        pool = multiprocessing.Pool(args.jobs, _init_worker, init_args)
+        imap = pool.imap_unordered
+
+    try:
+        day_starts = dict(days)
+        day_passes_found = {day: [] for day, day_start in days}
+        remaining = {day: len(satellite_names) for day, day_start in days}
+        timeline_tasks = []
+
+        for day, passes, files in imap(_polar_chart, polar_tasks):
+            yield from files
+            day_passes_found[day].extend(passes)
+            remaining[day] -= 1
+            if not remaining[day]:
+                timeline_tasks.append((day, day_starts[day], day_passes_found.pop(day)))
+
+        for day, passes, files in imap(_timeline_chart, timeline_tasks):
+            yield from files
+    finally:
+        if pool:
+            pool.terminate()
+
+
+def argument_parser():
+    """Returns the ArgumentParser for the command line."""
+
+    parser = argparse.ArgumentParser(description='Draw amateur radio satellite pass charts to files.')
+
+    parser.add_argument('--lat', default='51.38833333333 N', help="Observer latitude, e.g. '51.388 N'")
+    parser.add_argument('--lon', default='0.75416666666 W', help="Observer longitude, e.g. '0.754 W'")
+    parser.add_argument('--elevation', type=float, default=100.0, help='Observer elevation, metres')
+    parser.add_argument('--horizon', help='Horizon mask file of azimuth, elevation lines, see satengine.horizon')
+
+    parser.add_argument('--tle', default=satengine.TLE_URL, help='TLE url or file name')
+    parser.add_argument('--satslist', default='satslist.json', help='Satellite information json file')
+
+    parser.add_argument('--transponder', action='store_true', help='Satellites with a transponder')
+    parser.add_argument('--uplink', action='store_true', help='Satellites with an uplink')
+    parser.add_argument('--downlink', action='store_true', help='Satellites with a downlink')
+    parser.add_argument('--beacon', action='store_true', help='Satellites with a beacon')
+    parser.add_argument('--mode', default='Any', help="Satellite mode, e.g. 'FM', default 'Any'")
+    parser.add_argument('--satellite', action='append', help='Satellite name, may be repeated')
+
+    parser.add_argument('--date', default='today', help="UTC date of the first day, YYYY-MM-DD or 'today'")
+    parser.add_argument('--days', type=int, default=1, help='Number of days, default 1')
+
+    parser.add_argument('--out', default='charts', help='Output directory, default charts')
+    parser.add_argument('--format', action='append', choices=('png', 'svg'),
+                        help='Image format, may be repeated, default png')
+    parser.add_argument('--size', type=int, default=600, help='Chart height in pixels, default 600')
+    parser.add_argument('--background', default='white', help='Chart background colour, default white')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Number of worker processes')
+
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point."""
+
+    args = argument_parser().parse_args(argv)
+    args.format = args.format or ['png']
+    args.jobs = max(1, args.jobs or 1)
+
+    if args.date == 'today':
+        year, month, day = ts.now().utc[:3]
+    else:
+        year, month, day = map(int, args.date.split('-'))
+
+    days = []
+    for n in range(args.days):
+        day_start = ts.utc(year, month, day + n)
+        days.append((day_start.utc_strftime('%Y-%m-%d'), day_start.tt))
+
+    # With no feature flags given, use all features
+    features = [args.transponder, args.uplink, args.downlink, args.beacon]
+    if not any(features):
+        features = [True] * 4
+
+    catalog = satengine.Catalog.load(args.tle, args.satslist)
+    satellite_filter = satengine.SatelliteFilter(*features, mode=args.mode)
+    satellite_names = [s['Satellite'] for s in catalog.filtered(satellite_filter)
+                       if not args.satellite or s['Satellite'] in args.satellite]
+
+    start = time.perf_counter()
+    count = 0
+    for filename in export_charts(args, satellite_names, days):
+        print(filename)
+        count += 1
+
+    print(f'{count} files in {time.perf_counter() - start:0.1f} s', file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""SkyHamSat command line.
+
+    Predicts satellite passes without the GUI, so that pass schedules
+    can be generated on a headless server, e.g. from cron.
+
+    No QApplication is created and PyQt5 is not imported.
+    The time range is split into chunks which are predicted
+    for each satellite on a pool of worker processes, the results
+    are streamed in time order to stdout as CSV or JSON Lines.
+
+    With --db, the passes are read from a satengine.PassDatabase file
+    and only the satellites that it does not have are predicted, which
+    makes repeated queries over the same days take milliseconds, e.g.
+    every pass above 30° between 18:00 and 23:00 UTC each evening this week:
+
+        python skyhamsat_cli.py --db passes.sqlite --min-altitude 30 --daily 18-23 --hours 168
+
+    and --schedule keeps only the passes that one antenna can work,
+    see satengine.schedule.
+
+    --sunlit 0.5 keeps the passes sunlit for at least half of their time,
+    when a satellite that only runs its transponder in sunlight is likely
+    to be heard, and --visible the passes that can be seen by eye, see
+    satengine.sunlight.
+
+    e.g.
+        python skyhamsat_cli.py --lat '51.388 N' --lon '0.754 W' --mode FM --hours 48 --format jsonl
+    """
+
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 2 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software
+#  Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+#  MA 02110-1301, USA.
+
+# standard imports:
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import sys
+from datetime import datetime, timezone
+
+# Project modules:
+import satengine
+from satengine import ts, utc_iso
+from satengine.rotator import RotatorLimits
+from satengine.timeline import MAX_PASS_DAYS
+
+FIELD_NAMES = ['satellite', 'number', 'rise', 'transit', 'set', 'max_altitude']
+
+# Extra time searched after the end of a chunk so that passes rising
+# in the chunk are complete, in days. A pass still up at the end of it
+# is searched for further, doubling the overlap up to MAX_PASS_DAYS.
+CHUNK_OVERLAP = 0.25
+
+# Set in each worker process by _init_worker
+_catalog = None
+_observer = None
+_lighting = (None, False)  # --sunlit and --visible
+
+
+def _init_worker(tle_source, satslist_file, latitude, longitude, elevation, horizon_file=None,
+                 lighting=(None, False)):
+    """Load the satellites and observer once per worker process."""
+
+    global _catalog, _observer, _lighting
+
+    _catalog = satengine.Catalog.load(tle_source, satslist_file)
+    horizon = satengine.HorizonMask.load(horizon_file) if horizon_file else None
+    _observer = satengine.Observer(latitude, longitude, elevation, horizon)
+    _lighting = lighting
+
+
+def _predict(task):
+    """Predict the passes of one satellite in one time chunk.
+
+        task -> (chunk number, satellite name, start: Julian, end: Julian)
+
+        Passes are included if they rise in [start, end). In the first
+        chunk, a pass in progress at the start is also included
+        with no rise time.
+
+        Returns: (chunk number, list of pass row dicts)
+        """
+
+    chunk, satellite_name, start, end = task
+
+    number = _catalog.satellites[satellite_name]['Number']
+    satellite = _catalog.satellite(satellite_name)
+
+    overlap = CHUNK_OVERLAP
+    while True:
+        event_list = satengine.event_list_from(*satengine.observer_events(satellite, _observer, ts.tt_jd(start),
+                                                                          ts.tt_jd(end + overlap)))
+        if overlap >= MAX_PASS_DAYS or not still_up(event_list, end, chunk == 0):
+            break
+        overlap *= 2  # followed to its set, e.g. a long pass of a satellite in a high orbit
+
+    passes = []
+    for record in satengine.passes_from_events(event_list, satellite_name):
+        rise = record[0]
+        if rise:
+            if not start <= rise < end:
+                continue
+        elif chunk != 0:
+            continue  # already reported by the previous chunk
+        passes.append(record)
+
+    min_sunlit, visible = _lighting
+    if min_sunlit is not None or visible:
+        lights = satengine.pass_illumination(satellite, _observer.location, passes, start)
+        passes = lit_passes(passes, lights, min_sunlit, visible)
+
+    # the maximum altitudes of all of the passes in one vectorized computation
+    rows = []
+    for details in satengine.pass_details(satellite, _observer.location, passes, start):
+        rows.append({'satellite': details.satellite,
+                     'number': number,
+                     'rise': utc_iso(details.rise),
+                     'transit': utc_iso(details.transit),
+                     'set': utc_iso(details.setting),
+                     'max_altitude': round(details.max_altitude, 1),
+                     '_sort': details.rise or details.transit or details.setting})
+
+    return chunk, rows
+
+
+def still_up(event_list, end, in_progress_reported):
+    """True if the last pass of `event_list` has not set by the end of the list
+        and is reported for a chunk ending at `end` (Julian): it rises before `end`,
+        or it was in progress at the start of the search and `in_progress_reported`."""
+
+    if not event_list or event_list[-1][1] == 'set':
+        return False
+
+    rises = [t.tt for t, name in event_list if name == 'rise']
+
+    return rises[-1] < end if rises else in_progress_reported
+
+
+def lit_passes(passes, lights, min_sunlit=None, visible=False):
+    """The `passes` whose PassIllumination `lights` are sunlit for at least `min_sunlit`
+        of the pass, if given, and can be seen, if `visible`."""
+
+    kept = lights
+    if min_sunlit is not None:
+        kept = satengine.transponder_likely_on(kept, min_sunlit)
+    if visible:
+        kept = satengine.optically_visible(kept)
+
+    kept = {id(light) for light in kept}
+
+    return [record for record, light in zip(passes, lights) if id(light) in kept]
+
+
+def daily_hours(text):
+    """Parse --daily 'start-end' UTC hours, e.g. '18-23', to (start hour, end hour)."""
+
+    try:
+        start_hour, end_hour = (float(hour) for hour in text.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'start-end' UTC hours, e.g. '18-23', got {text!r}")
+
+    if not (0 <= start_hour <= 24 and 0 <= end_hour <= 24):
+        raise argparse.ArgumentTypeError(f'hours must be from 0 to 24, got {text!r}')
+
+    return start_hour, end_hour
+
+
+def parse_time(text):
+    """Parse 'now' or an ISO date/time, taken as UTC, to a Julian TT date."""
+
+    if text == 'now':
+        return ts.now().tt
+
+    when = datetime.fromisoformat(text.rstrip('Z'))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+
+    return ts.utc(when).tt
+
+
+def prediction_tasks(satellite_names, start, end, chunk_hours):
+    """Generator of (chunk number, satellite name, start, end) tasks,
+        in time order, covering start to end (Julian)."""
+
+    chunk_days = chunk_hours / 24
+    chunk = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + chunk_days, end)
+        for name in satellite_names:
+            yield chunk, name, chunk_start, chunk_end
+        chunk_start = chunk_end
+        chunk += 1
+
+
+def predicted_passes(args, satellite_names, start, end):
+    """Generator of pass row dicts in time order.
+
+        Each chunk is sorted and yielded as soon as all of its
+        satellites have been predicted.
+        """
+
+    tasks = prediction_tasks(satellite_names, start, end, args.chunk_hours)
+    init_args = (args.tle, args.satslist, args.lat, args.lon, args.elevation, args.horizon,
+                 (args.sunlit, args.visible))
+
+    if args.jobs == 1:
+        _init_worker(*init_args)
+        results = map(_predict, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(args.jobs, _init_worker, init_args)
+        results = pool.imap(_predict, tasks, chunksize=max(1, len(satellite_names) // args.jobs))
+
+    try:
+        current_chunk = 0
+        chunk_rows = []
+        for chunk, rows in results:
+            if chunk != current_chunk:
+                yield from sorted(chunk_rows, key=lambda r: r['_sort'])
+                current_chunk = chunk
+                chunk_rows = []
+            chunk_rows.extend(rows)
+
+        yield from sorted(chunk_rows, key=lambda r: r['_sort'])
+    finally:
+        if pool:
+            pool.terminate()
+
+
+def stored_passes(args, catalog, satellite_names, start, end):
+    """Generator of pass row dicts in time order, from the pass database `args.db`.
+
+        With args.daily, only the passes up between its hours on each
+        day from the date of `start` to `end` are included.
+        """
+
+    horizon = satengine.HorizonMask.load(args.horizon) if args.horizon else None
+    engine = satengine.PassEngine(catalog, satengine.Observer(args.lat, args.lon, args.elevation, horizon))
+    database = satengine.PassDatabase(args.db)
+
+    try:
+        if args.daily:
+            start_hour, end_hour = args.daily
+            first_day = ts.tt_jd(start).utc[:3]
+            days = max(1, int(math.ceil(end - start)))
+            transit_list = database.daily_passes(engine, satellite_names, first_day, days,
+                                                 start_hour, end_hour, args.min_altitude)
+        else:
+            transit_list = database.transit_list(engine, satellite_names, start, end, args.min_altitude)
+
+        if args.sunlit is not None or args.visible:
+            by_satellite = {}
+            for record in transit_list:
+                by_satellite.setdefault(record[3], []).append(record)
+            kept = set()
+            for name, passes in by_satellite.items():
+                lights = engine.pass_illumination(name, passes, start)
+                kept.update(id(record) for record in lit_passes(passes, lights, args.sunlit, args.visible))
+            transit_list = [record for record in transit_list if id(record) in kept]
+
+        if args.schedule:
+            limits = RotatorLimits(*(float(v) for v in args.rotator_limits.split(',')))
+            satellites = [catalog.satellites[name] for name in satellite_names]
+            priorities = satengine.satellite_priorities(satellites, weights_argument(args.priority),
+                                                        weights_argument(args.mode_weight))
+            transit_list = satengine.plan_schedule(transit_list, limits, priorities, start,
+                                                   database.aos_azimuths(engine, transit_list))
+
+        for rise, transit, setting, name, max_altitude in transit_list:
+            yield {'satellite': name,
+                   'number': catalog.satellites[name]['Number'],
+                   'rise': utc_iso(rise),
+                   'transit': utc_iso(transit),
+                   'set': utc_iso(setting),
+                   'max_altitude': round(max_altitude, 1)}
+    finally:
+        database.close()
+
+
+def weights_argument(items):
+    """A dict of name: weight from a list of 'name:weight' arguments."""
+
+    weights = {}
+    for item in items or ():
+        name, weight = item.rsplit(':', 1)
+        weights[name] = float(weight)
+
+    return weights
+
+
+def write_passes(rows, output_format, out, passes_per_satellite=None):
+    """Write the pass rows to `out` as 'csv' or 'jsonl', flushing each row."""
+
+    if output_format == 'csv':
+        writer = csv.DictWriter(out, FIELD_NAMES, extrasaction='ignore')
+        writer.writeheader()
+
+    pass_counts = {}
+    for row in rows:
+        if passes_per_satellite:
+            count = pass_counts.get(row['satellite'], 0)
+            if count >= passes_per_satellite:
+                continue
+            pass_counts[row['satellite']] = count + 1
+
+        if output_format == 'csv':
+            writer.writerow(row)
+        else:
+            out.write(json.dumps({k: row[k] for k in FIELD_NAMES}) + '\n')
+        out.flush()
+
+
+def argument_parser():
+    """Returns the ArgumentParser for the command line."""
+
+    parser = argparse.ArgumentParser(description='Predict amateur radio satellite passes.')
+
+    parser.add_argument('--lat', default='51.38833333333 N', help="Observer latitude, e.g. '51.388 N'")
+    parser.add_argument('--lon', default='0.75416666666 W', help="Observer longitude, e.g. '0.754 W'")
+    parser.add_argument('--elevation', type=float, default=100.0, help='Observer elevation, metres')
+    parser.add_argument('--horizon', help='Horizon mask file of azimuth, elevation lines, see satengine.horizon')
+
+    parser.add_argument('--tle', default=satengine.TLE_URL, help='TLE url or file name')
+    parser.add_argument('--satslist', default='satslist.json', help='Satellite information json file')
+
+    parser.add_argument('--transponder', action='store_true', help='Satellites with a transponder')
+    parser.add_argument('--uplink', action='store_true', help='Satellites with an uplink')
+    parser.add_argument('--downlink', action='store_true', help='Satellites with a downlink')
+    parser.add_argument('--beacon', action='store_true', help='Satellites with a beacon')
+    parser.add_argument('--mode', default='Any', help="Satellite mode, e.g. 'FM', default 'Any'")
+    parser.add_argument('--satellite', action='append', help='Satellite name, may be repeated')
+
+    parser.add_argument('--start', default='now', help="UTC ISO start time or 'now'")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--end', help='UTC ISO end time')
+    group.add_argument('--hours', type=float, default=24.0, help='Hours from start, default 24')
+    parser.add_argument('--passes', type=int, help='Maximum number of passes per satellite')
+    parser.add_argument('--min-altitude', type=float,
+                        help='Minimum maximum altitude of the passes, degrees, with --db')
+    parser.add_argument('--daily', type=daily_hours, help="UTC hours of each day, e.g. '18-23', with --db")
+    parser.add_argument('--db', help='Pass database file, passes are read from it and stored in it')
+    parser.add_argument('--schedule', action='store_true', help='Only the passes one antenna can work, with --db')
+    parser.add_argument('--sunlit', type=float,
+                        help='Only passes sunlit for at least this fraction, e.g. 0.5 for transponders run in sunlight')
+    parser.add_argument('--visible', action='store_true', help='Only passes that can be seen, sunlit in a dark sky')
+    parser.add_argument('--rotator-limits',
+                        help="Rotator 'az_min,az_max,el_min,el_max,az_rate,el_rate', default '0,450,0,90,6,6', "
+                             "with --schedule")
+    parser.add_argument('--priority', action='append',
+                        help="Satellite priority, e.g. 'AO-91:2', may be repeated, with --schedule")
+    parser.add_argument('--mode-weight', action='append',
+                        help="Mode weight, e.g. 'FM:2', may be repeated, with --schedule")
+
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv', help='Output format')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='Number of worker processes')
+    parser.add_argument('--chunk-hours', type=float, default=24.0, help='Hours predicted per task')
+
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point."""
+
+    parser = argument_parser()
+    args = parser.parse_args(argv)
+
+    if not args.db:
+        for option, value in (('--min-altitude', args.min_altitude), ('--daily', args.daily),
+                              ('--schedule', args.schedule or None)):
+            if value is not None:
+                parser.error(f'{option} needs --db')
+    if not args.schedule:
+        for option, value in (('--rotator-limits', args.rotator_limits), ('--priority', args.priority),
+                              ('--mode-weight', args.mode_weight)):
+            if value is not None:
+                parser.error(f'{option} needs --schedule')
+    if args.min_altitude is None:
+        args.min_altitude = 0.0
+    if args.rotator_limits is None:
+        args.rotator_limits = '0,450,0,90,6,6'
+
+    start = parse_time(args.start)
+    end = parse_time(args.end) if args.end else start + args.hours / 24
+
+    # With no feature flags given, use all features
+    features = [args.transponder, args.uplink, args.downlink, args.beacon]
+    if not any(features):
+        features = [True] * 4
+
+    catalog = satengine.Catalog.load(args.tle, args.satslist)
+    satellite_filter = satengine.SatelliteFilter(*features, mode=args.mode)
+    satellite_names = [s['Satellite'] for s in catalog.filtered(satellite_filter)
+                       if not args.satellite or s['Satellite'] in args.satellite]
+
+    args.jobs = max(1, args.jobs or 1)
+    if args.db:
+        rows = stored_passes(args, catalog, satellite_names, start, end)
+    else:
+        rows = predicted_passes(args, satellite_names, start, end)
+
+    try:
+        write_passes(rows, args.format, sys.stdout, args.passes)
+    except BrokenPipeError:
+        pass  # e.g. piped to head
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Tests of satengine.passdb PassPredictor."""
+
+# standard imports:
+
+import threading
+import time
+
+# Third party modules:
+from skyfield.api import EarthSatellite
+
+# Project modules:
+from satengine.catalog import Catalog
+from satengine.engine import PassEngine
+from satengine.observer import Observer
+from satengine.passdb import PassDatabase, PassPredictor
+from satengine.timescale import ts
+
+ISS_TLE = ('1 25544U 98067A   24001.50000000  .00016717  00000-0  10270-3 0  9005',
+           '2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.50377579 12345')
+
+
+def test_predictor_survives_a_satellite_not_in_the_catalog():
+    satellite = EarthSatellite(*ISS_TLE, 'ISS', ts)
+    catalog = Catalog({'ISS': {'Satellite': 'ISS', 'Number': '25544'}}, {25544: satellite})
+    engine = PassEngine(catalog, Observer('51.388 N', '0.754 W', 100.0))
+    database = PassDatabase(':memory:')
+
+    # e.g. dropped from the catalog by a TLE reload while the predictor walks the old names
+    predictor = PassPredictor(database, engine, ['GONE-1', 'ISS'], days=0.5)
+    predictor.start()
+    try:
+        deadline = time.monotonic() + 60.0
+        while predictor.predicted < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert predictor.running
+        assert predictor.errors == 0
+        assert predictor.predicted == 2
+    finally:
+        predictor.stop()
+        database.close()
+
+    assert not predictor.running
+
+
+def test_ensure_waits_only_for_the_same_satellite():
+    satellite = EarthSatellite(*ISS_TLE, 'ISS', ts)
+    catalog = Catalog({'ISS': {'Satellite': 'ISS', 'Number': '25544'}}, {25544: satellite})
+    engine = PassEngine(catalog, Observer('51.388 N', '0.754 W', 100.0))
+    database = PassDatabase(':memory:')
+    start = ts.utc(2024, 1, 2).tt
+
+    # a long prediction of another satellite, as by the PassPredictor
+    predicting, release = threading.Event(), threading.Event()
+    predict = database._predict
+
+    def slow_predict(engine, satellite_name, *args):
+        if satellite_name == 'SLOW-1':
+            predicting.set()
+            release.wait(60.0)
+        predict(engine, satellite_name, *args)
+
+    database._predict = slow_predict
+    slow = threading.Thread(target=database.ensure, args=(engine, 'SLOW-1', start, start + 0.5))
+    slow.start()
+    try:
+        assert predicting.wait(60.0)
+        stored = []
+        query = threading.Thread(target=lambda: stored.extend(
+            database.ensure(engine, 'ISS', start, start + 0.5) for _ in range(2)))
+        query.start()
+        query.join(30.0)
+
+        assert not query.is_alive()
+        assert stored == [False, True]
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+        database.close()
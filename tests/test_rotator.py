@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Tests of satengine.rotator flip mode."""
+
+# Third party modules:
+import numpy as np
+
+# Project modules:
+from satengine.rotator import RotatorLimits, plan_track
+from satengine.timescale import JULIAN_SEC
+
+
+def overhead_track(max_elevation=89.4, heading=0.0):
+    """Julian times, az and el (degrees) of an ISS-like pass, 420 km up at 7.66 km/s,
+        in a straight line past the zenith peaking at `max_elevation`, sampled every second."""
+
+    height, speed = 420.0, 7.66
+    offset = height / np.tan(np.radians(max_elevation))  # km from the observer's zenith at the peak
+
+    seconds = np.arange(-300.0, 301.0)
+    along = speed * seconds
+    el = np.degrees(np.arctan2(height, np.hypot(along, offset)))
+    az = np.mod(np.degrees(np.arctan2(along, offset)) + heading, 360.0)
+
+    return 2460000.5 + seconds * JULIAN_SEC, az, el
+
+
+def test_flip_follows_a_near_zenith_pass():
+    for heading in (0.0, 137.0, 300.0):
+        times, az, el = overhead_track(heading=heading)
+
+        normal = plan_track(times, az, el, RotatorLimits())
+        flip = plan_track(times, az, el, RotatorLimits(el_max=180.0))
+
+        assert normal.mode == 'normal' and normal.max_error > 10.0  # the azimuth cannot swing fast enough
+        assert flip.mode == 'flip'
+        assert flip.max_error < 1.5
+        assert np.all((flip.el >= 0.0) & (flip.el <= 180.0))
+        assert np.ptp(flip.az) < 45.0  # the azimuth stays near AOS, not swinging by 180°
+
+
+def test_flip_is_not_used_for_a_low_pass():
+    times, az, el = overhead_track(max_elevation=30.0)
+
+    plan = plan_track(times, az, el, RotatorLimits(el_max=180.0))
+
+    assert plan.mode == 'normal'
+    assert plan.max_error < 0.1